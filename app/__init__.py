@@ -22,11 +22,38 @@ def create_app(config_name: str = "development"):
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
 
-    from app.models import user, parking_lot, parking_spot, reservation
+    from app.models import user, parking_lot, parking_spot, reservation, spot_change, scheduler_lease, occupancy_hourly, occupancy_event
+
+    # Creeaza tabelele noi in bazele de date existente
+    from .utils.migrations import run_migrations
+    with app.app_context():
+        run_migrations()
 
     # Inregistreaza blueprint-urile API
     register_blueprints(app)
 
+    # Fluxul SSE pentru schimbarile de stare ale locurilor
+    from .services.spot_events import broker as spot_events
+    spot_events.init_app(app)
+
+    # Cache-urile pentru statistici
+    from .services.parking_service import admin_stats_cache, profile_cache, stats_cache
+    admin_stats_cache.ttl = app.config["ADMIN_STATS_TTL_SECONDS"]
+    stats_cache.ttl = app.config["STATS_CACHE_TTL_SECONDS"]
+    stats_cache.max_entries = app.config["STATS_CACHE_MAX_ENTRIES"]
+    profile_cache.ttl = app.config["FORECAST_PROFILE_TTL_SECONDS"]
+    from .services.free_slots import free_slots_cache
+    free_slots_cache.ttl = app.config["FREE_SLOTS_TTL_SECONDS"]
+    free_slots_cache.max_entries = app.config["FREE_SLOTS_MAX_ENTRIES"]
+
+    # Buffer-ul write-behind pentru ocupare (optional)
+    from .services.write_behind import write_behind
+    write_behind.init_app(app)
+
+    # Sweep-urile de rezervari (expirare / no-show) ruleaza in fundal
+    from .services.scheduler import scheduler
+    scheduler.init_app(app)
+
     @app.route("/")
     def index():
         return render_template("index.html")
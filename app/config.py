@@ -13,6 +13,11 @@ def is_wsl():
         return False
 
 def get_db_path():
+    # ex: scripturi de test care lucreaza pe o baza temporara
+    override = os.environ.get("PARKUPB_DATABASE_URL")
+    if override:
+        return override
+
     instance_dir = BASE_DIR / "instance"
     instance_dir.mkdir(exist_ok=True)
     db_file = instance_dir / "parking.db"
@@ -37,11 +42,44 @@ def load_config(env: str = "development") -> dict:
     db_url = get_db_path()
 
     config = {
+        # "testing": fara scheduler in fundal (vezi tests/conftest.py)
+        "TESTING": env == "testing",
         "SQLALCHEMY_DATABASE_URI": db_url,
         "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        # cat asteapta un writer SQLite dupa lock-ul altui writer (secunde)
+        "SQLALCHEMY_ENGINE_OPTIONS": {
+            "connect_args": {"timeout": data.get("sqlite_busy_timeout_seconds", 15)},
+        },
         "SECRET_KEY": data.get("secret_key", "secret"),
         "DEFAULT_ZOOM": data.get("default_zoom", 16),
         "DEFAULT_CENTER": data.get("default_center", [44.435, 26.05]),
+        # Server-Sent Events (/parking/spots/stream)
+        "SSE_POLL_SECONDS": data.get("sse_poll_seconds", 1.0),
+        "SSE_HEARTBEAT_SECONDS": data.get("sse_heartbeat_seconds", 15),
+        # Scheduler pentru sweep-urile de rezervari
+        "SCHEDULER_ENABLED": data.get("scheduler_enabled", True),
+        "SWEEP_INTERVAL_SECONDS": data.get("sweep_interval_seconds", 10),
+        # Cache pentru /admin/stats (secunde)
+        "ADMIN_STATS_TTL_SECONDS": data.get("admin_stats_ttl_seconds", 5),
+        # Cache pentru /parking/stats
+        "STATS_CACHE_TTL_SECONDS": data.get("stats_cache_ttl_seconds", 3),
+        "STATS_CACHE_MAX_ENTRIES": data.get("stats_cache_max_entries", 256),
+        # Cat timp sunt refolosite profilele istorice pentru /parking/forecast
+        "FORECAST_PROFILE_TTL_SECONDS": data.get("forecast_profile_ttl_seconds", 3600),
+        # Calendarul de intervale libere (/parking/free-slots); se invalideaza
+        # la fiecare schimbare de rezervare, TTL-ul e doar o plasa de siguranta
+        "FREE_SLOTS_TTL_SECONDS": data.get("free_slots_ttl_seconds", 300),
+        "FREE_SLOTS_MAX_ENTRIES": data.get("free_slots_max_entries", 2048),
+        # Senzorii de sol (/sensors/readings): chei acceptate in X-Sensor-Key,
+        # numarul maxim de citiri per apel si varsta maxima a unei citiri
+        "SENSOR_API_KEYS": data.get("sensor_api_keys", []),
+        "SENSOR_MAX_BATCH": data.get("sensor_max_batch", 20000),
+        "SENSOR_MAX_READING_AGE_SECONDS": data.get("sensor_max_reading_age_seconds", 300),
+        # Write-behind pentru citirile senzorilor si mark_spot_occupied / mark_spot_free: commit de grup
+        # la fiecare flush_ms (fereastra de durabilitate) sau max_pending locuri
+        "WRITE_BEHIND_ENABLED": data.get("write_behind_enabled", False),
+        "WRITE_BEHIND_FLUSH_MS": data.get("write_behind_flush_ms", 250),
+        "WRITE_BEHIND_MAX_PENDING": data.get("write_behind_max_pending", 1000),
     }
 
     return config
@@ -9,5 +9,9 @@ from .user import User
 from .parking_lot import ParkingLot
 from .parking_spot import ParkingSpot
 from .reservation import Reservation
+from .spot_change import SpotChange
+from .scheduler_lease import SchedulerLease
+from .occupancy_hourly import OccupancyHourly
+from .occupancy_event import OccupancyEvent
 
-__all__ = ["User", "ParkingLot", "ParkingSpot", "Reservation"]
+__all__ = ["User", "ParkingLot", "ParkingSpot", "Reservation", "SpotChange", "SchedulerLease", "OccupancyHourly", "OccupancyEvent"]
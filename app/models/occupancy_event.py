@@ -0,0 +1,37 @@
+"""
+Modelul OccupancyEvent (jurnalul append-only al tranzitiilor de ocupare).
+
+- Structura tabelei `occupancy_events` (doar intregi, randuri compacte):
+    - id: INTEGER, PK (rowid; randurile doar se adauga, nu se modifica)
+    - day: INTEGER (ziua, in zile de la epoch; "partitia")
+    - at_ms: INTEGER (momentul tranzitiei, in milisecunde de la epoch)
+    - spot_id: INTEGER (fara FK, ca istoricul sa ramana si dupa stergere)
+    - state: INTEGER (1 = ocupat, 0 = liber)
+    - actor_id: INTEGER (user-ul care a facut schimbarea; NULL = senzor / sistem)
+    - source: INTEGER (vezi SOURCE_* in app/services/occupancy_log.py)
+
+Datele sunt datetime-uri naive tratate ca UTC, ca in occupancy_analytics.
+Fiecare zi e un interval contiguu in indexul (day, at_ms), deci interogarile
+pe o zi sunt range scan-uri; starea unui loc la un moment dat se gaseste
+din indexul (spot_id, at_ms).
+"""
+
+from ..extensions import db
+
+class OccupancyEvent(db.Model):
+    __tablename__ = "occupancy_events"
+    __table_args__ = (
+        db.Index("ix_occupancy_events_day_at", "day", "at_ms"),
+        db.Index("ix_occupancy_events_spot_at", "spot_id", "at_ms"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Integer, nullable=False)
+    at_ms = db.Column(db.Integer, nullable=False)
+    spot_id = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    source = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<OccupancyEvent spot={self.spot_id} at={self.at_ms} state={self.state}>"
@@ -0,0 +1,28 @@
+"""
+Modelul OccupancyHourly (rollup pentru statisticile de ocupare).
+
+- Structura tabelei `occupancy_hourly`:
+    - parking_lot: VARCHAR, PK (numele parcarii, ca in parking_spots.parking_lot)
+    - hour_start: DATETIME, PK (inceputul orei, ex: 2026-01-17 10:00:00)
+    - hour: INTEGER (0..23, copie a orei din hour_start pentru GROUP BY)
+    - minutes: INTEGER (minute rezervate in acea ora, insumate pe toate locurile)
+
+Tabela contine doar rezervarile terminate (status 'finished'); se actualizeaza
+incremental cand o rezervare se termina sau este anulata si poate fi
+reconstruita de la zero cu `python rebuild_occupancy_rollup.py`.
+"""
+
+from ..extensions import db
+
+class OccupancyHourly(db.Model):
+    __tablename__ = "occupancy_hourly"
+    # PK-ul incepe cu parcarea; statisticile globale filtreaza doar pe ora
+    __table_args__ = (db.Index("ix_occupancy_hourly_hour_start", "hour_start"),)
+
+    parking_lot = db.Column(db.String(100), primary_key=True)
+    hour_start = db.Column(db.DateTime, primary_key=True)
+    hour = db.Column(db.Integer, nullable=False)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<OccupancyHourly {self.parking_lot} {self.hour_start} {self.minutes}min>"
@@ -17,9 +17,16 @@ from ..extensions import db
 from datetime import datetime
 from app.extensions import db
 from app.utils.constants import SPOT_STATUSES
+from app.utils.geojson import load_geometry
 
 class ParkingSpot(db.Model):
     __tablename__ = "parking_spots"
+    __table_args__ = (
+        # filtrele pe parcare (+ starea de ocupare)
+        db.Index("ix_parking_spots_lot_occupied", "parking_lot", "is_occupied"),
+        # "un singur loc ocupat per user" si join-ul no-show pe email
+        db.Index("ix_parking_spots_occupied_by", "occupied_by_email", "is_occupied"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -38,6 +45,9 @@ class ParkingSpot(db.Model):
     # Informații despre rezervare (dacă există)
     reservation_start_time = db.Column(db.DateTime, nullable=True)  # Ora de început a rezervării
     reservation_end_time = db.Column(db.DateTime, nullable=True)  # Ora de plecare a rezervării
+
+    # Momentul ultimei citiri de senzor aplicate (citirile mai vechi sunt ignorate)
+    sensor_reading_at = db.Column(db.DateTime, nullable=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -54,12 +64,8 @@ class ParkingSpot(db.Model):
     
     def to_dict(self):
         """Convertește modelul la dicționar pentru API response"""
-        try:
-            import ast
-            poly = ast.literal_eval(self.polygon_geojson) if self.polygon_geojson else None
-        except Exception:
-            poly = self.polygon_geojson
-        
+        poly = load_geometry(self.polygon_geojson)
+
         return {
             'id': self.id,
             'parking_lot': self.parking_lot,
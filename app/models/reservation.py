@@ -8,6 +8,10 @@ Modelul Reservation.
     - start_time: DATETIME (începutul rezervării)
     - end_time: DATETIME (sfârșitul rezervării)
     - status: VARCHAR (ex: 'active', 'cancelled', 'finished')
+- Indecși compuși pentru verificările de suprapunere, fereastra de rezervare
+  a locului și sweep-urile de expirare / no-show (vezi check_query_plans.py).
+- version: versiunea din spot_changes a ultimei modificări (creare, anulare,
+  finalizare); GET /reservations/my?since=<version> întoarce doar ce s-a schimbat.
 
 TODO (Task 9):
 - Logica pentru creare/anulare rezervări + validări (interval valid, disponibilitate spot).
@@ -23,6 +27,22 @@ from sqlalchemy import and_
 
 class Reservation(db.Model):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # spot_overlaps, fereastra locului, toggle (activă acum / următoarea)
+        db.Index("ix_reservations_spot_status_start", "spot_id", "status", "start_time", "end_time"),
+        # user_old_reservation_overlaps
+        db.Index("ix_reservations_user_status_start", "user_id", "status", "start_time", "end_time"),
+        # sweep-ul de expirare (status='active' AND end_time <= now)
+        db.Index("ix_reservations_status_end", "status", "end_time", "spot_id"),
+        # sweep-ul de no-show (status='active' AND start_time <= cutoff)
+        db.Index("ix_reservations_status_start", "status", "start_time", "spot_id"),
+        # istoricul user-ului, paginat dupa (start_time, id)
+        db.Index("ix_reservations_user_start_id", "user_id", "start_time", "id"),
+        # rezervarile user-ului schimbate dupa o versiune
+        db.Index("ix_reservations_user_version", "user_id", "version"),
+        # termenele de expirare: MAX(version) si rezervarile schimbate dupa el
+        db.Index("ix_reservations_version", "version"),
+    )
 
     # TODO (Task 2, 9, 10): definește coloanele și relațiile
     id = db.Column(db.Integer, primary_key=True)
@@ -32,6 +52,7 @@ class Reservation(db.Model):
     end_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), nullable=False, default="active")
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    version = db.Column(db.Integer, nullable=True)
 
     def __repr__(self):
         return f"<Reservation user={self.user_id} spot={self.spot_id} {self.start_time}-{self.end_time}>"
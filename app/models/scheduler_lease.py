@@ -0,0 +1,23 @@
+"""
+Modelul SchedulerLease.
+
+- Structura tabelei `scheduler_leases`:
+    - name: VARCHAR, PK (numele job-ului, ex: "reservation_sweeps")
+    - owner: VARCHAR (procesul care detine lease-ul: host:pid:token)
+    - expires_at: DATETIME (dupa acest moment alt proces poate prelua job-ul)
+
+Cand ruleaza mai multe procese worker, doar detinatorul lease-ului executa
+job-ul periodic; ceilalti doar incearca sa-l preia dupa expirare.
+"""
+
+from ..extensions import db
+
+class SchedulerLease(db.Model):
+    __tablename__ = "scheduler_leases"
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} owner={self.owner} until={self.expires_at}>"
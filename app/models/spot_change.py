@@ -0,0 +1,27 @@
+"""
+Modelul SpotChange (jurnalul de modificari pentru locurile de parcare).
+
+- Structura tabelei `spot_changes`:
+    - version: INTEGER, PK, auto-increment (versiunea globala de schimbare)
+    - spot_id: INTEGER (locul modificat; fara FK, ca sa ramana si dupa stergere)
+    - created_at: DATETIME
+
+Fiecare modificare a unui loc sau a unei rezervari adauga un rand aici, in
+aceeasi tranzactie cu modificarea. Clientii cer apoi doar ce s-a schimbat
+dupa o anumita versiune (GET /parking/spots?since=<version>).
+"""
+
+from datetime import datetime
+from ..extensions import db
+
+class SpotChange(db.Model):
+    __tablename__ = "spot_changes"
+    # AUTOINCREMENT: versiunile nu se refolosesc niciodata, nici dupa stergeri
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version = db.Column(db.Integer, primary_key=True)
+    spot_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SpotChange v={self.version} spot={self.spot_id}>"
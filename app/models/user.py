@@ -17,6 +17,10 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(120), nullable=False)
     role = db.Column(db.String(20), nullable=False, default="student")
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # cate rezervari are (orice status), tinut la zi la fiecare rezervare noua;
+    # NULL = necunoscut (useri mai vechi decat coloana, scripturi de seed),
+    # se numara o data la prima citire (vezi count_user_reservations)
+    reservation_count = db.Column(db.Integer, nullable=True, default=0)
 
     # relatia cu tabela rezervari, 1 -> N: 
     reservations = db.relationship(
@@ -27,6 +27,8 @@ def create_parking_lot():
     from app.extensions import db
     from app.models.parking_lot import ParkingLot
     from app.models.parking_spot import ParkingSpot
+    from app.services.change_feed import record_spot_changes
+    from app.utils.geojson import dump_geometry
     import math
 
     if not current_user or getattr(current_user, 'role', None) != 'admin':
@@ -95,7 +97,7 @@ def create_parking_lot():
         'lat_center': lat_center,
         'lng_center': lng_center,
         'total_spots': total_spots,
-        'polygon_geojson': str(polygon_geojson)
+        'polygon_geojson': dump_geometry(polygon_geojson)
     }
 
     try:
@@ -164,32 +166,75 @@ def create_parking_lot():
             latitude=lat,
             longitude=lng,
             is_occupied=False,
-            polygon_geojson=str(spot_polygon)
+            polygon_geojson=dump_geometry(spot_polygon)
         )
         spots.append(spot)
         db.session.add(spot)
         created += 1
 
+    db.session.flush()
+    record_spot_changes([s.id for s in spots])
     db.session.commit()
 
     return jsonify({"success": True, "lot_id": lot.id, "created_spots": created}), 201
 
 
+@admin_bp.route("/metrics", methods=["GET"])
+@login_required
+def metrics():
+    """
+    Metrici interne pentru monitorizare (doar admin).
+
+    Răspuns 200 (exemplu):
+    {
+      "spot_cache": { "entries": 89, "hit_ratio": 0.98, "rebuilds": 12, "last_rebuild_ms": 0.4, ... },
+      "stats_cache": { "entries": 3, "hits": 950, "misses": 12, "coalesced": 38, "evictions": 0, ... },
+      "admin_stats_cache": { ... },
+      "write_behind": { "enabled": false, "pending": 0, "flushes": 0, ... }
+    }
+    """
+    from flask import jsonify
+    from app.services.spot_cache import spot_cache
+    from app.services.parking_service import admin_stats_cache, stats_cache
+    from app.services.write_behind import write_behind
+
+    if getattr(current_user, 'role', None) != 'admin':
+        return jsonify({"error": "FORBIDDEN"}), 403
+
+    return jsonify({
+        "spot_cache": spot_cache.stats(),
+        "stats_cache": stats_cache.stats(),
+        "admin_stats_cache": admin_stats_cache.stats(),
+        "write_behind": write_behind.stats(),
+    }), 200
+
+
 @admin_bp.route("/stats", methods=["GET"])
+@login_required
 def stats():
     """
-    TODO (Task 11): Statistici pentru admin.
+    Statistici pentru admin, globale sau pentru o parcare (?lot=<nume>).
+    Rezultatul este ținut în cache ADMIN_STATS_TTL_SECONDS secunde per parcare
+    și invalidat la orice modificare de loc / rezervare.
 
     Răspuns 200 (exemplu):
     {
+      "parking_lot": null,
       "total_spots": 120,
       "free_spots": 40,
       "occupied_spots": 60,
       "reserved_spots": 15,
-      "out_of_service_spots": 5,
       "active_reservations": 10,
       "finished_reservations": 120,
-      "cancelled_reservations": 8
+      "cancelled_reservations": 8,
+      "updated_at": "2026-01-17T10:00:00"
     }
     """
-    return {"message": "stats – TODO Task 11"}, 501
+    from flask import jsonify, request
+    from app.services.parking_service import admin_stats_cache, get_admin_stats
+
+    if getattr(current_user, 'role', None) != 'admin':
+        return jsonify({"error": "FORBIDDEN"}), 403
+
+    lot = request.args.get("lot") or None
+    return jsonify(admin_stats_cache.get(lot, lambda: get_admin_stats(lot))), 200
@@ -4,13 +4,25 @@ Endpoint-uri pentru parcări și locuri de parcare.
 TODO (Task 8):
 - Filtrare după numele parking lot / număr locuri libere.
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_login import login_required, current_user
-from app.models import ParkingSpot, ParkingLot, Reservation
+from app.models import ParkingSpot, ParkingLot
 from app.extensions import db
-from app.services.parking_service import get_parking_stats, get_hourly_occupancy_probability
-from app.services.reservation_service import finalize_expired_reservations, cancel_no_show_reservations
-from datetime import datetime
+from app.services.parking_service import (
+    get_parking_stats, get_hourly_occupancy_probability, get_weekly_occupancy_heatmap,
+    get_free_spot_forecast, stats_cache, toggle_spot,
+)
+from app.services.change_feed import record_spot_change, record_spot_changes, get_spot_changes
+from app.services.spot_events import broker as spot_events
+from app.services.spot_cache import spot_cache
+from app.services.occupancy_rollup import rename_lot_in_rollup, delete_lot_from_rollup
+from app.services.reservation_service import find_free_spots, parse_iso, recheck_no_shows, reserve_best_spot
+from app.services.interval_index import interval_index
+from app.services.free_slots import get_lot_availability, get_spot_free_slots
+from app.services.write_behind import write_behind
+from app.services.occupancy_log import SOURCE_ADMIN, event_row, log_occupancy
+from app.utils.geojson import dump_geometry, load_geometry
+from datetime import date, datetime, timedelta
 
 parking_bp = Blueprint("parking", __name__)
 
@@ -20,12 +32,7 @@ def get_lots():
         lots = ParkingLot.query.all()
         result = []
         for lot in lots:
-            # attempt to parse polygon json if stored as string
-            try:
-                import ast
-                poly = ast.literal_eval(lot.polygon_geojson) if lot.polygon_geojson else None
-            except Exception:
-                poly = lot.polygon_geojson
+            poly = load_geometry(lot.polygon_geojson)
 
             result.append({
                 'id': lot.id,
@@ -55,9 +62,14 @@ def modify_lot(lot_id):
 
     if request.method == 'DELETE':
         try:
+            removed_ids = [s.id for s in ParkingSpot.query.filter_by(parking_lot=lot.name).all()]
+            removed_ids += [s.id for s in lot.spots]
             ParkingSpot.query.filter_by(parking_lot=lot.name).delete()
+            delete_lot_from_rollup(lot.name)
             db.session.delete(lot)
+            record_spot_changes(removed_ids)
             db.session.commit()
+            spot_cache.invalidate(removed_ids)
             return jsonify({'success': True}), 200
         except Exception as e:
             db.session.rollback()
@@ -75,6 +87,7 @@ def modify_lot(lot_id):
 
         if name:
             lot.name = name
+            rename_lot_in_rollup(old_name, name)
             regen = True
 
         if total_spots is not None:
@@ -113,7 +126,7 @@ def modify_lot(lot_id):
                     [min_lng, min_lat]
                 ]]
             }
-            lot.polygon_geojson = str(polygon_geojson)
+            lot.polygon_geojson = dump_geometry(polygon_geojson)
             lot.lat_center = (min_lat + max_lat) / 2.0
             lot.lng_center = (min_lng + max_lng) / 2.0
             regen = True
@@ -121,14 +134,15 @@ def modify_lot(lot_id):
         db.session.commit()
 
         if regen:
+            old_ids = [s.id for s in ParkingSpot.query.filter_by(parking_lot=old_name).all()]
             ParkingSpot.query.filter_by(parking_lot=old_name).delete()
+            record_spot_changes(old_ids)
             db.session.commit()
 
             import math
             min_lat, max_lat = None, None
             try:
-                import ast
-                poly = ast.literal_eval(lot.polygon_geojson) if lot.polygon_geojson else None
+                poly = load_geometry(lot.polygon_geojson)
                 if poly and 'coordinates' in poly and poly['coordinates']:
                     coords = poly['coordinates'][0]
                     lngs = [c[0] for c in coords]
@@ -147,6 +161,7 @@ def modify_lot(lot_id):
             columns_val = int(lot.columns or 1)
             rows = math.ceil(int(lot.total_spots) / columns_val)
             created = 0
+            new_spots = []
             for idx in range(int(lot.total_spots)):
                 r = idx // columns_val
                 c = idx % columns_val
@@ -182,16 +197,24 @@ def modify_lot(lot_id):
                     latitude=lat,
                     longitude=lng,
                     is_occupied=False,
-                    polygon_geojson=str(spot_polygon)
+                    polygon_geojson=dump_geometry(spot_polygon)
                 )
                 db.session.add(sp)
+                new_spots.append(sp)
                 created += 1
+            db.session.flush()
+            record_spot_changes([sp.id for sp in new_spots])
             db.session.commit()
 
         if name and not regen:
+            renamed_ids = [s.id for s in ParkingSpot.query.filter_by(parking_lot=old_name).all()]
             ParkingSpot.query.filter_by(parking_lot=old_name).update({'parking_lot': name})
+            record_spot_changes(renamed_ids)
             db.session.commit()
 
+        spot_cache.invalidate_lot(old_name)
+        spot_cache.invalidate_lot(lot.name)
+
         return jsonify({'success': True, 'lot_id': lot.id}), 200
     except Exception as e:
         db.session.rollback()
@@ -201,15 +224,45 @@ def modify_lot(lot_id):
 def manage_spots():
     """
     GET: Returnează lista de locuri de parcare (parking spots).
-    
+         Versiunea curentă este trimisă în header-ul `X-Spots-Version`.
+
+    GET ?since=<version>: Returnează doar locurile modificate după versiunea dată:
+    {
+      "version": 42,
+      "since": 40,
+      "full": false,
+      "spots": [ ...spot.to_dict()... ],
+      "deleted": [17, 18]
+    }
+    Dacă `since` este mai mare decât versiunea serverului (ex: baza de date a fost
+    recreată), se trimite lista completă cu "full": true.
+
     POST: Adaugă un nou loc de parcare.
     """
     if request.method == "GET":
         try:
-            finalize_expired_reservations()
-            cancel_no_show_reservations()
-            spots = ParkingSpot.query.all()
-            return jsonify([spot.to_dict() for spot in spots]), 200
+            since = request.args.get("since", type=int)
+            if since is None:
+                # payload-ul este servit din cache-ul de fragmente serializate
+                version, body = spot_cache.get_payload(write_behind.overlay())
+                resp = Response(body, mimetype="application/json")
+                resp.headers["X-Spots-Version"] = str(version)
+                return resp, 200
+
+            version, spots, deleted = get_spot_changes(since)
+            full = since > version
+            if full:
+                spots = ParkingSpot.query.all()
+                deleted = []
+
+            overlay = write_behind.overlay()
+            return jsonify({
+                "version": version,
+                "since": since,
+                "full": full,
+                "spots": [{**spot.to_dict(), **overlay.get(spot.id, {})} for spot in spots],
+                "deleted": deleted,
+            }), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -230,6 +283,8 @@ def manage_spots():
             )
             
             db.session.add(new_spot)
+            db.session.flush()
+            record_spot_change(new_spot.id)
             db.session.commit()
             
             return jsonify({
@@ -241,6 +296,31 @@ def manage_spots():
             return jsonify({"error": str(e)}), 500
 
 
+@parking_bp.route("/spots/stream", methods=["GET"])
+def spots_stream():
+    """
+    Server-Sent Events cu schimbarile de stare ale locurilor (ocupare, fereastra
+    de rezervare, contoare per parcare).
+
+    Evenimente:
+    - `hello`: versiunea curenta la conectare
+    - `spots`: { "version", "since", "spots": [...], "deleted": [...], "lots": {...}, "global": {...} }
+    - `reset`: clientul trebuie sa reincarce lista completa (GET /parking/spots)
+    La reconectare, browser-ul trimite `Last-Event-ID` si fluxul continua de acolo
+    (sau `?last_event_id=<version>`).
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        last_id = None
+
+    return Response(
+        spot_events.stream(last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @parking_bp.route('/spots/<int:spot_id>', methods=['PUT', 'DELETE'])
 @login_required
 def modify_spot(spot_id):
@@ -254,7 +334,9 @@ def modify_spot(spot_id):
     if request.method == 'DELETE':
         try:
             db.session.delete(spot)
+            record_spot_change(spot_id)
             db.session.commit()
+            spot_cache.invalidate([spot_id])
             return jsonify({'success': True}), 200
         except Exception as e:
             db.session.rollback()
@@ -271,9 +353,16 @@ def modify_spot(spot_id):
         if 'longitude' in data:
             spot.longitude = float(data.get('longitude'))
         if 'is_occupied' in data:
-            spot.is_occupied = bool(data.get('is_occupied'))
-
+            is_occupied = bool(data.get('is_occupied'))
+            if is_occupied != spot.is_occupied:
+                log_occupancy([event_row(spot.id, is_occupied, datetime.now(), current_user.id, SOURCE_ADMIN)])
+            spot.is_occupied = is_occupied
+
+        record_spot_change(spot.id)
+        if not spot.is_occupied:
+            recheck_no_shows([spot.id])
         db.session.commit()
+        spot_cache.invalidate([spot.id])
         return jsonify({'success': True, 'spot': spot.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
@@ -282,125 +371,333 @@ def modify_spot(spot_id):
 @parking_bp.route('/spots/<int:spot_id>/toggle', methods=['POST'])
 def toggle_spot_occupancy(spot_id):
     """
-    Toggle ocupare loc de parcare.
-    - Dacă e liber, utilizatorul curent îl ocupă (doar dacă nu ocupă deja alt loc)
+    Toggle ocupare loc de parcare, atomic (un singur UPDATE condiționat).
+    - Dacă e liber, utilizatorul curent îl ocupă (doar dacă nu ocupă deja alt loc
+      și nu e rezervat acum de altcineva)
     - Dacă e ocupat de el, îl eliberează
-    - Dacă e ocupat de altcineva, eroare 403
+    - Altfel răspunsul spune exact de ce nu s-a putut:
+      404 NOT_FOUND, 403 OCCUPIED_BY_ANOTHER_USER / RESERVED_FOR_ANOTHER_USER,
+      409 ALREADY_OCCUPYING_ANOTHER_SPOT / TOGGLE_CONFLICT
     """
     if not current_user.is_authenticated:
         return jsonify({
             "error": "UNAUTHORIZED",
             "message": "Este necesar sa te loghezi pentru aceasta actiune"
         }), 401
-    spot = ParkingSpot.query.get_or_404(spot_id)
-
-    finalize_expired_reservations()
-    cancel_no_show_reservations()
 
     now = datetime.now()
+    try:
+        is_occupied = toggle_spot(current_user, spot_id, now)
+    except ValueError as e:
+        return _toggle_rejected(str(e), spot_id, now)
 
-    # Daca locul e liber, il poate ocupa oricine
-    if not spot.is_occupied:
-        active_res = (
-            Reservation.query
-            .filter(
-                Reservation.spot_id == spot.id,
-                Reservation.status == "active",
-                Reservation.start_time <= now,
-                Reservation.end_time > now,
-            )
-            .order_by(Reservation.start_time.asc())
-            .first()
-        )
+    payload = {
+        'success': True,
+        'spot_id': spot_id,
+        'is_occupied': is_occupied,
+        'occupied_by_email': current_user.email if is_occupied else None
+    }
+
+    # daca urmeaza o rezervare, userul poate parca, dar primeste un warning
+    upcoming_res = interval_index.next(spot_id, now) if is_occupied else None
+    if upcoming_res:
+        payload["warning"] = {
+            "type": "UPCOMING_RESERVATION",
+            "message": f"Acest loc are o rezervare la {upcoming_res.start_time.isoformat()}. Te rugăm să eliberezi înainte de start.",
+            "must_leave_before": upcoming_res.start_time.isoformat(),
+            "reservation_end": upcoming_res.end_time.isoformat(),
+        }
 
-        if active_res and active_res.user_id != current_user.id and getattr(current_user, "role", None) != "admin":
-            return jsonify({
-                "error": "RESERVED_FOR_ANOTHER_USER",
-                "message": "Loc rezervat: doar persoana care a făcut rezervarea poate parca acum.",
-                "reservation": {
-                    "start_time": active_res.start_time.isoformat(),
-                    "end_time": active_res.end_time.isoformat(),
-                }
-            }), 403
-
-        # daca urmeaza o rezervare, permite altui user sa parcheze, dar primeste un warning
-        upcoming_res = (
-            Reservation.query
-            .filter(
-                Reservation.spot_id == spot.id,
-                Reservation.status == "active",
-                Reservation.start_time > now,
-            )
-            .order_by(Reservation.start_time.asc())
-            .first()
-        )
+    return jsonify(payload), 200
 
-        # existing “one occupied spot per user” check
-        occupied_spots = ParkingSpot.query.filter_by(
-            occupied_by_email=current_user.email,
-            is_occupied=True
-        ).first()
-        if occupied_spots:
-            return jsonify({
-                'error': f'Ocupi deja locul {occupied_spots.parking_lot} #{occupied_spots.spot_number}. Eliberează-l înainte de a ocupa altul!'
-            }), 409
+def _toggle_rejected(code, spot_id, now):
+    if code == "SPOT_NOT_FOUND":
+        return jsonify({"error": "NOT_FOUND"}), 404
 
-        spot.is_occupied = True
-        spot.occupied_by_email = current_user.email
-        db.session.commit()
+    if code == "OCCUPIED_BY_ANOTHER_USER":
+        return jsonify({"error": code, "message": "Locul este ocupat de altă persoană."}), 403
 
-        payload = {
-            'success': True,
-            'spot_id': spot.id,
-            'is_occupied': spot.is_occupied,
-            'occupied_by_email': spot.occupied_by_email
+    if code == "RESERVED_FOR_ANOTHER_USER":
+        body = {
+            "error": code,
+            "message": "Loc rezervat: doar persoana care a făcut rezervarea poate parca acum.",
         }
-
-        if upcoming_res:
-            payload["warning"] = {
-                "type": "UPCOMING_RESERVATION",
-                "message": f"Acest loc are o rezervare la {upcoming_res.start_time.isoformat()}. Te rugăm să eliberezi înainte de start.",
-                "must_leave_before": upcoming_res.start_time.isoformat(),
-                "reservation_end": upcoming_res.end_time.isoformat(),
+        active_res = interval_index.current(spot_id, now)
+        if active_res:
+            body["reservation"] = {
+                "start_time": active_res.start_time.isoformat(),
+                "end_time": active_res.end_time.isoformat(),
             }
+        return jsonify(body), 403
 
-        return jsonify(payload), 200
+    if code == "ALREADY_OCCUPYING_ANOTHER_SPOT":
+        spot = ParkingSpot.query.filter_by(occupied_by_email=current_user.email, is_occupied=True).first()
+        where = f" {spot.parking_lot} #{spot.spot_number}" if spot else ""
+        return jsonify({
+            "error": code,
+            "message": f"Ocupi deja locul{where}. Eliberează-l înainte de a ocupa altul!",
+        }), 409
 
-    else:
-        # Daca e ocupat, doar ocupantul poate elibera
-        if spot.occupied_by_email != current_user.email:
-            return jsonify({'error': 'Spot already occupied by another user'}), 403
-        spot.is_occupied = False
-        spot.occupied_by_email = None
+    return jsonify({"error": code, "message": "Locul s-a schimbat între timp, încearcă din nou."}), 409
 
-    db.session.commit()
-    return jsonify({
-        'success': True,
-        'spot_id': spot.id,
-        'is_occupied': spot.is_occupied,
-        'occupied_by_email': spot.occupied_by_email
-    }), 200
+STATS_ANALYSIS_DAYS = 7
+
+def _build_parking_stats(lot, hour, days):
+    base = get_parking_stats(lot)
+
+    hourly = get_hourly_occupancy_probability(lot, days=days)
+    base["hourly_occupancy_probability"] = hourly
+    base["analysis_days"] = days
+
+    if hour is not None:
+        match = next((x for x in hourly if x["hour"] == hour), None)
+        base["selected_hour"] = hour
+        base["selected_hour_probability_percent"] = (
+            match["percent"] if match else 0.0
+        )
+    return base
 
 @parking_bp.route("/stats", methods=["GET"])
 def parking_stats():
+    """
+    Statistici curente + probabilitatea orară de ocupare pe ultimele 7 zile.
+    Răspunsul e ținut câteva secunde în `stats_cache`, cheie (lot, hour, zile);
+    cererile simultane pentru aceeași cheie așteaptă un singur calcul.
+    """
     try:
-        lot = request.args.get("lot")
+        lot = request.args.get("lot") or None
         hour = request.args.get("hour", type=int)  # <-- ADĂUGAT
+        days = STATS_ANALYSIS_DAYS
+
+        base = stats_cache.get(
+            (lot, hour, days),
+            lambda: _build_parking_stats(lot, hour, days),
+        )
+        return jsonify(base), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        base = get_parking_stats(lot)
+HEATMAP_DEFAULT_DAYS = 28
+HEATMAP_MAX_DAYS = 120  # un semestru
 
-        hourly = get_hourly_occupancy_probability(lot, days=7)
-        base["hourly_occupancy_probability"] = hourly
-        base["analysis_days"] = 7
+@parking_bp.route("/stats/heatmap", methods=["GET"])
+def parking_stats_heatmap():
+    """
+    Probabilitatea de ocupare pe zi a săptămânii x oră (7 x 24).
+
+    Query: ?lot=<nume>&days=<1..120, implicit 28>
+
+    Răspuns 200 (exemplu):
+    {
+      "parking_lot": "Parcare Precis",
+      "analysis_days": 28,
+      "total_spots": 54,
+      "weekdays": ["Mon", ..., "Sun"],
+      "p": [[0.0, ..., 0.41, ...], ...],        # 7 rânduri x 24 ore
+      "percent": [[0.0, ..., 41.0, ...], ...],
+      "updated_at": "2026-01-17T10:00:00"
+    }
+    """
+    lot = request.args.get("lot") or None
+    days = request.args.get("days", HEATMAP_DEFAULT_DAYS, type=int)
+    if days is None or not 1 <= days <= HEATMAP_MAX_DAYS:
+        return jsonify({
+            "error": "INVALID_DATA",
+            "message": f"'days' trebuie să fie între 1 și {HEATMAP_MAX_DAYS}.",
+        }), 400
 
-        if hour is not None:
-            match = next((x for x in hourly if x["hour"] == hour), None)
-            base["selected_hour"] = hour
-            base["selected_hour_probability_percent"] = (
-                match["percent"] if match else 0.0
-            )
+    try:
+        heatmap = stats_cache.get(
+            ("heatmap", lot, days),
+            lambda: get_weekly_occupancy_heatmap(lot, days),
+        )
+        return jsonify(heatmap), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(base), 200
+FORECAST_DEFAULT_HOURS = 24
+FORECAST_MAX_HOURS = 168
+
+@parking_bp.route("/forecast", methods=["GET"])
+def parking_forecast():
+    """
+    Prognoza locurilor libere pentru următoarele `hours` ore, per parcare.
+    Combină rezervările active deja făcute cu profilul istoric zi x oră
+    al parcării (ultimele 28 de zile, precalculat).
+
+    Query: ?lot=<nume>&hours=<1..168, implicit 24>
+
+    Răspuns 200 (exemplu):
+    {
+      "generated_at": "2026-01-17T09:12:00",
+      "hours": 24,
+      "profile_days": 28,
+      "lots": {
+        "Parcare Precis": [
+          { "hour_start": "2026-01-17T09:00:00", "booked": 3.5, "expected_occupied": 21.6,
+            "expected_free": 32.4, "total_spots": 54 },
+          ...
+        ]
+      }
+    }
+    """
+    lot = request.args.get("lot") or None
+    hours = request.args.get("hours", FORECAST_DEFAULT_HOURS, type=int)
+    if hours is None or not 1 <= hours <= FORECAST_MAX_HOURS:
+        return jsonify({
+            "error": "INVALID_DATA",
+            "message": f"'hours' trebuie să fie între 1 și {FORECAST_MAX_HOURS}.",
+        }), 400
+
+    try:
+        forecast = stats_cache.get(
+            ("forecast", lot, hours),
+            lambda: get_free_spot_forecast(lot, hours),
+        )
+        return jsonify(forecast), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@parking_bp.route("/availability", methods=["GET", "POST"])
+def availability():
+    """
+    GET: locurile libere dintr-o parcare pentru un interval (o singură interogare).
+
+    Query: ?lot=<nume>&start=2025-11-24T10:00:00&end=2025-11-24T12:00:00&count=<opțional>
+
+    Răspuns 200 (exemplu):
+    {
+      "parking_lot": "Parcare Precis",
+      "start_time": "2025-11-24T10:00:00",
+      "end_time": "2025-11-24T12:00:00",
+      "count": 2,
+      "spot_ids": [12, 7]      # cel mai potrivit primul
+    }
+
+    POST (autentificat): rezervă atomic cel mai potrivit loc liber.
+    Request JSON: { "lot": "Parcare Precis", "start_time": "...", "end_time": "..." }
+    Răspuns 201: rezervarea creată (ca POST /reservations/).
+    Erori: 400 interval invalid, 409 NO_SPOT_AVAILABLE / EXISTING_RESERVATION_OVERLAP.
+    """
+    if request.method == "POST":
+        if not current_user.is_authenticated:
+            return jsonify({"error": "UNAUTHORIZED"}), 401
+
+        data = request.get_json() or {}
+        lot = data.get("lot")
+        start_time = data.get("start_time")
+        end_time = data.get("end_time")
+        if not lot or not start_time or not end_time:
+            return jsonify({"error": "INVALID_DATA", "message": "lot, start_time, end_time required"}), 400
+
+        try:
+            r = reserve_best_spot(current_user, lot, start_time, end_time)
+        except ValueError as e:
+            code = str(e)
+            if code in ("INVALID_DATETIME", "INVALID_TIMEFRAME"):
+                return jsonify({"error": code}), 400
+            if code in ("NO_SPOT_AVAILABLE", "EXISTING_RESERVATION_OVERLAP"):
+                return jsonify({"error": code}), 409
+            return jsonify({"error": "BAD_REQUEST"}), 400
+
+        return jsonify({
+            "id": r.id,
+            "user_id": r.user_id,
+            "spot_id": r.spot_id,
+            "start_time": r.start_time.isoformat(),
+            "end_time": r.end_time.isoformat(),
+            "status": r.status,
+        }), 201
+
+    lot = request.args.get("lot")
+    count = request.args.get("count", type=int)
+    if not lot or not request.args.get("start") or not request.args.get("end"):
+        return jsonify({"error": "INVALID_DATA", "message": "lot, start, end required"}), 400
+    if "count" in request.args and (count is None or count < 1):
+        return jsonify({"error": "INVALID_DATA", "message": "'count' trebuie să fie cel puțin 1."}), 400
+    try:
+        start = parse_iso(request.args.get("start"))
+        end = parse_iso(request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "INVALID_DATETIME"}), 400
+    if start >= end:
+        return jsonify({"error": "INVALID_TIMEFRAME"}), 400
+
+    user_email = current_user.email if current_user.is_authenticated else None
+    spot_ids = find_free_spots(lot, start, end, limit=count, user_email=user_email)
+    return jsonify({
+        "parking_lot": lot,
+        "start_time": start.isoformat(),
+        "end_time": end.isoformat(),
+        "count": len(spot_ids),
+        "spot_ids": spot_ids,
+    }), 200
+
+FREE_SLOTS_MAX_DAYS = 7
+
+@parking_bp.route("/free-slots", methods=["GET"])
+def free_slots():
+    """
+    Intervalele libere ale unui loc sau numărul de locuri libere dintr-o parcare,
+    pe zile (din rezervările active).
+
+    Query: ?spot_id=<id> SAU ?lot=<nume>, &date=YYYY-MM-DD (implicit azi), &days=<1..7, implicit 1>
+
+    Răspuns 200 pentru un loc (exemplu):
+    {
+      "spot_id": 10,
+      "days": [
+        { "date": "2025-11-24",
+          "free": [ { "start": "2025-11-24T00:00:00", "end": "2025-11-24T10:00:00" }, ... ] }
+      ]
+    }
+
+    Răspuns 200 pentru o parcare (exemplu):
+    {
+      "parking_lot": "Parcare Precis",
+      "total_spots": 54,
+      "days": [
+        { "date": "2025-11-24",
+          "segments": [ { "start": "...", "end": "...", "free_spots": 54 }, ... ] }
+      ]
+    }
+    """
+    spot_id = request.args.get("spot_id", type=int)
+    lot = request.args.get("lot") or None
+    if (spot_id is None) == (lot is None):
+        return jsonify({"error": "INVALID_DATA", "message": "spot_id or lot required (not both)"}), 400
+
+    days = request.args.get("days", 1, type=int)
+    if days is None or not 1 <= days <= FREE_SLOTS_MAX_DAYS:
+        return jsonify({
+            "error": "INVALID_DATA",
+            "message": f"'days' trebuie să fie între 1 și {FREE_SLOTS_MAX_DAYS}.",
+        }), 400
+    try:
+        first_day = date.fromisoformat(request.args["date"]) if request.args.get("date") else date.today()
+    except ValueError:
+        return jsonify({"error": "INVALID_DATETIME"}), 400
+    day_list = [first_day + timedelta(days=i) for i in range(days)]
+
+    if spot_id is not None:
+        if db.session.get(ParkingSpot, spot_id) is None:
+            return jsonify({"error": "NOT_FOUND"}), 404
+        return jsonify({
+            "spot_id": spot_id,
+            "days": [
+                {"date": day.isoformat(), "free": get_spot_free_slots(spot_id, day)}
+                for day in day_list
+            ],
+        }), 200
+
+    per_day = [get_lot_availability(lot, day) for day in day_list]
+    if per_day[0]["total_spots"] == 0:
+        return jsonify({"error": "NOT_FOUND"}), 404
+    return jsonify({
+        "parking_lot": lot,
+        "total_spots": per_day[-1]["total_spots"],
+        "days": [
+            {"date": day.isoformat(), "segments": availability["segments"]}
+            for day, availability in zip(day_list, per_day)
+        ],
+    }), 200
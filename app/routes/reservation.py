@@ -5,13 +5,17 @@ Endpoint-uri pentru rezervări.
 
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from app.models import Reservation
+from app.services.change_feed import current_version
 from app.services.reservation_service import (
     create_reservation as create_reservation_service,
     cancel_reservation as cancel_reservation_service,
-    get_user_reservations,
+    count_user_reservations,
+    get_user_reservations_changed,
+    get_user_reservations_page,
 )
-from app.services.reservation_service import finalize_expired_reservations, cancel_no_show_reservations
+
+# cel mult atatea rezervari pe pagina in GET /reservations/my
+MAX_PAGE_SIZE = 100
 
 
 reservation_bp = Blueprint("reservation", __name__)
@@ -50,8 +54,6 @@ def create_reservation():
         return jsonify({"error": "INVALID_DATA", "message": "spot_id, start_time, end_time required"}), 400
 
     try:
-        from app.services.reservation_service import finalize_expired_reservations, cancel_no_show_reservations
-
         r = create_reservation_service(current_user, int(spot_id), start_time, end_time)
         return jsonify({
             "id": r.id,
@@ -109,59 +111,70 @@ def cancel_reservation(reservation_id):
 @login_required
 def my_reservations():
     """
+    Query params:
+    - limit: rezervari pe pagina (implicit 5, maxim 100)
+    - cursor: `next_cursor` din pagina anterioara (paginare keyset pe start_time, id)
+    - since: o `version` primita anterior; intoarce doar rezervarile create sau
+      schimbate dupa ea (toate, fara paginare), iar daca nu s-a schimbat nimic
+      raspunsul nu atinge tabela reservations. Daca `since` e mai mare decat
+      versiunea serverului (ex: baza de date a fost recreata), se trimite prima
+      pagina, ca fara `since`, cu "reset": true: clientul isi reincarca lista
+
     Răspuns 200 (exemplu):
-    [
-      {
-        "id": 5,
-        "spot_id": 10,
-        "lot_id": 1,
-        "start_time": "...",
-        "end_time": "...",
-        "status": "finished"
-      },
-      ...
-    ]
+    {
+      "total": 12,
+      "version": 345,
+      "reset": false,
+      "next_cursor": "2025-11-24T10:00:00_5",
+      "items": [
+        {
+          "id": 5,
+          "spot_id": 10,
+          "start_time": "...",
+          "end_time": "...",
+          "status": "finished"
+        },
+        ...
+      ]
+    }
+
+    Erori:
+    - 400: limit / since / cursor invalid
     """
-    finalize_expired_reservations()
-    cancel_no_show_reservations()
-
-    # that is the old version, without a limit
-    # reservations = get_user_reservations(current_user.id)
-
-    # # Full history response (active/cancelled/finished)
-    # return jsonify([
-    #     {
-    #         "id": r.id,
-    #         "spot_id": r.spot_id,
-    #         "start_time": r.start_time.isoformat(),
-    #         "end_time": r.end_time.isoformat(),
-    #         "status": r.status,
-    #     }
-    #     for r in reservations
-    # ]), 200
-
-    limit = int(request.args.get("limit", 5))
-    offset = int(request.args.get("offset", 0))
-
-    q = (
-        Reservation.query
-        .filter_by(user_id=current_user.id)
-        .order_by(Reservation.start_time.desc())
-    )
-
-    total = q.count()
-    reservations = q.offset(offset).limit(limit).all()
+    try:
+        limit = min(max(int(request.args.get("limit", 5)), 1), MAX_PAGE_SIZE)
+        since = request.args.get("since")
+        since = int(since) if since is not None else None
+
+        # versiunea e citita inaintea rezervarilor: nimic din ce urmeaza nu e sarit
+        version = current_version()
+        next_cursor = None
+        reset = since is not None and since > version
+        if since is None or reset:
+            reservations, next_cursor = get_user_reservations_page(
+                current_user.id, limit, request.args.get("cursor"),
+            )
+        elif since < version:
+            reservations = get_user_reservations_changed(current_user.id, since, version)
+        else:
+            reservations = []
+    except ValueError as e:
+        return jsonify({"error": str(e) if str(e) == "INVALID_CURSOR" else "INVALID_DATA"}), 400
 
+    items = [
+        {
+            "id": r.id,
+            "spot_id": r.spot_id,
+            "start_time": r.start_time.isoformat(),
+            "end_time": r.end_time.isoformat(),
+            "status": r.status,
+        }
+        for r in reservations
+    ]
     return jsonify({
-        "total": total,
-        "items": [
-            {
-                "id": r.id,
-                "spot_id": r.spot_id,
-                "start_time": r.start_time.isoformat(),
-                "end_time": r.end_time.isoformat(),
-                "status": r.status,
-            }
-            for r in reservations
-        ]
+        "total": count_user_reservations(current_user),
+        "version": version,
+        "reset": reset,
+        "next_cursor": next_cursor,
+        "items": items,
     }), 200
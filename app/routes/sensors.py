@@ -0,0 +1,65 @@
+"""
+Endpoint-uri pentru senzorii de sol (ingestie in bloc a starii locurilor).
+
+Autentificare cu cheie: header `X-Sensor-Key`, una din `sensor_api_keys`
+din config.json. Fara chei configurate, endpoint-ul refuza orice cerere.
+"""
+
+import hmac
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.services.sensor_ingest import ingest_readings
+
+sensor_bp = Blueprint("sensors", __name__)
+
+def _valid_sensor_key(key: str | None) -> bool:
+    if not key:
+        return False
+    return any(
+        hmac.compare_digest(key.encode(), allowed.encode())
+        for allowed in current_app.config["SENSOR_API_KEYS"]
+    )
+
+@sensor_bp.route("/readings", methods=["POST"])
+def post_readings():
+    """
+    Request JSON (sau direct lista de citiri):
+    {
+      "readings": [
+        { "spot_id": 10, "occupied": true, "timestamp": "2025-11-24T08:00:03" },
+        { "spot_id": 11, "occupied": false, "timestamp": 1764043203 },
+        ...
+      ]
+    }
+
+    Pentru fiecare loc se aplica doar cea mai noua citire, si doar daca e mai
+    noua decat ultima aplicata; toate intr-un singur UPDATE. Cu write-behind
+    activ citirile sunt puse in buffer (raspunsul are si "buffered": true) si
+    ajung in baza la urmatorul flush.
+
+    Răspuns 200 (exemplu):
+    {
+      "received": 4000, "invalid": 0, "too_old": 3, "coalesced": 3500,
+      "applied": 480, "ignored": 17, "changed": 52
+    }
+
+    Erori:
+    - 401: cheie lipsă / invalidă
+    - 400: corp invalid
+    - 413: prea multe citiri într-un apel (`sensor_max_batch`)
+    """
+    if not _valid_sensor_key(request.headers.get("X-Sensor-Key")):
+        return jsonify({"error": "UNAUTHORIZED"}), 401
+
+    data = request.get_json(silent=True)
+    readings = data.get("readings") if isinstance(data, dict) else data
+    if not isinstance(readings, list):
+        return jsonify({"error": "INVALID_DATA", "message": "readings list required"}), 400
+
+    max_batch = current_app.config["SENSOR_MAX_BATCH"]
+    if len(readings) > max_batch:
+        return jsonify({"error": "BATCH_TOO_LARGE", "message": f"at most {max_batch} readings per call"}), 413
+
+    summary = ingest_readings(readings, current_app.config["SENSOR_MAX_READING_AGE_SECONDS"])
+    return jsonify(summary), 200
@@ -0,0 +1,111 @@
+# Jurnal global de versiuni pentru locurile de parcare.
+# Orice modificare de spot / rezervare inregistreaza spot_id-ul afectat,
+# iar clientii cer doar diferentele fata de ultima versiune vazuta.
+
+from app.extensions import db
+from app.models import ParkingSpot, SpotChange
+from datetime import datetime
+from sqlalchemy import DateTime, event, func, insert, literal
+from sqlalchemy.orm import Session
+
+# callback-uri apelate dupa ce o tranzactie cu modificari de spot a facut commit
+_commit_listeners = []
+
+def on_spot_changes_committed(callback) -> None:
+    """Registers `callback()` to run after every commit that recorded spot changes."""
+    if callback not in _commit_listeners:
+        _commit_listeners.append(callback)
+
+def run_after_commit(callback, session=None) -> None:
+    """
+    Runs `callback()` once, after the current transaction of `session`
+    commits; dropped if it rolls back. For in-memory side effects (caches,
+    deadline heap) of a unit of work whose commit may belong to the caller.
+    """
+    session = session or db.session
+    session.info.setdefault("after_commit_callbacks", []).append(callback)
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    for callback in session.info.pop("after_commit_callbacks", []):
+        callback()
+    if session.info.pop("spot_changes_pending", False):
+        for callback in _commit_listeners:
+            callback()
+
+@event.listens_for(Session, "after_rollback")
+def _clear_after_rollback(session):
+    session.info.pop("after_commit_callbacks", None)
+    session.info.pop("spot_changes_pending", None)
+
+def record_spot_changes(spot_ids, session=None) -> None:
+    """
+    Adds one change row per spot to the current session.
+    Does NOT commit: the row must land in the same transaction as the
+    mutation it describes, so the caller commits both together.
+    """
+    session = session or db.session
+    rows = [{"spot_id": sid} for sid in set(spot_ids) if sid is not None]
+    if not rows:
+        return
+    # un singur INSERT (executemany), oricate locuri ar fi
+    session.execute(insert(SpotChange), rows)
+    session.info["spot_changes_pending"] = True
+
+def record_spot_changes_from(spot_ids_select, session=None) -> list[int]:
+    """
+    `record_spot_changes` for the spot ids returned by a SELECT, as one
+    INSERT ... SELECT, without a round trip for the ids. Returns them.
+    Does NOT commit.
+    """
+    session = session or db.session
+    rows = spot_ids_select.add_columns(literal(datetime.utcnow(), DateTime))
+    spot_ids = session.execute(
+        insert(SpotChange)
+        .from_select(["spot_id", "created_at"], rows)
+        .returning(SpotChange.spot_id)
+    ).scalars().all()
+    if spot_ids:
+        session.info["spot_changes_pending"] = True
+    return spot_ids
+
+def record_spot_change(spot_id: int, session=None) -> None:
+    record_spot_changes([spot_id], session)
+
+def current_version(session=None) -> int:
+    """Latest committed change version (0 if nothing was ever recorded)."""
+    return (session or db.session).query(func.max(SpotChange.version)).scalar() or 0
+
+def get_changed_spot_ids(since: int, version: int, session=None) -> list[int]:
+    """Distinct spot ids touched by versions in (since, version]."""
+    return [
+        sid for (sid,) in
+        (session or db.session).query(SpotChange.spot_id)
+        .filter(SpotChange.version > since, SpotChange.version <= version)
+        .distinct()
+        .all()
+    ]
+
+def get_spot_changes(since: int):
+    """
+    Returns (version, changed_spots, deleted_ids) for everything after `since`.
+
+    A spot that appears in the log but no longer exists in `parking_spots`
+    is reported as a tombstone in `deleted_ids`.
+
+    SQLite allows a single writer at a time and version numbers are assigned
+    inside the writer's transaction, so versions become visible in order and
+    a client never skips a change by advancing to `version`.
+    """
+    version = current_version()
+    if since >= version:
+        return version, [], []
+
+    changed_ids = get_changed_spot_ids(since, version)
+    if not changed_ids:
+        return version, [], []
+
+    spots = ParkingSpot.query.filter(ParkingSpot.id.in_(changed_ids)).all()
+    alive = {s.id for s in spots}
+    deleted = sorted(sid for sid in changed_ids if sid not in alive)
+    return version, spots, deleted
@@ -0,0 +1,148 @@
+# Min-heap cu urmatoarele termene la care o rezervare poate expira:
+# - end_time                      -> finalize_expired_reservations
+# - start_time + TIME_LIMIT       -> cancel_no_show_reservations
+#
+# Scheduler-ul ruleaza sweep-urile doar cand un termen a venit efectiv si
+# doarme exact pana la urmatorul termen. Intre termene singura interogare este
+# MAX(reservations.version) (o citire din index); cand s-a miscat, sunt citite
+# doar rezervarile schimbate de atunci.
+
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Reservation
+
+class DeadlineQueue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []             # (deadline, reservation_id)
+        self._entries = Counter()   # reservation_id -> cate intrari are in heap
+        self._dropped = set()       # rezervari anulate (stergere lenesa din heap)
+        self._version = None        # MAX(reservations.version) aplicat deja
+        # setat cand apare un termen nou, ca scheduler-ul sa-si recalculeze somnul
+        self.changed = threading.Event()
+
+    @staticmethod
+    def _latest_version() -> int:
+        return db.session.query(db.func.max(Reservation.version)).scalar() or 0
+
+    def seed(self) -> None:
+        """Reloads every deadline of the ACTIVE reservations from the DB."""
+        from app.services.reservation_service import TIME_LIMIT
+
+        version = self._latest_version()
+        rows = (
+            Reservation.query
+            .with_entities(Reservation.id, Reservation.start_time, Reservation.end_time)
+            .filter(Reservation.status == "active")
+            .all()
+        )
+        grace = timedelta(minutes=TIME_LIMIT)
+        heap = []
+        for rid, start, end in rows:
+            heap.append((end, rid))
+            heap.append((start + grace, rid))
+        heapq.heapify(heap)
+
+        with self._lock:
+            self._heap = heap
+            self._entries = Counter({rid: 2 for rid, _, _ in rows})
+            self._dropped = set()
+            self._version = version
+
+    def sync(self) -> None:
+        """
+        Applies the reservations created, cancelled or finished since the last
+        sync (Reservation.version), possibly by another process. Toggles and
+        sensor flips do not move it, except a release of a spot whose running
+        reservation is past its grace period (see recheck_no_shows); deadlines
+        already popped for reservations that did not change are not pushed again.
+        """
+        version = self._latest_version()
+        if self._version is None or version < self._version:
+            # niciodata incarcat, sau baza a fost recreata
+            self.seed()
+            return
+        if version == self._version:
+            return
+
+        changed = (
+            Reservation.query
+            .with_entities(Reservation.id, Reservation.status, Reservation.start_time, Reservation.end_time)
+            .filter(Reservation.version > self._version, Reservation.version <= version)
+            .all()
+        )
+        for rid, status, start, end in changed:
+            if status == "active":
+                self.push(rid, start, end, wake=False)
+            else:
+                self.discard(rid)
+        self._version = version
+
+    def add(self, reservation) -> None:
+        self.push(reservation.id, reservation.start_time, reservation.end_time)
+
+    def push(self, reservation_id: int, start_time: datetime, end_time: datetime, wake: bool = True) -> None:
+        from app.services.reservation_service import TIME_LIMIT
+
+        with self._lock:
+            self._push(end_time, reservation_id)
+            self._push(start_time + timedelta(minutes=TIME_LIMIT), reservation_id)
+        if wake:
+            self.changed.set()
+
+    def recheck(self, reservation_ids, at: datetime) -> None:
+        """Pushes a deadline at `at` for each reservation (ex: the reserver left the spot)."""
+        with self._lock:
+            for reservation_id in reservation_ids:
+                self._push(at, reservation_id)
+        self.changed.set()
+
+    def discard(self, reservation_id: int) -> None:
+        with self._lock:
+            # doar rezervarile cu intrari in heap; id-ul iese din set odata cu ultima
+            if reservation_id in self._entries:
+                self._dropped.add(reservation_id)
+
+    def _push(self, deadline: datetime, reservation_id: int) -> None:
+        # apelat cu _lock luat
+        heapq.heappush(self._heap, (deadline, reservation_id))
+        self._entries[reservation_id] += 1
+        self._dropped.discard(reservation_id)
+
+    def _pop(self) -> None:
+        # apelat cu _lock luat
+        _, reservation_id = heapq.heappop(self._heap)
+        self._entries[reservation_id] -= 1
+        if not self._entries[reservation_id]:
+            del self._entries[reservation_id]
+            self._dropped.discard(reservation_id)
+
+    def next_deadline(self):
+        with self._lock:
+            while self._heap and self._heap[0][1] in self._dropped:
+                self._pop()
+            return self._heap[0][0] if self._heap else None
+
+    def is_due(self, now: datetime) -> bool:
+        deadline = self.next_deadline()
+        return deadline is not None and deadline <= now
+
+    def pop_due(self, now: datetime) -> int:
+        popped = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                self._pop()
+                popped += 1
+        return popped
+
+    def seconds_until_next(self, now: datetime):
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        return max(0.0, (deadline - now).total_seconds())
+
+deadlines = DeadlineQueue()
@@ -0,0 +1,132 @@
+# Calendarul de intervale libere pentru un loc sau pentru o parcare.
+#
+# Rezervarile ACTIVE ale unui loc vin din interval_index deja sortate si fara
+# suprapuneri, deci golurile dintre ele ies dintr-o singura trecere. Pentru o
+# parcare, listele sortate ale locurilor sunt interclasate (heapq.merge) si
+# parcurse o data, tinand intr-un heap sfarsiturile rezervarilor in curs.
+#
+# Rezultatele sunt tinute per (loc sau parcare, zi) si sunt scoase din cache
+# cand indexul reincarca locurile schimbate; indexul urmareste spot_changes,
+# deci si modificarile facute de alte procese.
+
+import heapq
+from datetime import date, datetime, timedelta
+
+from app.extensions import db
+from app.models import ParkingSpot
+from app.services.interval_index import interval_index
+from app.utils.cache import TTLCache
+
+free_slots_cache = TTLCache(ttl=300.0, max_entries=2048)
+
+# parcare -> locurile ei la ultimul calcul, ca o parcare sa fie invalidata
+# si cand un loc e sters sau mutat in alta parcare
+_lot_spots = {}
+
+def free_intervals(busy, start: datetime, end: datetime) -> list[tuple]:
+    """Gaps of [start, end) not covered by `busy`, a list of (start, end) sorted by start."""
+    free = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start > cursor:
+            free.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            return free
+    free.append((cursor, end))
+    return free
+
+def _append_segment(segments: list, start, end, free: int) -> None:
+    if start >= end:
+        return
+    if segments and segments[-1][2] == free and segments[-1][1] == start:
+        segments[-1] = (segments[-1][0], end, free)
+    else:
+        segments.append((start, end, free))
+
+def availability_segments(per_spot, total_spots: int, start: datetime, end: datetime) -> list[tuple]:
+    """
+    Number of free spots over [start, end) as (segment_start, segment_end, free)
+    tuples, from one sorted (start, end) list per spot. Adjacent segments with
+    the same count are merged.
+    """
+    segments = []
+    in_use = []         # min-heap: sfarsitul rezervarilor in curs
+    cursor = start
+    for busy_start, busy_end in heapq.merge(*per_spot):
+        busy_start = max(busy_start, start)
+        while in_use and in_use[0] <= busy_start:
+            released = heapq.heappop(in_use)
+            _append_segment(segments, cursor, released, total_spots - len(in_use) - 1)
+            cursor = max(cursor, released)
+        _append_segment(segments, cursor, busy_start, total_spots - len(in_use))
+        cursor = max(cursor, busy_start)
+        heapq.heappush(in_use, min(busy_end, end))
+    while in_use:
+        released = heapq.heappop(in_use)
+        _append_segment(segments, cursor, released, total_spots - len(in_use) - 1)
+        cursor = max(cursor, released)
+    _append_segment(segments, cursor, end, total_spots)
+    return segments
+
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def _busy(entries) -> list[tuple]:
+    return [(e.start_time, e.end_time) for e in entries]
+
+def _build_spot_day(spot_id: int, day: date) -> list[dict]:
+    start, end = _day_bounds(day)
+    busy = _busy(interval_index.between(spot_id, start, end))
+    return [
+        {"start": a.isoformat(), "end": b.isoformat()}
+        for a, b in free_intervals(busy, start, end)
+    ]
+
+def _build_lot_day(parking_lot: str, day: date) -> dict:
+    spot_ids = [
+        sid for (sid,) in
+        db.session.query(ParkingSpot.id).filter(ParkingSpot.parking_lot == parking_lot).all()
+    ]
+    _lot_spots[parking_lot] = frozenset(spot_ids)
+
+    start, end = _day_bounds(day)
+    reservations = interval_index.between_spots(spot_ids, start, end)
+    per_spot = [_busy(entries) for entries in reservations.values() if entries]
+    return {
+        "total_spots": len(spot_ids),
+        "segments": [
+            {"start": a.isoformat(), "end": b.isoformat(), "free_spots": free}
+            for a, b, free in availability_segments(per_spot, len(spot_ids), start, end)
+        ],
+    }
+
+def get_spot_free_slots(spot_id: int, day: date) -> list[dict]:
+    """Free intervals of a spot during `day`, from its ACTIVE reservations."""
+    interval_index.sync()
+    return free_slots_cache.get(("spot", spot_id, day), lambda: _build_spot_day(spot_id, day))
+
+def get_lot_availability(parking_lot: str, day: date) -> dict:
+    """Free-spot count of a lot over `day`, as constant segments."""
+    interval_index.sync()
+    return free_slots_cache.get(("lot", parking_lot, day), lambda: _build_lot_day(parking_lot, day))
+
+def _on_index_reload(spot_ids) -> None:
+    if spot_ids is None:
+        _lot_spots.clear()
+        free_slots_cache.clear()
+        return
+    # parcarea curenta a locurilor schimbate (un loc nou sau mutat) plus
+    # parcarile in care erau la ultimul calcul (un loc sters sau mutat)
+    lots = {
+        lot for (lot,) in
+        db.session.query(ParkingSpot.parking_lot).filter(ParkingSpot.id.in_(spot_ids)).distinct()
+    }
+    lots.update(lot for lot, ids in list(_lot_spots.items()) if not ids.isdisjoint(spot_ids))
+
+    free_slots_cache.invalidate_where(
+        lambda key: key[1] in spot_ids if key[0] == "spot" else key[1] in lots
+    )
+
+interval_index.on_reload(_on_index_reload)
@@ -0,0 +1,176 @@
+# Index in memorie cu rezervarile ACTIVE ale fiecarui loc, sortate dupa start.
+#
+# Rezervarile unui loc nu se suprapun (INSERT-ul conditionat din
+# create_reservation garanteaza asta), deci sortate dupa start_time sunt
+# sortate si dupa end_time: suprapunerea, rezervarea curenta si urmatoarea
+# rezervare se gasesc cu bisect, in O(log n), fara interogari pe `reservations`.
+#
+# Consistenta intre procese: orice modificare de rezervare inregistreaza
+# spot_id-ul in spot_changes. Inainte de fiecare raspuns indexul compara
+# versiunea lui cu MAX(version) (o citire din cheia primara) si reincarca
+# doar locurile schimbate intre timp. Intr-un request verificarea se face o
+# singura data: toate lookup-urile raspunsului folosesc aceeasi versiune.
+#
+# Citirile se fac pe o sesiune separata, care vede doar date comise: apelat
+# din tranzactia unui create_reservation(session=...), indexul nu preia
+# rezervarea si versiunea necomise, care dispar (iar versiunea se refoloseste)
+# daca apelantul face rollback.
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from flask import has_request_context, request
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Reservation
+from app.services.change_feed import current_version, get_changed_spot_ids
+
+IndexedReservation = namedtuple("IndexedReservation", "id user_id start_time end_time")
+
+# peste atatea locuri schimbate e mai ieftin sa reincarcam tot
+FULL_RELOAD_THRESHOLD = 500
+
+# marcat in environ-ul request-ului dupa primul sync
+_SYNCED_KEY = "parkupb.interval_index_synced"
+
+class _SpotReservations:
+    __slots__ = ("starts", "ends", "entries")
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.starts = [e.start_time for e in entries]
+        self.ends = [e.end_time for e in entries]
+
+def _slice(spot, start, end) -> list:
+    """Entries of `spot` overlapping [start, end), in order."""
+    if spot is None:
+        return []
+    i = bisect_right(spot.ends, start)
+    j = bisect_left(spot.starts, end, lo=i)
+    return spot.entries[i:j]
+
+class SpotIntervalIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # un singur sync odata, ca datele incarcate sa nu fie suprascrise cu
+        # unele mai vechi de un sync concurent
+        self._sync_lock = threading.RLock()
+        self._spots = {}            # spot_id -> _SpotReservations
+        self._version = None        # versiunea spot_changes incarcata
+        self._reload_listeners = []
+
+    def on_reload(self, callback) -> None:
+        """
+        Registers `callback(spot_ids)` to run after the index reloads: with
+        the set of changed spot ids, or None after a full reload.
+        """
+        if callback not in self._reload_listeners:
+            self._reload_listeners.append(callback)
+
+    def _notify(self, spot_ids) -> None:
+        for callback in self._reload_listeners:
+            callback(spot_ids)
+
+    def _load(self, session, spot_ids=None) -> dict:
+        query = (
+            session.query(Reservation.spot_id, Reservation.id, Reservation.user_id,
+                          Reservation.start_time, Reservation.end_time)
+            .filter(Reservation.status == "active")
+        )
+        if spot_ids is not None:
+            query = query.filter(Reservation.spot_id.in_(spot_ids))
+
+        grouped = {sid: [] for sid in spot_ids or ()}
+        for sid, rid, uid, start, end in query.order_by(Reservation.spot_id, Reservation.start_time):
+            grouped.setdefault(sid, []).append(IndexedReservation(rid, uid, start, end))
+        return {sid: _SpotReservations(entries) for sid, entries in grouped.items()}
+
+    def seed(self) -> None:
+        """Reloads every ACTIVE reservation from the DB."""
+        with self._sync_lock, Session(db.engine) as session:
+            version = current_version(session)
+            spots = self._load(session)
+            with self._lock:
+                self._spots = spots
+                self._version = version
+            self._notify(None)
+
+    def sync(self) -> None:
+        """
+        Brings the index up to the latest committed change version. Within a
+        request only the first call checks, so every lookup of a response
+        sees the same version.
+        """
+        if has_request_context():
+            # pe request, nu pe `g`: contextul de aplicatie poate fi comun mai multor request-uri
+            if request.environ.get(_SYNCED_KEY):
+                return
+            request.environ[_SYNCED_KEY] = True
+        self._sync()
+
+    def _sync(self) -> None:
+        with self._sync_lock, Session(db.engine) as session:
+            version = current_version(session)
+            if self._version is None or version < self._version:
+                # niciodata incarcat, sau baza a fost recreata
+                self.seed()
+                return
+            if version == self._version:
+                return
+
+            changed = get_changed_spot_ids(self._version, version, session)
+            if len(changed) > FULL_RELOAD_THRESHOLD:
+                self.seed()
+                return
+            spots = self._load(session, changed)
+            with self._lock:
+                self._spots.update(spots)
+                self._version = version
+            self._notify(set(changed))
+
+    def _get(self, spot_id: int):
+        self.sync()
+        with self._lock:
+            return self._spots.get(spot_id)
+
+    def overlaps(self, spot_id: int, start, end) -> bool:
+        """True if an ACTIVE reservation of the spot overlaps [start, end)."""
+        spot = self._get(spot_id)
+        if spot is None:
+            return False
+        # prima rezervare care se termina dupa `start`
+        i = bisect_right(spot.ends, start)
+        return i < len(spot.entries) and spot.starts[i] < end
+
+    def current(self, spot_id: int, at):
+        """The ACTIVE reservation with start_time <= at < end_time, or None."""
+        spot = self._get(spot_id)
+        if spot is None:
+            return None
+        i = bisect_right(spot.starts, at) - 1
+        if i >= 0 and spot.ends[i] > at:
+            return spot.entries[i]
+        return None
+
+    def next(self, spot_id: int, after):
+        """The first ACTIVE reservation with start_time > after, or None."""
+        spot = self._get(spot_id)
+        if spot is None:
+            return None
+        i = bisect_right(spot.starts, after)
+        return spot.entries[i] if i < len(spot.entries) else None
+
+    def between(self, spot_id: int, start, end) -> list:
+        """ACTIVE reservations of the spot overlapping [start, end), in order."""
+        return _slice(self._get(spot_id), start, end)
+
+    def between_spots(self, spot_ids, start, end) -> dict:
+        """`between()` for several spots, with a single version check."""
+        self.sync()
+        with self._lock:
+            spots = {sid: self._spots.get(sid) for sid in spot_ids}
+        return {sid: _slice(spot, start, end) for sid, spot in spots.items()}
+
+interval_index = SpotIntervalIndex()
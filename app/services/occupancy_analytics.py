@@ -0,0 +1,136 @@
+# Motor vectorizat (NumPy) pentru statisticile de ocupare.
+#
+# Rezervarile sunt citite ca intervale [start, end) in minute epoch, cu o
+# singura interogare pe coloane, iar minutele rezervate pe fiecare bucket
+# (ora, zi, 15 minute...) se obtin din sume cumulative, fara sa se itereze
+# in Python peste rezervari sau peste ore.
+#
+# Datele din SQLite sunt datetime-uri naive; ele sunt tratate ca UTC atat in
+# SQL (strftime('%s')) cat si aici, deci ora din zi ramane ora "de perete".
+
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, cast, func, select
+
+from app.extensions import db
+from app.models import ParkingSpot, Reservation
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_minutes(dt: datetime) -> int:
+    """Whole minutes since the epoch (rounded down) for a naive datetime."""
+    return calendar.timegm(dt.timetuple()) // 60
+
+def from_epoch_minutes(minutes: int) -> datetime:
+    return EPOCH + timedelta(minutes=int(minutes))
+
+def _whole_seconds(column):
+    # "YYYY-MM-DD HH:MM:SS[.ffffff]" fara fractiunea de secunda: strftime('%s')
+    # rotunjeste intai la milisecunda (.9995 ar trece in secunda urmatoare),
+    # iar split_by_hour din occupancy_rollup doar o taie
+    return func.substr(column, 1, 19)
+
+def load_intervals(since=None, until=None, parking_lot=None, statuses=("active", "finished")):
+    """
+    Reservations overlapping [since, until) as columnar arrays, in one query.
+
+    Returns (lot_names, lot_idx, starts, ends): `lot_names` is the sorted list
+    of lots found, `lot_idx` indexes into it, and `starts`/`ends` are int64
+    epoch minutes (start rounded up, end rounded down: only whole minutes count).
+    """
+    start_s = cast(func.strftime("%s", _whole_seconds(Reservation.start_time)), Integer)
+    end_s = cast(func.strftime("%s", _whole_seconds(Reservation.end_time)), Integer)
+    stmt = (
+        select(ParkingSpot.parking_lot, start_s, end_s)
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .where(Reservation.status.in_(statuses))
+    )
+    if since is not None:
+        stmt = stmt.where(Reservation.end_time > since)
+    if until is not None:
+        stmt = stmt.where(Reservation.start_time < until)
+    if parking_lot:
+        stmt = stmt.where(ParkingSpot.parking_lot == parking_lot)
+
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return [], empty, empty, empty
+
+    lots, start_col, end_col = zip(*rows)
+    lot_names, lot_idx = np.unique(np.array(lots, dtype=str), return_inverse=True)
+    starts = -(-np.array(start_col, dtype=np.int64) // 60)
+    ends = np.array(end_col, dtype=np.int64) // 60
+    return lot_names.tolist(), lot_idx.astype(np.int64), starts, ends
+
+def bucket_minutes(lot_idx, starts, ends, n_lots: int, window_start: int, window_end: int, bucket: int = 60):
+    """
+    Reserved minutes per (lot, bucket) over [window_start, window_end), all
+    in epoch minutes. Returns an (n_lots, n_buckets) int64 array; the last
+    bucket is shorter when the window is not a multiple of `bucket`.
+
+    With C(t) = sum_i |[s_i, e_i) ∩ [window_start, t)|, the minutes in a
+    bucket are C(right edge) - C(left edge). C is evaluated at every edge of
+    every lot at once: lots are laid side by side on one axis (offset by the
+    window length), so a single sort + cumsum + searchsorted serves them all.
+    Cost: O(n log n + lots x buckets), independent of the window resolution.
+    """
+    if bucket <= 0:
+        raise ValueError("INVALID_BUCKET")
+    span = max(window_end - window_start, 0)
+    n_buckets = -(-span // bucket)
+    if n_lots == 0 or n_buckets == 0:
+        return np.zeros((n_lots, n_buckets), dtype=np.int64)
+
+    # clamp la fereastra; intervalele goale dupa clamp nu conteaza
+    s = np.clip(starts, window_start, window_end) - window_start
+    e = np.clip(ends, window_start, window_end) - window_start
+    keep = e > s
+    offset = lot_idx[keep] * (span + 1)
+    s = np.sort(s[keep] + offset)
+    e = np.sort(e[keep] + offset)
+
+    rel = np.minimum(np.arange(n_buckets + 1, dtype=np.int64) * bucket, span)
+    edges = (np.arange(n_lots, dtype=np.int64)[:, None] * (span + 1) + rel[None, :]).ravel()
+
+    # C(E) = sum_{s_i < E} (E - s_i) - sum_{e_i < E} (E - e_i)
+    s_prefix = np.concatenate(([0], np.cumsum(s)))
+    e_prefix = np.concatenate(([0], np.cumsum(e)))
+    i = np.searchsorted(s, edges, side="left")
+    j = np.searchsorted(e, edges, side="left")
+    covered = (i * edges - s_prefix[i]) - (j * edges - e_prefix[j])
+
+    return np.diff(covered.reshape(n_lots, n_buckets + 1), axis=1)
+
+def reserved_minutes_by_bucket(since: datetime, until: datetime, bucket: int = 60,
+                               parking_lot=None, statuses=("active", "finished"), exact_since: bool = False):
+    """
+    Reserved minutes per lot and bucket over [since, until).
+    Returns (bucket_starts, {lot: int64 array}), bucket_starts in epoch minutes.
+    The window start is aligned down to a multiple of `bucket` minutes; with
+    `exact_since` the minutes before `since` are not counted, so the first
+    bucket only holds the part of it inside the window.
+    """
+    window_start = to_epoch_minutes(since) // bucket * bucket
+    window_end = to_epoch_minutes(until)
+    lot_names, lot_idx, starts, ends = load_intervals(from_epoch_minutes(window_start), until, parking_lot, statuses)
+    if exact_since:
+        # ca la rezervari: minutul de start incomplet nu se numara
+        starts = np.maximum(starts, -(-calendar.timegm(since.timetuple()) // 60))
+    grid = bucket_minutes(lot_idx, starts, ends, len(lot_names), window_start, window_end, bucket)
+    bucket_starts = window_start + np.arange(grid.shape[1], dtype=np.int64) * bucket
+    return bucket_starts, dict(zip(lot_names, grid))
+
+def weekday_hour_cells(bucket_starts):
+    """Cell index weekday * 24 + hour (Monday = 0) for epoch-minute bucket starts."""
+    bucket_starts = np.asarray(bucket_starts)
+    # 1970-01-01 a fost joi (weekday 3)
+    weekday = (bucket_starts // 1440 + 3) % 7
+    return weekday * 24 + (bucket_starts // 60) % 24
+
+def minutes_per_hour_of_day(bucket_starts, minutes) -> list[int]:
+    """Folds an hourly bucket series into 24 totals, one per hour of day."""
+    hours = (np.asarray(bucket_starts) // 60) % 24
+    return np.bincount(hours, weights=minutes, minlength=24).astype(np.int64).tolist()
@@ -0,0 +1,168 @@
+# Jurnalul append-only al tranzitiilor de ocupare (occupancy_events).
+#
+# Fiecare schimbare a lui is_occupied adauga un rand, in aceeasi tranzactie cu
+# schimbarea: toggle, mark_spot_occupied / mark_spot_free (si flush-ul
+# write-behind), senzori, editarea locului de catre admin. Scrierea e un
+# INSERT fara nicio citire inainte.
+#
+# Din jurnal se reconstruieste starea locurilor la orice moment si ocuparea
+# reala pe intervale (nu doar rezervarile): vezi `replay_occupancy.py`.
+
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models import OccupancyEvent, ParkingSpot
+from app.services.occupancy_analytics import bucket_minutes
+
+# de unde vine schimbarea (occupancy_events.source)
+SOURCE_TOGGLE = 1       # utilizatorul, din aplicatie
+SOURCE_SENSOR = 2       # senzorii de sol
+SOURCE_SERVICE = 3      # mark_spot_occupied / mark_spot_free
+SOURCE_ADMIN = 4        # editarea locului de catre admin
+SOURCE_RESTORE = 5      # replay_occupancy.py restore
+
+SOURCE_NAMES = {
+    SOURCE_TOGGLE: "toggle",
+    SOURCE_SENSOR: "sensor",
+    SOURCE_SERVICE: "service",
+    SOURCE_ADMIN: "admin",
+    SOURCE_RESTORE: "restore",
+}
+
+EPOCH = datetime(1970, 1, 1)
+MS_PER_DAY = 86_400_000
+
+def to_epoch_ms(dt: datetime) -> int:
+    return calendar.timegm(dt.timetuple()) * 1000 + dt.microsecond // 1000
+
+def from_epoch_ms(ms: int) -> datetime:
+    return EPOCH + timedelta(milliseconds=int(ms))
+
+def event_row(spot_id: int, occupied: bool, at: datetime, actor_id=None, source: int = SOURCE_SERVICE) -> dict:
+    """One occupancy_events row, integer-encoded."""
+    at_ms = to_epoch_ms(at)
+    return {
+        "day": at_ms // MS_PER_DAY,
+        "at_ms": at_ms,
+        "spot_id": spot_id,
+        "state": int(bool(occupied)),
+        "actor_id": actor_id,
+        "source": source,
+    }
+
+def log_occupancy(rows, session=None) -> None:
+    """
+    Appends `event_row` dicts to the current transaction (one INSERT,
+    executemany). Does NOT commit: the caller commits with the change.
+    """
+    if rows:
+        (session or db.session).execute(insert(OccupancyEvent), list(rows))
+
+def log_occupancy_from(rows_select, session=None) -> None:
+    """`log_occupancy` for rows produced by a SELECT of (day, at_ms, spot_id, state, actor_id, source)."""
+    (session or db.session).execute(
+        insert(OccupancyEvent).from_select(
+            ["day", "at_ms", "spot_id", "state", "actor_id", "source"], rows_select,
+        )
+    )
+
+def _last_event_id(at_ms: int):
+    """Id of the last event of the outer ParkingSpot at or before `at_ms` (index seek)."""
+    last = aliased(OccupancyEvent)
+    return (
+        select(last.id)
+        .where(last.spot_id == ParkingSpot.id, last.at_ms <= at_ms)
+        .order_by(last.at_ms.desc(), last.id.desc())
+        .limit(1)
+        .correlate(ParkingSpot)
+        .scalar_subquery()
+    )
+
+def state_at(at: datetime, parking_lot=None) -> list[tuple]:
+    """
+    Replayed state of every spot at `at`, from its last event up to then:
+    (spot_id, parking_lot, state, actor_id) with state 1/0, or None when the
+    spot has no event yet. One query; one index seek per spot.
+    """
+    stmt = (
+        select(ParkingSpot.id, ParkingSpot.parking_lot, OccupancyEvent.state, OccupancyEvent.actor_id)
+        .outerjoin(OccupancyEvent, OccupancyEvent.id == _last_event_id(to_epoch_ms(at)))
+        .order_by(ParkingSpot.id)
+    )
+    if parking_lot:
+        stmt = stmt.where(ParkingSpot.parking_lot == parking_lot)
+    return db.session.execute(stmt).all()
+
+def events_between(since: datetime, until: datetime):
+    """Events in [since, until) ordered by time, as a range scan of the (day, at_ms) index."""
+    since_ms, until_ms = to_epoch_ms(since), to_epoch_ms(until)
+    return db.session.execute(
+        select(OccupancyEvent.spot_id, OccupancyEvent.at_ms, OccupancyEvent.state)
+        .where(
+            OccupancyEvent.day >= since_ms // MS_PER_DAY,
+            OccupancyEvent.day <= (until_ms - 1) // MS_PER_DAY,
+            OccupancyEvent.at_ms >= since_ms,
+            OccupancyEvent.at_ms < until_ms,
+        )
+        .order_by(OccupancyEvent.day, OccupancyEvent.at_ms, OccupancyEvent.id)
+    ).all()
+
+def occupancy_curve(since: datetime, until: datetime, bucket: int = 60, parking_lot=None) -> dict:
+    """
+    True occupancy per lot and `bucket`-minute bucket over [since, until), replayed from the
+    event log: the state of each spot at `since`, then its transitions.
+    Spots without any event before a transition count as free.
+
+    Returns {"bucket_starts": [datetime], "lots": {lot: {"total_spots": n,
+    "occupied_ratio": [0..1 per bucket]}}}.
+    """
+    initial = state_at(since, parking_lot)
+    lot_names = sorted({lot for _, lot, _, _ in initial})
+    lot_index = {lot: i for i, lot in enumerate(lot_names)}
+    spot_lot = {sid: lot_index[lot] for sid, lot, _, _ in initial}
+
+    window_start = to_epoch_ms(since) // 1000
+    window_end = to_epoch_ms(until) // 1000
+
+    # intervale ocupate [start, end) in secunde, per loc
+    open_since = {sid: window_start for sid, _, state, _ in initial if state == 1}
+    lot_idx, starts, ends = [], [], []
+    for sid, at_ms, state in events_between(since, until):
+        if sid not in spot_lot:
+            continue
+        if state == 1:
+            open_since.setdefault(sid, at_ms // 1000)
+        elif sid in open_since:
+            lot_idx.append(spot_lot[sid])
+            starts.append(open_since.pop(sid))
+            ends.append(at_ms // 1000)
+    for sid, start in open_since.items():
+        lot_idx.append(spot_lot[sid])
+        starts.append(start)
+        ends.append(window_end)
+
+    # bucket_minutes nu depinde de unitate: aici lucreaza in secunde
+    bucket_seconds = bucket * 60
+    grid = bucket_minutes(
+        np.array(lot_idx, dtype=np.int64), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+        len(lot_names), window_start, window_end, bucket_seconds,
+    )
+    totals = np.bincount(np.array(list(spot_lot.values()), dtype=np.int64), minlength=len(lot_names))
+    edges = window_start + np.arange(grid.shape[1] + 1, dtype=np.int64) * bucket_seconds
+    lengths = np.diff(np.minimum(edges, window_end))
+
+    return {
+        "bucket_starts": [EPOCH + timedelta(seconds=int(s)) for s in edges[:-1]],
+        "lots": {
+            lot: {
+                "total_spots": int(totals[i]),
+                "occupied_ratio": np.round(grid[i] / (lengths * max(totals[i], 1)), 4).tolist(),
+            }
+            for i, lot in enumerate(lot_names)
+        },
+    }
@@ -0,0 +1,163 @@
+# Rollup orar al minutelor rezervate, per parcare.
+#
+# Rezervarile terminate sunt adunate o singura data in `occupancy_hourly`
+# (cand sweep-ul le marcheaza 'finished'), iar /parking/stats insumeaza cel
+# mult 24 x zile randuri in loc sa parcurga tot istoricul de rezervari.
+
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.extensions import db
+from app.models import OccupancyHourly
+from app.services.occupancy_analytics import bucket_minutes, from_epoch_minutes, load_intervals
+
+def split_by_hour(start, end):
+    """
+    Splits [start, end) into (hour_start, minutes) pieces, one per clock hour.
+    Only whole minutes count (start rounded up, end rounded down), the same
+    rounding as the vectorized engine in occupancy_analytics. Fractions of a
+    second are dropped first, as load_intervals does in SQL, so the
+    incremental rollup and rebuild_occupancy_rollup() agree.
+    """
+    start = start.replace(microsecond=0)
+    if start.second:
+        start = start.replace(second=0) + timedelta(minutes=1)
+    end = end.replace(second=0, microsecond=0)
+    cur = start
+    while cur < end:
+        hour_start = cur.replace(minute=0, second=0, microsecond=0)
+        hour_end = hour_start + timedelta(hours=1)
+        seg_end = min(end, hour_end)
+        mins = int((seg_end - cur).total_seconds() // 60)
+        if mins:
+            yield hour_start, mins
+        cur = hour_end
+
+def _bucket_rows(intervals, sign: int = 1) -> list[dict]:
+    buckets = {}
+    for parking_lot, start, end in intervals:
+        if parking_lot is None or start is None or end is None:
+            continue
+        for hour_start, mins in split_by_hour(start, end):
+            key = (parking_lot, hour_start)
+            buckets[key] = buckets.get(key, 0) + sign * mins
+    return [
+        {"parking_lot": lot, "hour_start": hour_start, "hour": hour_start.hour, "minutes": mins}
+        for (lot, hour_start), mins in buckets.items()
+    ]
+
+def _upsert(rows: list[dict], session=None) -> None:
+    stmt = sqlite_insert(OccupancyHourly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OccupancyHourly.parking_lot, OccupancyHourly.hour_start],
+        set_={"minutes": OccupancyHourly.minutes + stmt.excluded.minutes},
+    )
+    (session or db.session).execute(stmt, rows)
+
+def _subtract(rows: list[dict], session=None) -> None:
+    # doar bucket-urile existente, si niciodata sub 0: minutele unei rezervari
+    # care nu a fost adunata (ex. inaintea rollup-ului) nu pot fi scoase
+    stmt = (
+        update(OccupancyHourly)
+        .where(
+            OccupancyHourly.parking_lot == bindparam("lot"),
+            OccupancyHourly.hour_start == bindparam("start"),
+        )
+        .values(minutes=func.max(OccupancyHourly.minutes - bindparam("removed"), 0))
+    )
+    (session or db.session).connection().execute(stmt, [
+        {"lot": r["parking_lot"], "start": r["hour_start"], "removed": -r["minutes"]} for r in rows
+    ])
+
+def add_to_rollup(intervals, sign: int = 1, session=None) -> None:
+    """
+    Adds (sign=1) or removes (sign=-1) the minutes of the given
+    (parking_lot, start_time, end_time) intervals. One upsert (or, to
+    remove, one UPDATE clamped at 0) statement.
+    Does NOT commit: runs in the caller's transaction.
+    """
+    rows = _bucket_rows(intervals, sign)
+    if not rows:
+        return
+    if sign < 0:
+        _subtract(rows, session)
+    else:
+        _upsert(rows, session)
+
+def rebuild_occupancy_rollup() -> int:
+    """
+    Recomputes the whole rollup from the reservations table. Returns the row count.
+    The hourly buckets of every lot are computed at once by the NumPy engine.
+    """
+    OccupancyHourly.query.delete(synchronize_session=False)
+
+    rows = []
+    lot_names, lot_idx, starts, ends = load_intervals(statuses=("finished",))
+    if len(starts):
+        window_start = int(starts.min()) // 60 * 60
+        grid = bucket_minutes(lot_idx, starts, ends, len(lot_names), window_start, int(ends.max()), 60)
+        for lot, bucket in zip(*np.nonzero(grid)):
+            hour_start = from_epoch_minutes(window_start + bucket * 60)
+            rows.append({
+                "parking_lot": lot_names[lot],
+                "hour_start": hour_start,
+                "hour": hour_start.hour,
+                "minutes": int(grid[lot, bucket]),
+            })
+    if rows:
+        db.session.execute(sqlite_insert(OccupancyHourly), rows)
+    db.session.commit()
+    return len(rows)
+
+def rename_lot_in_rollup(old_name: str, new_name: str) -> None:
+    """Keeps history attached to a lot after it is renamed. Does NOT commit."""
+    if old_name == new_name:
+        return
+    existing = (
+        OccupancyHourly.query
+        .filter(OccupancyHourly.parking_lot == old_name)
+        .with_entities(OccupancyHourly.hour_start, OccupancyHourly.minutes)
+        .all()
+    )
+    if existing:
+        _upsert([
+            {"parking_lot": new_name, "hour_start": h, "hour": h.hour, "minutes": m}
+            for h, m in existing
+        ])
+        delete_lot_from_rollup(old_name)
+
+def delete_lot_from_rollup(parking_lot: str) -> None:
+    """Does NOT commit."""
+    OccupancyHourly.query.filter(OccupancyHourly.parking_lot == parking_lot).delete(synchronize_session=False)
+
+def get_rollup_rows(parking_lot: str | None, since, until) -> list[tuple]:
+    """(parking_lot, hour_start, minutes) rows for buckets in [floor_hour(since), until)."""
+    since_hour = since.replace(minute=0, second=0, microsecond=0)
+    query = (
+        db.session.query(OccupancyHourly.parking_lot, OccupancyHourly.hour_start, OccupancyHourly.minutes)
+        .filter(OccupancyHourly.hour_start >= since_hour, OccupancyHourly.hour_start < until)
+    )
+    if parking_lot:
+        query = query.filter(OccupancyHourly.parking_lot == parking_lot)
+    return query.all()
+
+def get_rollup_minutes_per_hour(parking_lot: str | None, since, until) -> list[int]:
+    """
+    Reserved minutes per hour of day (0..23) from the rollup, for buckets
+    starting in [floor_hour(since), until). Reads at most 24 x days rows.
+    """
+    since_hour = since.replace(minute=0, second=0, microsecond=0)
+    query = (
+        db.session.query(OccupancyHourly.hour, db.func.sum(OccupancyHourly.minutes))
+        .filter(OccupancyHourly.hour_start >= since_hour, OccupancyHourly.hour_start < until)
+    )
+    if parking_lot:
+        query = query.filter(OccupancyHourly.parking_lot == parking_lot)
+
+    minutes = [0] * 24
+    for hour, total in query.group_by(OccupancyHourly.hour).all():
+        minutes[hour] = int(total or 0)
+    return minutes
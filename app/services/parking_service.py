@@ -4,7 +4,32 @@
 
 from app.extensions import db
 from app.models import ParkingSpot, Reservation, User
+from app.services.change_feed import record_spot_change, on_spot_changes_committed
+from app.services.spot_cache import spot_cache
+from app.services.write_behind import write_behind
+from app.services.occupancy_log import SOURCE_SERVICE, SOURCE_TOGGLE, event_row, log_occupancy
+from app.services.occupancy_rollup import get_rollup_minutes_per_hour, get_rollup_rows
+from app.services.reservation_service import recheck_no_shows
+from app.services.occupancy_analytics import (
+    minutes_per_hour_of_day, reserved_minutes_by_bucket, to_epoch_minutes, weekday_hour_cells,
+)
 from datetime import datetime, timedelta
+from app.utils.cache import TTLCache
+from sqlalchemy import and_, case, func, not_, or_, select, update
+from sqlalchemy.orm import aliased
+import numpy as np
+
+# statisticile de admin, per parcare; orice commit care modifica locuri sau
+# rezervari le invalideaza (toate scrierile trec prin record_spot_changes)
+admin_stats_cache = TTLCache(ttl=5.0)
+on_spot_changes_committed(admin_stats_cache.clear)
+
+# răspunsurile /parking/stats, cheie (parcare, oră, fereastră); doar TTL,
+# ca un flux continuu de ocupări / eliberări să nu golească mereu cache-ul
+stats_cache = TTLCache(ttl=3.0, max_entries=256)
+
+# profilele istorice (zi x oră) pentru prognoză; se recalculează rar
+profile_cache = TTLCache(ttl=3600.0, max_entries=8)
 
 def _now():
     return datetime.now()
@@ -70,9 +95,24 @@ def mark_spot_free(spot_id):
     if not spot:
         return None
 
+    if write_behind.enabled:
+        # commit-ul il face flush-ul de grup; obiectul nu mai e urmarit de sesiune
+        db.session.expunge(spot)
+        was_occupied = write_behind.pending_value(spot.id, "is_occupied", spot.is_occupied)
+        spot.is_occupied = False
+        spot.occupied_by_email = None
+        event = event_row(spot.id, False, _now()) if was_occupied else None
+        write_behind.stage(spot.id, event, is_occupied=False, occupied_by_email=None)
+        return spot
+
+    if spot.is_occupied:
+        log_occupancy([event_row(spot.id, False, _now())])
     spot.is_occupied = False
     spot.occupied_by_email = None
+    record_spot_change(spot.id)
+    recheck_no_shows([spot.id])
     db.session.commit()
+    spot_cache.invalidate([spot.id])
     return spot
 
 
@@ -81,33 +121,228 @@ def mark_spot_occupied(spot_id : int, user_email : str):
     if not spot:
         return None
 
+    actor_id = None
+    if user_email is not None:
+        actor_id = db.session.query(User.id).filter(User.email == user_email).scalar()
+
+    if write_behind.enabled:
+        db.session.expunge(spot)
+        was_occupied = write_behind.pending_value(spot.id, "is_occupied", spot.is_occupied)
+        spot.is_occupied = True
+        fields = {"is_occupied": True}
+        if user_email is not None:
+            spot.occupied_by_email = fields["occupied_by_email"] = user_email
+        event = None if was_occupied else event_row(spot.id, True, _now(), actor_id)
+        write_behind.stage(spot.id, event, **fields)
+        return spot
+
+    if not spot.is_occupied:
+        log_occupancy([event_row(spot.id, True, _now(), actor_id)])
     spot.is_occupied = True
     if user_email is not None:
         spot.occupied_by_email = user_email
 
+    record_spot_change(spot.id)
     db.session.commit()
+    spot_cache.invalidate([spot.id])
     return spot
 
+TOGGLE_ATTEMPTS = 3
+
+def _toggle_guards(user, now):
+    """(reserved_for_another_user, user_parked_elsewhere) EXISTS clauses, correlated to ParkingSpot."""
+    reserved_for_another_user = (
+        select(Reservation.id)
+        .where(
+            Reservation.spot_id == ParkingSpot.id,
+            Reservation.status == "active",
+            Reservation.start_time <= now,
+            Reservation.end_time > now,
+            Reservation.user_id != user.id,
+        )
+        .exists()
+    )
+    other = aliased(ParkingSpot)
+    user_parked_elsewhere = (
+        select(other.id)
+        .where(other.occupied_by_email == user.email, other.is_occupied.is_(True))
+        .exists()
+    )
+    return reserved_for_another_user, user_parked_elsewhere
+
+def _toggle_update(user, spot_id: int, now, is_admin: bool):
+    reserved_for_another_user, user_parked_elsewhere = _toggle_guards(user, now)
+
+    can_occupy = and_(ParkingSpot.is_occupied.is_(False), not_(user_parked_elsewhere))
+    if not is_admin:
+        can_occupy = and_(can_occupy, not_(reserved_for_another_user))
+    can_release = and_(ParkingSpot.is_occupied.is_(True), ParkingSpot.occupied_by_email == user.email)
+
+    return (
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, or_(can_occupy, can_release))
+        .values(
+            # SET foloseste valorile vechi ale randului
+            is_occupied=not_(ParkingSpot.is_occupied),
+            occupied_by_email=case((ParkingSpot.is_occupied.is_(True), None), else_=user.email),
+        )
+        .returning(ParkingSpot.is_occupied)
+        .execution_options(synchronize_session=False)
+    )
+
+def toggle_spot(user, spot_id: int, now=None) -> bool:
+    """
+    Occupies a free spot, or releases the spot the user occupies, with one
+    conditional UPDATE; returns the new is_occupied.
+
+    The guards are part of the UPDATE, so two users can never both win
+    the same free spot:
+    - to occupy: the spot is free, nobody else has a reservation running
+      now (admins skip this) and the user is not parked elsewhere;
+    - to release: the spot is occupied by this user.
+
+    When no row is updated, raises ValueError with the reason:
+    SPOT_NOT_FOUND, OCCUPIED_BY_ANOTHER_USER, RESERVED_FOR_ANOTHER_USER,
+    ALREADY_OCCUPYING_ANOTHER_SPOT, or TOGGLE_CONFLICT if the spot kept
+    changing under us.
+    """
+    now = now or _now()
+    is_admin = getattr(user, "role", None) == "admin"
+    # starea din buffer trebuie sa fie in baza inainte de UPDATE-ul conditionat
+    if write_behind.is_pending(spot_id):
+        write_behind.flush()
+    stmt = _toggle_update(user, spot_id, now, is_admin)
+    reserved_for_another_user, user_parked_elsewhere = _toggle_guards(user, now)
+
+    for _ in range(TOGGLE_ATTEMPTS):
+        is_occupied = db.session.execute(stmt).scalar()
+        if is_occupied is not None:
+            log_occupancy([event_row(spot_id, is_occupied, now, user.id, SOURCE_TOGGLE)])
+            record_spot_change(spot_id)
+            if not is_occupied:
+                recheck_no_shows([spot_id], now)
+            db.session.commit()
+            spot_cache.invalidate([spot_id])
+            return is_occupied
+        db.session.rollback()
+
+        # de ce a pierdut: se citeste starea de acum
+        spot = db.session.execute(
+            select(ParkingSpot.is_occupied, ParkingSpot.occupied_by_email).where(ParkingSpot.id == spot_id)
+        ).first()
+        if spot is None:
+            raise ValueError("SPOT_NOT_FOUND")
+        if spot.is_occupied:
+            if spot.occupied_by_email != user.email:
+                raise ValueError("OCCUPIED_BY_ANOTHER_USER")
+            continue
+        if not is_admin and db.session.execute(
+            select(reserved_for_another_user).where(ParkingSpot.id == spot_id)
+        ).scalar():
+            raise ValueError("RESERVED_FOR_ANOTHER_USER")
+        if db.session.execute(select(user_parked_elsewhere)).scalar():
+            raise ValueError("ALREADY_OCCUPYING_ANOTHER_SPOT")
+        # starea s-a schimbat intre UPDATE si citire: mai incercam
+    raise ValueError("TOGGLE_CONFLICT")
+
+def get_lot_counts(parking_lot: str | None = None) -> dict:
+    """
+    Numără locurile totale / ocupate / rezervate acum / libere pentru fiecare
+    parcare, într-un singur SELECT cu agregare condiționată (GROUP BY parcare).
+    Returnează { parking_lot: {"total", "occupied", "reserved", "free"} }.
+    """
+    now = _now()
+
+    reserved_now = and_(
+        ParkingSpot.reservation_start_time.isnot(None),
+        ParkingSpot.reservation_end_time.isnot(None),
+        ParkingSpot.reservation_start_time <= now,
+        ParkingSpot.reservation_end_time > now,
+    )
+    free_now = and_(ParkingSpot.is_occupied == False, ~reserved_now)  # noqa: E712
+
+    query = db.session.query(
+        ParkingSpot.parking_lot,
+        func.count(ParkingSpot.id),
+        func.sum(case((ParkingSpot.is_occupied == True, 1), else_=0)),  # noqa: E712
+        func.sum(case((reserved_now, 1), else_=0)),
+        func.sum(case((free_now, 1), else_=0)),
+    )
+    if parking_lot:
+        query = query.filter(ParkingSpot.parking_lot == parking_lot)
+
+    return {
+        lot: {"total": total, "occupied": occupied or 0, "reserved": reserved or 0, "free": free or 0}
+        for lot, total, occupied, reserved, free in query.group_by(ParkingSpot.parking_lot).all()
+    }
+
+def _stats_from_counts(counts: dict) -> dict:
+    total = counts["total"]
+    free = counts["free"]
+    return {
+        "total_spots": total,
+        "free_spots": free,
+        "occupied_spots": counts["occupied"],
+        "reserved_spots": counts["reserved"],
+        "availability_percent": round((free / total) * 100, 1) if total > 0 else 0,
+        "updated_at": _now().isoformat()
+    }
+
+def _sum_counts(per_lot: dict) -> dict:
+    out = {"total": 0, "occupied": 0, "reserved": 0, "free": 0}
+    for counts in per_lot.values():
+        for key in out:
+            out[key] += counts[key]
+    return out
+
 def get_parking_stats(parking_lot: str | None):
     """
     Returnează statistici pentru o parcare sau pentru toate parcările.
     Dacă parking_lot este None -> statistici globale.
     """
+    return _stats_from_counts(_sum_counts(get_lot_counts(parking_lot)))
 
-    all_spots = get_all_spots(parking_lot)
-    occupied = get_occupied_spots(parking_lot)
-    reserved = get_reserved_spots(parking_lot)
-    free = get_free_spots(parking_lot)
+def get_parking_stats_by_lot() -> tuple[dict, dict]:
+    """
+    Statistici per parcare și globale dintr-o singură interogare.
+    Returnează (per_lot, global).
+    """
+    per_lot = get_lot_counts()
+    return (
+        {lot: _stats_from_counts(counts) for lot, counts in per_lot.items()},
+        _stats_from_counts(_sum_counts(per_lot)),
+    )
 
-    total = len(all_spots)
+def get_reservation_counts(parking_lot: str | None = None) -> dict:
+    """
+    Numărul de rezervări pe status, într-un singur SELECT ... GROUP BY status.
+    Returnează { status: count }.
+    """
+    query = db.session.query(Reservation.status, func.count(Reservation.id))
+    if parking_lot:
+        query = (
+            query.join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+            .filter(ParkingSpot.parking_lot == parking_lot)
+        )
+    return dict(query.group_by(Reservation.status).all())
 
+def get_admin_stats(parking_lot: str | None = None) -> dict:
+    """
+    Statistici pentru admin: locuri (din get_lot_counts) și rezervări pe status.
+    Două interogări agregate, fără să încarce obiecte ORM.
+    """
+    counts = _sum_counts(get_lot_counts(parking_lot))
+    reservations = get_reservation_counts(parking_lot)
     return {
-        "total_spots": total,
-        "free_spots": len(free),
-        "occupied_spots": len(occupied),
-        "reserved_spots": len(reserved),
-        "availability_percent": round((len(free) / total) * 100, 1) if total > 0 else 0,
-        "updated_at": _now().isoformat()
+        "parking_lot": parking_lot,
+        "total_spots": counts["total"],
+        "free_spots": counts["free"],
+        "occupied_spots": counts["occupied"],
+        "reserved_spots": counts["reserved"],
+        "active_reservations": reservations.get("active", 0),
+        "finished_reservations": reservations.get("finished", 0),
+        "cancelled_reservations": reservations.get("cancelled", 0),
+        "updated_at": _now().isoformat(),
     }
 
 def get_hourly_occupancy_probability(parking_lot: str | None, days: int = 7):
@@ -115,54 +350,42 @@ def get_hourly_occupancy_probability(parking_lot: str | None, days: int = 7):
     Calculează p(spot rezervat la ora H) pentru H=0..23, în ultimele `days` zile.
 
     p(H) = (minute_rezervate_in_ora_H) / (nr_spoturi * 60 * days)
+
+    Rezervările terminate vin din rollup-ul `occupancy_hourly` (cel mult
+    24 x days rânduri); rezervările încă active trec prin motorul NumPy
+    din occupancy_analytics.
+    Fereastra este exact [acum - days, acum), deci fiecare oră din zi are
+    60 * days minute pe spot: ora parțială de la început nu se ia din
+    rollup (bucket-ul ei ar conține și minutele dinaintea ferestrei), ci
+    din motor, de la `start_window` încolo.
     """
     now = _now()
     start_window = now - timedelta(days=days)
+    first_hour = start_window.replace(minute=0, second=0, microsecond=0)
+    if first_hour < start_window:
+        first_hour += timedelta(hours=1)
 
     # spoturile relevante
-    spot_q = ParkingSpot.query
+    spot_q = db.session.query(func.count(ParkingSpot.id))
     if parking_lot:
         spot_q = spot_q.filter(ParkingSpot.parking_lot == parking_lot)
-
-    spot_ids = [s.id for s in spot_q.all()]
-    total_spots = len(spot_ids)
+    total_spots = spot_q.scalar() or 0
 
     # dacă nu avem spoturi, întoarcem 0
     if total_spots == 0:
         return [{"hour": h, "p": 0.0, "percent": 0.0} for h in range(24)]
 
-    # rezervări relevante (exclude cancelled)
-    res_q = Reservation.query.filter(
-        Reservation.spot_id.in_(spot_ids),
-        Reservation.end_time > start_window,
-        Reservation.start_time < now,
-        Reservation.status != "cancelled",
-    )
-    reservations = res_q.all()
-
-    minutes_per_hour = [0] * 24
+    minutes_per_hour = get_rollup_minutes_per_hour(parking_lot, first_hour, now)
 
-    for r in reservations:
-        # clamp la fereastra de analiză
-        a = max(r.start_time, start_window)
-        b = min(r.end_time, now)
-        if a >= b:
-            continue
-
-        # parcurge orele atinse de interval
-        cur = a
-        while cur < b:
-            hour_start = cur.replace(minute=0, second=0, microsecond=0)
-            hour_end = hour_start + timedelta(hours=1)
-
-            seg_start = max(cur, hour_start)
-            seg_end = min(b, hour_end)
-
-            if seg_start < seg_end:
-                mins = int((seg_end - seg_start).total_seconds() // 60)
-                minutes_per_hour[hour_start.hour] += mins
-
-            cur = hour_end
+    # rezervările terminate din ora parțială [start_window, first_hour) și
+    # cele încă active (nu sunt în rollup, intră acolo când se termină)
+    for statuses, until in ((("finished",), first_hour), (("active",), now)):
+        bucket_starts, per_lot = reserved_minutes_by_bucket(
+            start_window, until, 60, parking_lot, statuses=statuses, exact_since=True
+        )
+        for minutes in per_lot.values():
+            for h, mins in enumerate(minutes_per_hour_of_day(bucket_starts, minutes)):
+                minutes_per_hour[h] += mins
 
     denom = total_spots * 60 * days
     out = []
@@ -170,3 +393,141 @@ def get_hourly_occupancy_probability(parking_lot: str | None, days: int = 7):
         p = minutes_per_hour[h] / denom
         out.append({"hour": h, "p": round(p, 6), "percent": round(p * 100, 2)})
     return out
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def _hourly_minutes_by_lot(parking_lot: str | None, since: datetime, until: datetime):
+    """
+    Minute rezervate pe ore întregi, per parcare, în [ora_întreagă(since), until):
+    rezervările terminate din rollup, cele active din motorul NumPy.
+    Returnează (bucket_starts în minute epoch, { parcare: np.array }).
+    """
+    bucket_starts, per_lot = reserved_minutes_by_bucket(
+        since, until, 60, parking_lot, statuses=("active",)
+    )
+    window_start = int(bucket_starts[0]) if len(bucket_starts) else 0
+
+    for lot, hour_start, mins in get_rollup_rows(parking_lot, since, until):
+        idx = (to_epoch_minutes(hour_start) - window_start) // 60
+        if 0 <= idx < len(bucket_starts):
+            if lot not in per_lot:
+                per_lot[lot] = np.zeros(len(bucket_starts), dtype=np.int64)
+            per_lot[lot][idx] += mins
+    return bucket_starts, per_lot
+
+def _weekday_hour_probability(bucket_starts, minutes, window_end: int, total_spots: int):
+    """Vector de 168 probabilități (zi * 24 + oră) dintr-o serie orară de minute rezervate."""
+    # ultima oră este parțială
+    capacity = np.minimum(window_end - bucket_starts, 60)
+    cells = weekday_hour_cells(bucket_starts)
+    reserved = np.bincount(cells, weights=minutes, minlength=168)
+    available = np.bincount(cells, weights=capacity, minlength=168) * total_spots
+    return np.divide(reserved, available, out=np.zeros(168), where=available > 0)
+
+def get_weekly_occupancy_heatmap(parking_lot: str | None, days: int = 28) -> dict:
+    """
+    Matrice 7 x 24 (zi a săptămânii x oră) cu p(spot rezervat), pe ultimele `days` zile.
+
+    p(Z, H) = minute_rezervate_in_(Z,H) / (nr_spoturi * minute_din_fereastra_in_(Z,H))
+
+    Minutele vin pe ore întregi: rezervările terminate din rollup-ul
+    `occupancy_hourly` (cel mult 24 x days rânduri), cele active din motorul
+    NumPy. Costul nu depinde de numărul de rezervări terminate din fereastră.
+    """
+    now = _now()
+    start_window = now - timedelta(days=days)
+
+    spot_q = db.session.query(func.count(ParkingSpot.id))
+    if parking_lot:
+        spot_q = spot_q.filter(ParkingSpot.parking_lot == parking_lot)
+    total_spots = spot_q.scalar() or 0
+
+    bucket_starts, per_lot = _hourly_minutes_by_lot(parking_lot, start_window, now)
+    minutes = sum(per_lot.values(), np.zeros(len(bucket_starts), dtype=np.int64))
+    p = _weekday_hour_probability(bucket_starts, minutes, to_epoch_minutes(now), total_spots).reshape(7, 24)
+    return {
+        "parking_lot": parking_lot,
+        "analysis_days": days,
+        "total_spots": total_spots,
+        "weekdays": WEEKDAYS,
+        "p": np.round(p, 6).tolist(),
+        "percent": np.round(p * 100, 2).tolist(),
+        "updated_at": now.isoformat(),
+    }
+
+FORECAST_PROFILE_DAYS = 28
+
+def build_lot_profiles(days: int = FORECAST_PROFILE_DAYS) -> dict:
+    """
+    Profilul istoric (zi a săptămânii x oră) al fiecărei parcări, pe ultimele
+    `days` zile: { parcare: {"total_spots", "p": np.array(168)} }.
+    Toate parcările dintr-o dată: un COUNT grupat, o citire din rollup și una
+    pentru rezervările active.
+    """
+    now = _now()
+    bucket_starts, per_lot = _hourly_minutes_by_lot(None, now - timedelta(days=days), now)
+    window_end = to_epoch_minutes(now)
+
+    profiles = {}
+    for lot, counts in get_lot_counts().items():
+        minutes = per_lot.get(lot)
+        if minutes is None:
+            minutes = np.zeros(len(bucket_starts), dtype=np.int64)
+        profiles[lot] = {
+            "total_spots": counts["total"],
+            "p": _weekday_hour_probability(bucket_starts, minutes, window_end, counts["total"]),
+        }
+    return profiles
+
+def get_lot_profiles(days: int = FORECAST_PROFILE_DAYS) -> dict:
+    return profile_cache.get(("profiles", days), lambda: build_lot_profiles(days))
+
+def get_free_spot_forecast(parking_lot: str | None, hours: int = 24) -> dict:
+    """
+    Locuri libere așteptate pentru fiecare din următoarele `hours` ore, per parcare.
+
+    ocupate(H) = max(rezervate_deja(H), p_istoric(zi, H) * total)
+    unde rezervate_deja(H) = numărul mediu de locuri cu rezervare activă în ora H.
+    Pentru ora curentă se ține cont și de locurile ocupate acum.
+
+    Profilele istorice sunt precalculate (profile_cache), deci un răspuns
+    costă O(ore) per parcare plus citirea rezervărilor viitoare.
+    """
+    now = _now()
+    hour_start = now.replace(minute=0, second=0, microsecond=0)
+    profiles = get_lot_profiles()
+    if parking_lot:
+        profiles = {parking_lot: profiles[parking_lot]} if parking_lot in profiles else {}
+
+    bucket_starts, booked_minutes = reserved_minutes_by_bucket(
+        hour_start, hour_start + timedelta(hours=hours), 60, parking_lot, statuses=("active",)
+    )
+    cells = weekday_hour_cells(bucket_starts)
+    current = get_lot_counts(parking_lot)
+
+    lots = {}
+    for lot, profile in profiles.items():
+        total = profile["total_spots"]
+        booked = booked_minutes.get(lot, np.zeros(len(bucket_starts))) / 60
+        expected = np.maximum(booked, profile["p"][cells] * total)
+        if lot in current and len(expected):
+            expected[0] = max(expected[0], current[lot]["total"] - current[lot]["free"])
+        expected = np.minimum(expected, total)
+
+        lots[lot] = [
+            {
+                "hour_start": (hour_start + timedelta(hours=i)).isoformat(),
+                "booked": round(float(booked[i]), 1),
+                "expected_occupied": round(float(expected[i]), 1),
+                "expected_free": round(float(total - expected[i]), 1),
+                "total_spots": total,
+            }
+            for i in range(len(bucket_starts))
+        ]
+
+    return {
+        "generated_at": now.isoformat(),
+        "hours": hours,
+        "profile_days": FORECAST_PROFILE_DAYS,
+        "lots": lots,
+    }
@@ -4,13 +4,25 @@
 # marchează locul ca “reserved”
 # finalizează rezervările expirate
 
+import time
+from functools import partial
+
 from app.extensions import db
-from app.models import Reservation, ParkingSpot
+from app.models import Reservation, ParkingSpot, SpotChange, User
+from app.services.change_feed import record_spot_change, record_spot_changes, run_after_commit
+from app.services.spot_cache import spot_cache
+from app.services.expiry_deadlines import deadlines
+from app.services.occupancy_rollup import add_to_rollup
+from app.services.interval_index import interval_index
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.exc import OperationalError
 
 TIME_LIMIT = 15
 
+# de cate ori reincercam un INSERT condiționat care a pierdut lock-ul de scriere
+INSERT_RETRIES = 5
+
 def _now():
     return datetime.now()
 
@@ -32,10 +44,10 @@ def is_valid_timeframe(start : datetime, end : datetime):
     """Check if timeframe is logical."""
     return start < end
     
-def spot_overlaps(spot_id, start, end):
+def spot_overlaps(spot_id, start, end, session=None):
     """Check if the requested time interval overlaps with existing reservations."""
     return (
-        Reservation.query
+        (session or db.session).query(Reservation.id)
         .filter(
             Reservation.spot_id == spot_id,
             Reservation.status == "active",
@@ -46,9 +58,9 @@ def spot_overlaps(spot_id, start, end):
         is not None
     )
 
-def user_old_reservation_overlaps(user_id, start, end):
+def user_old_reservation_overlaps(user_id, start, end, session=None):
     existing_spot = (
-        Reservation.query
+        (session or db.session).query(Reservation.id)
         .filter(
             Reservation.user_id == user_id,
             Reservation.status == "active",
@@ -59,88 +71,159 @@ def user_old_reservation_overlaps(user_id, start, end):
     )
     return existing_spot is not None
 
-def refresh_spot_reservation_window(spot_id: int) -> None:
+def _insert_if_free(session, user_id, spot_id, start, end):
     """
-    Updates ParkingSpot.reservation_start_time/end_time to reflect:
-    - the current active reservation (if one is active now),
-    - else the next upcoming active reservation,
-    - else clears both fields.
+    INSERT ... SELECT ... WHERE NOT EXISTS (suprapunere pe loc)
+                             AND NOT EXISTS (suprapunere a user-ului)
+    RETURNING id
+
+    Verificarea și inserarea sunt o singură instrucțiune: SQLite o execută
+    sub lock-ul de scriere, deci două cereri concurente nu pot trece amândouă
+    de verificare. Returnează id-ul noii rezervări sau None dacă intervalul
+    nu mai e liber. Nu face commit.
     """
-    spot = ParkingSpot.query.get(spot_id)
-    if not spot:
-        return
-
-    now = _now()
-
-    # 1) Active now
-    current = (
-        Reservation.query
-        .filter(
+    spot_taken = (
+        select(Reservation.id)
+        .where(
             Reservation.spot_id == spot_id,
             Reservation.status == "active",
-            Reservation.start_time <= now,
-            Reservation.end_time > now,
+            Reservation.end_time > start,
+            Reservation.start_time < end,
         )
-        .order_by(Reservation.start_time.asc())
-        .first()
+        .exists()
+    )
+    user_taken = (
+        select(Reservation.id)
+        .where(
+            Reservation.user_id == user_id,
+            Reservation.status == "active",
+            Reservation.end_time >= start,
+            Reservation.start_time < end,
+        )
+        .exists()
     )
+    row = select(
+        literal(user_id),
+        literal(spot_id),
+        literal(start, db.DateTime),
+        literal(end, db.DateTime),
+        literal("active"),
+        literal(_now(), db.DateTime),
+    ).where(~spot_taken, ~user_taken)
+
+    stmt = (
+        insert(Reservation)
+        .from_select(["user_id", "spot_id", "start_time", "end_time", "status", "created_at"], row)
+        .returning(Reservation.id)
+    )
+    return session.execute(stmt).scalar()
 
-    if current:
-        spot.reservation_start_time = current.start_time
-        spot.reservation_end_time = current.end_time
-        db.session.commit()
-        return
+def _recorded_version():
+    """
+    Version of the spot_changes row just recorded in this transaction (the
+    write lock is held, so no other writer can add one in between), used to
+    stamp Reservation.version.
+    """
+    return select(func.max(SpotChange.version)).scalar_subquery()
 
-    # 2) Next upcoming
-    upcoming = (
-        Reservation.query
-        .filter(
-            Reservation.spot_id == spot_id,
+def _is_lock_error(error: OperationalError) -> bool:
+    return "locked" in str(error.orig).lower() or "busy" in str(error.orig).lower()
+
+def _window_subquery(column, now):
+    """
+    First ACTIVE reservation of the outer spot that has not ended yet.
+    Since reservations of a spot do not overlap, ordered by start_time this
+    is the reservation active now if there is one, else the next upcoming one.
+    """
+    return (
+        select(column)
+        .where(
+            Reservation.spot_id == ParkingSpot.id,
             Reservation.status == "active",
-            Reservation.start_time > now,
+            Reservation.end_time > now,
         )
         .order_by(Reservation.start_time.asc())
-        .first()
+        .limit(1)
+        .scalar_subquery()
     )
 
-    if upcoming:
-        spot.reservation_start_time = upcoming.start_time
-        spot.reservation_end_time = upcoming.end_time
-    else:
-        spot.reservation_start_time = None
-        spot.reservation_end_time = None
+def refresh_spot_reservation_windows(spot_ids, now=None, session=None) -> None:
+    """
+    Recomputes reservation_start_time/end_time for many spots with one
+    UPDATE. Does NOT commit and does not record changes: callers do that.
+    """
+    spot_ids = list(spot_ids)
+    if not spot_ids:
+        return
+    now = now or _now()
+
+    (session or db.session).execute(
+        update(ParkingSpot)
+        .where(ParkingSpot.id.in_(spot_ids))
+        .values(
+            reservation_start_time=_window_subquery(Reservation.start_time, now),
+            reservation_end_time=_window_subquery(Reservation.end_time, now),
+        )
+        .execution_options(synchronize_session=False)
+    )
 
+def refresh_spot_reservation_window(spot_id: int) -> None:
+    """
+    Updates ParkingSpot.reservation_start_time/end_time to reflect:
+    - the current active reservation (if one is active now),
+    - else the next upcoming active reservation,
+    - else clears both fields.
+    """
+    refresh_spot_reservation_windows([spot_id])
+    record_spot_change(spot_id)
     db.session.commit()
+    spot_cache.invalidate([spot_id])
 
 def finalize_expired_reservations() -> int:
     """
     Marks expired ACTIVE reservations as FINISHED.
     Returns how many were finalized.
+
+    Set-based: one UPDATE ... RETURNING for the reservations, one UPDATE for
+    the spot windows, one upsert into the hourly occupancy rollup, one commit.
+    The rollup gets exactly the rows the UPDATE finished, so a reservation
+    cancelled concurrently is never counted.
     """
     now = _now()
-    expired = (
-        Reservation.query
-        .filter(Reservation.status == "active", Reservation.end_time <= now)
-        .all()
-    )
-
-    if not expired:
+    expired = and_(Reservation.status == "active", Reservation.end_time <= now)
+
+    finished = db.session.execute(
+        update(Reservation)
+        .where(expired)
+        .values(status="finished")
+        .returning(Reservation.id, Reservation.spot_id, Reservation.start_time, Reservation.end_time)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not finished:
+        db.session.rollback()
         return 0
-
-    affected_spots = set()
-    for r in expired:
-        r.status = "finished"
-        affected_spots.add(r.spot_id)
-
-    db.session.commit()
+    affected_spots = {sid for _, sid, _, _ in finished}
+
+    record_spot_changes(affected_spots)
+    db.session.execute(
+        update(Reservation)
+        .where(Reservation.id.in_([rid for rid, _, _, _ in finished]))
+        .values(version=_recorded_version())
+        .execution_options(synchronize_session=False)
+    )
+    lots = dict(
+        db.session.query(ParkingSpot.id, ParkingSpot.parking_lot).filter(ParkingSpot.id.in_(affected_spots))
+    )
 
     # update cached reservation windows for those spots
-    for sid in affected_spots:
-        refresh_spot_reservation_window(sid)
+    refresh_spot_reservation_windows(affected_spots, now)
+    add_to_rollup((lots.get(sid), start, end) for _, sid, start, end in finished)
+    db.session.commit()
+    spot_cache.invalidate(affected_spots)
 
-    return len(expired)
+    return len(finished)
 
-def create_reservation(user, spot_id, start_time, end_time):
+def create_reservation(user, spot_id, start_time, end_time, session=None):
     """
     Create reservation with validation.
     Raises ValueError with codes:
@@ -148,10 +231,14 @@ def create_reservation(user, spot_id, start_time, end_time):
       - SPOT_NOT_FOUND
       - SPOT_OCCUPIED
       - OVERLAP
-    """
 
-    finalize_expired_reservations()
-    cancel_no_show_reservations()
+    The insert, the spot reservation-window update and the change-log row
+    are one transaction. Without `session` it is committed here (one commit);
+    with an external `session` the caller commits, possibly together with
+    other operations, and caches are updated after that commit.
+    """
+    own_transaction = session is None
+    session = session or db.session
 
     start = parse_iso(start_time)
     end = parse_iso(end_time)
@@ -161,7 +248,7 @@ def create_reservation(user, spot_id, start_time, end_time):
         raise ValueError("INVALID_TIMEFRAME")
     
     # 2. Existing spot
-    spot = ParkingSpot.query.get(spot_id)
+    spot = session.get(ParkingSpot, spot_id)
     if not spot:
         raise ValueError("SPOT_NOT_FOUND")
     
@@ -169,57 +256,157 @@ def create_reservation(user, spot_id, start_time, end_time):
     if spot.is_occupied and spot.occupied_by_email != user.email:
         raise ValueError("SPOT_OCCUPIED")
 
-    # 4. Check overlapping reservations(by spot)
-    if spot_overlaps(spot_id, start, end):
+    # 4. Committed overlap on the spot: fail fast, without taking the write lock
+    if interval_index.overlaps(spot_id, start, end):
         raise ValueError("SPOT_OVERLAP")
-    
-    # 5. Check overlapping reservations(by previous reservations)
-    if user_old_reservation_overlaps(user.id, start, end):
-        raise ValueError("EXISTING_RESERVATION_OVERLAP")
 
-    # 6. Create and save
-    reservation = Reservation(
-        user_id=user.id,
-        spot_id=spot_id,
-        start_time=start,
-        end_time=end,
-        status="active",
-        created_at=_now(),
-    )
-
-    db.session.add(reservation)
-    db.session.commit()
+    # 5. Create and save, only if neither the spot nor the user has an
+    #    overlapping reservation (checked atomically with the insert)
+    for attempt in range(INSERT_RETRIES if own_transaction else 1):
+        try:
+            reservation_id = _insert_if_free(session, user.id, spot_id, start, end)
+            if reservation_id is not None:
+                # Keep spot "reservation window" in sync for Leaflet display
+                refresh_spot_reservation_windows([spot_id], session=session)
+                record_spot_change(spot_id, session)
+                session.execute(
+                    update(Reservation)
+                    .where(Reservation.id == reservation_id)
+                    .values(version=_recorded_version())
+                )
+                # NULL + 1 ramane NULL: un total necunoscut e numarat la citire
+                session.execute(
+                    update(User)
+                    .where(User.id == user.id)
+                    .values(reservation_count=User.reservation_count + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                run_after_commit(partial(spot_cache.invalidate, [spot_id]), session)
+                run_after_commit(partial(deadlines.push, reservation_id, start, end), session)
+            if own_transaction:
+                session.commit()
+            break
+        except OperationalError as e:
+            # alt writer a castigat lock-ul intre citire si scriere: reluam
+            # verificarea pe datele noi (doar daca tranzactia e a noastra)
+            if not own_transaction:
+                raise
+            session.rollback()
+            if not _is_lock_error(e) or attempt == INSERT_RETRIES - 1:
+                raise
+            time.sleep(0.01 * (attempt + 1))
+
+    if reservation_id is None:
+        # 6. Report why (same precedence as before: spot first, then user)
+        if spot_overlaps(spot_id, start, end, session):
+            raise ValueError("SPOT_OVERLAP")
+        raise ValueError("EXISTING_RESERVATION_OVERLAP")
 
-    # Keep spot "reservation window" in sync for Leaflet display
-    refresh_spot_reservation_window(spot_id)
+    return session.get(Reservation, reservation_id)
 
-    return reservation
-
-def cancel_reservation(reservation_id, user):
+def cancel_reservation(reservation_id, user, session=None):
     """
     Cancel a reservation (owner or admin).
     Raises ValueError:
       - NOT_FOUND
       - FORBIDDEN
+
+    One transaction, like create_reservation: committed here unless an
+    external `session` is given.
     """
+    own_transaction = session is None
+    session = session or db.session
 
-    reservation = Reservation.query.get(reservation_id)
+    reservation = session.get(Reservation, reservation_id)
     if not reservation:
         raise ValueError("NOT_FOUND")
 
     if reservation.user_id != user.id and getattr(user, "role", None) != "admin":
         raise ValueError("FORBIDDEN")
 
-    reservation.status = "cancelled"
-    db.session.commit()
+    if reservation.status == "finished" and reservation.spot is not None:
+        # minutele ei erau deja in rollup-ul de ocupare
+        add_to_rollup(
+            [(reservation.spot.parking_lot, reservation.start_time, reservation.end_time)],
+            sign=-1, session=session,
+        )
 
-    refresh_spot_reservation_window(reservation.spot_id)
+    record_spot_change(reservation.spot_id, session)
+    reservation.status = "cancelled"
+    reservation.version = _recorded_version()
+    session.flush()
+
+    refresh_spot_reservation_windows([reservation.spot_id], session=session)
+    run_after_commit(partial(spot_cache.invalidate, [reservation.spot_id]), session)
+    run_after_commit(partial(deadlines.discard, reservation.id), session)
+    if own_transaction:
+        session.commit()
     return reservation
 
+def find_free_spots(parking_lot, start, end, limit=None, user_email=None, session=None) -> list[int]:
+    """
+    Ids of the spots in `parking_lot` with no ACTIVE reservation overlapping
+    [start, end) and not occupied by someone else, in one anti-join query.
+
+    Best fit first: spots whose previous reservation ends closest before
+    `start` come first, so long free gaps on other spots stay intact.
+    """
+    session = session or db.session
+
+    overlapping = (
+        select(Reservation.id)
+        .where(
+            Reservation.spot_id == ParkingSpot.id,
+            Reservation.status == "active",
+            Reservation.end_time > start,
+            Reservation.start_time < end,
+        )
+        .exists()
+    )
+    previous_end = (
+        select(func.max(Reservation.end_time))
+        .where(
+            Reservation.spot_id == ParkingSpot.id,
+            Reservation.status == "active",
+            Reservation.end_time <= start,
+        )
+        .scalar_subquery()
+    )
+    free_now = ParkingSpot.is_occupied == False  # noqa: E712
+    if user_email:
+        free_now = or_(free_now, ParkingSpot.occupied_by_email == user_email)
+
+    query = (
+        session.query(ParkingSpot.id)
+        .filter(ParkingSpot.parking_lot == parking_lot, free_now, ~overlapping)
+        .order_by(previous_end.desc().nulls_last(), ParkingSpot.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return [sid for (sid,) in query.all()]
+
+def reserve_best_spot(user, parking_lot, start_time, end_time, attempts: int = 5):
+    """
+    Reserves the best free spot of `parking_lot` for [start_time, end_time).
+    Each attempt is the atomic conditional insert of create_reservation; if a
+    concurrent booking takes the spot first, the next candidate is tried.
+    Raises the create_reservation codes, or NO_SPOT_AVAILABLE.
+    """
+    start = parse_iso(start_time)
+    end = parse_iso(end_time)
+    if start >= end:
+        raise ValueError("INVALID_TIMEFRAME")
+
+    for spot_id in find_free_spots(parking_lot, start, end, limit=attempts, user_email=user.email):
+        try:
+            return create_reservation(user, spot_id, start_time, end_time)
+        except ValueError as e:
+            if str(e) not in ("SPOT_OVERLAP", "SPOT_OCCUPIED"):
+                raise
+    raise ValueError("NO_SPOT_AVAILABLE")
+
 def get_user_reservations(user_id):
     """Return all reservations of an user."""
-    finalize_expired_reservations()
-    cancel_no_show_reservations()
     return (
         Reservation.query
         .filter_by(user_id=user_id)
@@ -227,9 +414,88 @@ def get_user_reservations(user_id):
         .all()
     )
 
+def encode_cursor(reservation) -> str:
+    """Opaque keyset cursor: the (start_time, id) of the last reservation of a page."""
+    return f"{reservation.start_time.isoformat()}_{reservation.id}"
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        start, _, reservation_id = cursor.rpartition("_")
+        return datetime.fromisoformat(start), int(reservation_id)
+    except ValueError:
+        raise ValueError("INVALID_CURSOR") from None
+
+def get_user_reservations_page(user_id, limit: int, cursor: str | None = None):
+    """
+    One page of a user's reservations, newest start_time first, by keyset on
+    (start_time, id): the page after `cursor` costs the same as the first one.
+    Returns (reservations, next_cursor); next_cursor is None on the last page.
+    """
+    query = (
+        Reservation.query
+        .filter(Reservation.user_id == user_id)
+        .order_by(Reservation.start_time.desc(), Reservation.id.desc())
+    )
+    if cursor:
+        start, reservation_id = decode_cursor(cursor)
+        # row value: SQLite il foloseste ca interval pe ix_reservations_user_start_id
+        query = query.filter(tuple_(Reservation.start_time, Reservation.id) < (start, reservation_id))
+
+    reservations = query.limit(limit + 1).all()
+    if len(reservations) <= limit:
+        return reservations, None
+    return reservations[:limit], encode_cursor(reservations[limit - 1])
+
+def get_user_reservations_changed(user_id, since: int, version: int):
+    """A user's reservations created or changed by versions in (since, version]."""
+    return (
+        Reservation.query
+        .filter(
+            Reservation.user_id == user_id,
+            Reservation.version > since,
+            Reservation.version <= version,
+        )
+        .order_by(Reservation.start_time.desc(), Reservation.id.desc())
+        .all()
+    )
+
+def count_user_reservations(user) -> int:
+    """
+    Total reservations of `user`, from users.reservation_count. When it is
+    unknown (NULL) it is counted once and stored, with one UPDATE, so a
+    concurrent booking cannot slip between the count and the write.
+    """
+    if user.reservation_count is not None:
+        return user.reservation_count
+
+    counted = db.session.execute(
+        update(User)
+        .where(User.id == user.id, User.reservation_count.is_(None))
+        .values(
+            reservation_count=select(func.count(Reservation.id))
+            .where(Reservation.user_id == user.id)
+            .scalar_subquery()
+        )
+        .returning(User.reservation_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.session.commit()
+    if counted is None:
+        # alt proces l-a completat intre timp
+        counted = db.session.query(User.reservation_count).filter(User.id == user.id).scalar() or 0
+    return counted
+
+def reset_reservation_counts(session=None) -> None:
+    """
+    Forgets the stored per-user totals, for scripts that insert or delete
+    reservations in bulk. Does NOT commit.
+    """
+    (session or db.session).execute(
+        update(User).values(reservation_count=None).execution_options(synchronize_session=False)
+    )
+
 def get_spot_reservations(spot_id):
     """Return all reservations for a parking spot."""
-    finalize_expired_reservations()
     return (
         Reservation.query
         .filter_by(spot_id=spot_id)
@@ -241,48 +507,88 @@ def cancel_no_show_reservations() -> int:
     """
     If 15 minutes pass after start_time and the user didn't occupy the spot,
     cancel the reservation and make the spot available again.
+
+    Set-based: the "reserver is parked there" check is a join of
+    parking_spots.occupied_by_email with users.email, so the number of
+    queries does not depend on how many reservations are cancelled.
     """
     t = _now()
     cutoff = t - timedelta(minutes=TIME_LIMIT)
 
-    # reservations that started at least 15 min ago and are still active
-    candidates = (
-        Reservation.query
-        .filter(
-            Reservation.status == "active",
-            Reservation.start_time <= cutoff,
+    # the spot is occupied by the user who made the reservation -> keep it
+    reserver_parked = (
+        select(ParkingSpot.id)
+        .join(User, User.email == ParkingSpot.occupied_by_email)
+        .where(
+            ParkingSpot.id == Reservation.spot_id,
+            ParkingSpot.is_occupied.is_(True),
+            User.id == Reservation.user_id,
         )
-        .all()
+        .exists()
+    )
+    spot_exists = select(ParkingSpot.id).where(ParkingSpot.id == Reservation.spot_id).exists()
+
+    # reservations that started at least 15 min ago, are still active,
+    # and nobody (or someone else) is parked there
+    no_show = and_(
+        Reservation.status == "active",
+        Reservation.start_time <= cutoff,
+        spot_exists,
+        ~reserver_parked,
     )
 
-    if not candidates:
+    affected_spots = [
+        sid for (sid,) in db.session.query(Reservation.spot_id).filter(no_show).distinct()
+    ]
+    if not affected_spots:
         return 0
 
-    affected_spots = set()
-    cancelled = 0
-
-    for r in candidates:
-        spot = ParkingSpot.query.get(r.spot_id)
-        if not spot:
-            continue
-
-        # user who made the reservation
-        # this uses the relationship Reservation.user you already have
-        reserver_email = getattr(r.user, "email", None)
-
-        # If the spot is occupied by the reserver -> OK, keep reservation
-        if spot.is_occupied and reserver_email and spot.occupied_by_email == reserver_email:
-            continue
-
-        # Otherwise it's a no-show (or occupied by someone else)
-        r.status = "cancelled"
-        cancelled += 1
-        affected_spots.add(r.spot_id)
+    record_spot_changes(affected_spots)
+    cancelled = (
+        Reservation.query
+        .filter(no_show)
+        .update({"status": "cancelled", "version": _recorded_version()}, synchronize_session=False)
+    )
 
+    # clear/update spot reservation window used by frontend coloring
+    refresh_spot_reservation_windows(affected_spots, t)
     db.session.commit()
+    spot_cache.invalidate(affected_spots)
 
-    # clear/update spot reservation window used by frontend coloring
-    for sid in affected_spots:
-        refresh_spot_reservation_window(sid)
+    return cancelled
 
-    return cancelled
\ No newline at end of file
+def recheck_no_shows(spot_ids, now=None, session=None) -> list[int]:
+    """
+    Spots were released (toggle, sensor, admin): the reservations running on
+    them whose grace period is already over had their no-show deadline
+    popped while the reserver was parked, so they get it back. Their version
+    is stamped (call after record_spot_changes), which the deadline sync of
+    every process picks up; this process also pushes a deadline for now.
+    Only spots that are free at this point count. Does NOT commit.
+    """
+    spot_ids = list(spot_ids)
+    if not spot_ids:
+        return []
+    now = now or _now()
+    session = session or db.session
+    spot_free = (
+        select(ParkingSpot.id)
+        .where(ParkingSpot.id == Reservation.spot_id, ParkingSpot.is_occupied.is_(False))
+        .exists()
+    )
+    rechecked = session.execute(
+        update(Reservation)
+        .where(
+            Reservation.spot_id.in_(spot_ids),
+            spot_free,
+            Reservation.status == "active",
+            Reservation.start_time <= now - timedelta(minutes=TIME_LIMIT),
+            Reservation.end_time > now,
+        )
+        .values(version=_recorded_version())
+        .returning(Reservation.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if rechecked:
+        run_after_commit(partial(deadlines.recheck, rechecked, now), session)
+    return rechecked
@@ -0,0 +1,145 @@
+# Scheduler in fundal pentru sweep-urile de rezervari.
+#
+# finalize_expired_reservations + cancel_no_show_reservations nu mai ruleaza
+# in request-uri; un thread daemon le ruleaza periodic, intr-un singur loc.
+# Cu mai multe procese worker, doar procesul care detine lease-ul din tabela
+# `scheduler_leases` face sweep-ul.
+#
+# Sweep-ul ruleaza doar cand un termen din `expiry_deadlines` a venit; intre
+# termene thread-ul doar reinnoieste lease-ul si verifica MAX(reservations.version).
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import SchedulerLease
+from app.services.expiry_deadlines import deadlines
+from app.services.reservation_service import finalize_expired_reservations, cancel_no_show_reservations
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LEASE = "reservation_sweeps"
+
+def acquire_lease(name: str, owner: str, ttl_seconds: float) -> bool:
+    """
+    Takes or renews the lease `name` for `owner`.
+    Succeeds if nobody holds it, if `owner` already holds it, or if the
+    previous holder's lease expired. One conditional UPDATE (or INSERT).
+    """
+    now = datetime.now()
+    expires = now + timedelta(seconds=ttl_seconds)
+
+    updated = (
+        SchedulerLease.query
+        .filter(
+            SchedulerLease.name == name,
+            (SchedulerLease.owner == owner) | (SchedulerLease.expires_at < now),
+        )
+        .update({"owner": owner, "expires_at": expires}, synchronize_session=False)
+    )
+    if updated:
+        db.session.commit()
+        return True
+
+    if db.session.get(SchedulerLease, name) is not None:
+        db.session.rollback()
+        return False
+
+    try:
+        db.session.add(SchedulerLease(name=name, owner=owner, expires_at=expires))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # alt proces a inserat lease-ul intre timp
+        db.session.rollback()
+        return False
+
+def run_reservation_sweeps() -> dict:
+    """One sweep pass: finalize expired reservations, then cancel no-shows."""
+    return {
+        "finalized": finalize_expired_reservations(),
+        "no_shows_cancelled": cancel_no_show_reservations(),
+    }
+
+class SweepScheduler:
+    def __init__(self):
+        self.app = None
+        self.interval = 10.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = float(app.config.get("SWEEP_INTERVAL_SECONDS", 10))
+        if not app.config.get("SCHEDULER_ENABLED", True) or app.testing:
+            return
+
+        # pornim la primul request servit, ca scripturile care folosesc
+        # create_app() (create_db.py, seed ...) sa nu porneasca thread-ul
+        @app.before_request
+        def _start_sweep_scheduler():
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            # procesul copil (dupa fork) primeste un owner nou
+            self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            self._thread = threading.Thread(target=self._run, name="reservation-sweeps", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        deadlines.changed.set()
+
+    def _tick(self, ttl: float) -> bool:
+        """One pass; returns whether this process holds the lease."""
+        if not acquire_lease(SWEEP_LEASE, self.owner, ttl):
+            # termenele puse de create_reservation in acest proces sunt treaba
+            # lider-ului; cele trecute nu trebuie sa ne scurteze somnul
+            deadlines.pop_due(datetime.now())
+            return False
+
+        deadlines.sync()
+        now = datetime.now()
+        if not deadlines.is_due(now):
+            return True
+
+        result = run_reservation_sweeps()
+        deadlines.pop_due(now)
+        if result["finalized"] or result["no_shows_cancelled"]:
+            logger.info("reservation sweep: %s", result)
+        return True
+
+    def _run(self) -> None:
+        # lease-ul expira dupa cateva intervale ratate, ca un proces mort sa fie inlocuit
+        ttl = self.interval * 3
+        while not self._stop.is_set():
+            deadlines.changed.clear()
+            wait = self.interval
+            try:
+                with self.app.app_context():
+                    leader = self._tick(ttl)
+                    db.session.remove()
+                until_next = deadlines.seconds_until_next(datetime.now())
+                if leader and until_next:
+                    # ne trezim exact la urmatorul termen viitor; un termen deja
+                    # trecut (0) nu poate face bucla sa ruleze fara pauza
+                    wait = min(wait, until_next)
+            except Exception:
+                logger.exception("reservation sweep failed")
+
+            deadlines.changed.wait(wait)
+
+scheduler = SweepScheduler()
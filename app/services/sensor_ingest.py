@@ -0,0 +1,200 @@
+# Ingestia in bloc a citirilor de la senzorii de sol.
+#
+# Un apel aduce mii de citiri (spot_id, occupied, timestamp). Ele sunt validate
+# si comasate in Python (ultima citire a fiecarui loc castiga), apoi aplicate
+# cu un singur UPDATE ... FROM pe un CTE VALUES, intr-o singura tranzactie.
+# Citirile mai vechi decat ultima aplicata pe loc (sensor_reading_at) sunt
+# ignorate chiar in UPDATE, deci si cele sosite in alta ordine, in alt lot.
+# Cu write-behind activ, citirile comasate intra in buffer si sunt aplicate
+# la flush, impreuna cu cele din alte apeluri, cu un singur commit.
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, DateTime, Integer, and_, case, cast, column, func, literal, null, or_, select, update, values
+
+from app.extensions import db
+from app.models import ParkingSpot
+from app.services.change_feed import record_spot_changes_from
+from app.services.occupancy_log import MS_PER_DAY, SOURCE_SENSOR, log_occupancy_from, to_epoch_ms
+from app.services.reservation_service import recheck_no_shows
+from app.services.spot_cache import spot_cache
+from app.services.write_behind import write_behind
+
+# citiri "din viitor" acceptate (ceasuri de senzori usor decalate)
+MAX_CLOCK_SKEW = timedelta(seconds=60)
+
+# 3 parametri pe rand; SQLite accepta cel mult 32766 intr-o instructiune
+CHUNK_SIZE = 5000
+
+def parse_reading_time(value) -> datetime:
+    """ISO 8601 string or epoch seconds -> naive local datetime (like the rest of the DB)."""
+    if isinstance(value, bool):
+        raise ValueError("INVALID_DATETIME")
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    reading_at = datetime.fromisoformat(value)
+    if reading_at.tzinfo is not None:
+        reading_at = reading_at.astimezone().replace(tzinfo=None)
+    return reading_at
+
+def coalesce_readings(readings, now: datetime, max_age: timedelta) -> tuple[dict, dict]:
+    """
+    Validates the readings and keeps the latest one per spot.
+    Returns ({spot_id: (occupied, reading_at)}, counters).
+    """
+    latest = {}
+    invalid = too_old = 0
+    oldest, newest = now - max_age, now + MAX_CLOCK_SKEW
+
+    for item in readings:
+        try:
+            spot_id = item["spot_id"]
+            occupied = item["occupied"]
+            if type(spot_id) is not int or type(occupied) is not bool:
+                raise ValueError("INVALID_DATA")
+            reading_at = parse_reading_time(item["timestamp"])
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            invalid += 1
+            continue
+        if reading_at > newest:
+            invalid += 1
+            continue
+        if reading_at < oldest:
+            too_old += 1
+            continue
+
+        current = latest.get(spot_id)
+        if current is None or reading_at >= current[1]:
+            latest[spot_id] = (occupied, reading_at)
+
+    counters = {
+        "received": len(readings),
+        "invalid": invalid,
+        "too_old": too_old,
+        "coalesced": len(readings) - invalid - too_old - len(latest),
+    }
+    return latest, counters
+
+def _apply_chunk(rows, session, applied_at: datetime) -> tuple[int, list[int]]:
+    """
+    Applies (spot_id, occupied, reading_at) rows; returns (rows applied, spot
+    ids whose state changed). The flips are logged in occupancy_events at `applied_at`.
+    """
+    batch = (
+        values(
+            column("spot_id", Integer), column("occupied", Boolean), column("reading_at", DateTime),
+            name="sensor_batch",
+        )
+        .data(rows)
+        .cte("sensor_batch")
+    )
+    newer = and_(
+        ParkingSpot.id == batch.c.spot_id,
+        or_(ParkingSpot.sensor_reading_at.is_(None), ParkingSpot.sensor_reading_at < batch.c.reading_at),
+    )
+
+    # intai jurnalele (doar locurile care isi schimba starea), apoi UPDATE-ul;
+    # primul INSERT ia lock-ul de scriere, deci starea citita nu se schimba intre ele
+    flips = (
+        select(batch.c.spot_id, batch.c.occupied)
+        .join(ParkingSpot, newer)
+        .where(ParkingSpot.is_occupied != batch.c.occupied)
+        .subquery()
+    )
+    # momentul aplicarii, nu al citirii: o citire intarziata nu poate ajunge in
+    # jurnal inaintea unei schimbari deja aplicate (toggle, admin)
+    applied_ms = to_epoch_ms(applied_at)
+    log_occupancy_from(
+        select(
+            literal(applied_ms // MS_PER_DAY), literal(applied_ms), flips.c.spot_id,
+            cast(flips.c.occupied, Integer), null(), literal(SOURCE_SENSOR),
+        ),
+        session,
+    )
+    changed = record_spot_changes_from(select(flips.c.spot_id), session)
+    session.execute(
+        update(ParkingSpot)
+        .where(newer)
+        .values(
+            is_occupied=batch.c.occupied,
+            # un loc eliberat nu mai are ocupant; unul ocupat il pastreaza pe cel cunoscut
+            occupied_by_email=case((batch.c.occupied.is_(True), ParkingSpot.occupied_by_email), else_=None),
+            sensor_reading_at=batch.c.reading_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # cursor.rowcount nu e setat pentru instructiuni care incep cu WITH
+    applied = session.execute(select(func.changes())).scalar()
+    # rezervarea celui care a plecat poate deveni no-show
+    recheck_no_shows(changed, applied_at, session)
+    return applied, changed
+
+def apply_readings(rows, session, applied_at: datetime) -> tuple[int, list[int]]:
+    """
+    Applies coalesced (spot_id, occupied, reading_at) rows in chunks; returns
+    (rows applied, spot ids whose state changed). Does NOT commit.
+    """
+    applied, changed = 0, []
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk_applied, chunk_changed = _apply_chunk(rows[i:i + CHUNK_SIZE], session, applied_at)
+        applied += chunk_applied
+        changed += chunk_changed
+    return applied, changed
+
+def _stage_readings(rows) -> tuple[int, int]:
+    """
+    Write-behind: buffers the rows newer than the spot's last reading
+    (buffered or committed). Returns (rows staged, spots that will flip).
+    Only reads the database; the flush re-checks everything in its UPDATE.
+    """
+    staged, flips = [], 0
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        current = {
+            spot_id: (is_occupied, reading_at)
+            for spot_id, is_occupied, reading_at in db.session.execute(
+                select(ParkingSpot.id, ParkingSpot.is_occupied, ParkingSpot.sensor_reading_at)
+                .where(ParkingSpot.id.in_([spot_id for spot_id, _, _ in chunk]))
+            )
+        }
+        for spot_id, occupied, reading_at in chunk:
+            if spot_id not in current:
+                continue
+            is_occupied, last_reading_at = write_behind.sensor_state(spot_id, *current[spot_id])
+            if last_reading_at is not None and reading_at <= last_reading_at:
+                continue
+            staged.append((spot_id, occupied, reading_at))
+            flips += is_occupied != occupied
+    write_behind.stage_readings(staged)
+    return len(staged), flips
+
+def ingest_readings(readings, max_age_seconds: float = 300, now=None) -> dict:
+    """
+    Applies a batch of sensor readings in one transaction and returns counters:
+    received, invalid, too_old, coalesced (superseded in the same batch),
+    applied, ignored (older than the spot's last applied reading, or unknown
+    spot) and changed (spots whose occupancy flipped).
+    With write-behind enabled the readings are buffered instead (see
+    write_behind); the counters are then computed against the buffered state
+    and the response has "buffered": true.
+    """
+    now = now or datetime.now()
+    latest, summary = coalesce_readings(readings, now, timedelta(seconds=max_age_seconds))
+    rows = [(spot_id, occupied, reading_at) for spot_id, (occupied, reading_at) in latest.items()]
+
+    if write_behind.enabled:
+        staged, flips = _stage_readings(rows)
+        summary.update(applied=staged, ignored=len(rows) - staged, changed=flips, buffered=True)
+        return summary
+
+    session = db.session
+    try:
+        applied, changed = apply_readings(rows, session, now)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    spot_cache.invalidate(changed)
+
+    summary.update(applied=applied, ignored=len(rows) - applied, changed=len(changed))
+    return summary
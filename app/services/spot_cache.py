@@ -0,0 +1,166 @@
+# Cache pentru payload-ul serializat al GET /parking/spots.
+#
+# Fiecare spot este tinut ca fragment JSON gata serializat, iar fiecare parcare
+# ca alaturarea fragmentelor ei. Un GET fara modificari doar concateneaza
+# string-urile, fara sa hidrateze obiecte ORM.
+#
+# Invalidare:
+# - explicita, din codul care modifica locuri (mark_spot_free, toggle, modify_spot ...)
+# - prin jurnalul spot_changes: daca versiunea globala s-a schimbat (ex: commit
+#   facut de alt proces), se invalideaza exact locurile atinse intre timp.
+
+import json
+import threading
+import time
+
+from app.models import ParkingSpot
+from app.services.change_feed import current_version, get_changed_spot_ids
+
+class SpotPayloadCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fragments = {}    # spot_id -> JSON (str)
+        self._lot_of = {}       # spot_id -> numele parcarii
+        self._members = {}      # parcare -> set(spot_id)
+        self._lots = {}         # parcare -> fragmentele alaturate (str)
+        self._dirty_spots = set()
+        self._dirty_lots = set()
+        self._version = None    # versiunea din spot_changes reflectata de cache
+
+        self.spot_hits = 0
+        self.spot_misses = 0
+        self.lot_hits = 0
+        self.lot_misses = 0
+        self.rebuilds = 0
+        self.rebuild_seconds = 0.0
+        self.last_rebuild_ms = 0.0
+
+    def invalidate(self, spot_ids) -> None:
+        with self._lock:
+            for sid in spot_ids:
+                self._dirty_spots.add(sid)
+                lot = self._lot_of.get(sid)
+                if lot is not None:
+                    self._dirty_lots.add(lot)
+
+    def invalidate_lot(self, lot_name: str) -> None:
+        with self._lock:
+            self._dirty_spots.update(self._members.get(lot_name, ()))
+            self._dirty_lots.add(lot_name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def get_payload(self, overrides=None):
+        """
+        Returns (version, JSON array of all spots as str). `overrides`
+        ({spot_id: {field: value}}) patches the listed spots, e.g. changes
+        not committed yet; only the lots containing them are re-joined.
+        """
+        version = current_version()
+
+        with self._lock:
+            started = time.perf_counter()
+            rebuilt = 0
+
+            if self._version is None or version < self._version:
+                rebuilt = self._rebuild_all()
+            else:
+                if version != self._version:
+                    self._dirty_spots.update(get_changed_spot_ids(self._version, version))
+                if self._dirty_spots:
+                    rebuilt = self._rebuild_spots(self._dirty_spots)
+            self._version = version
+
+            dirty_lots = self._dirty_lots
+            for lot in dirty_lots:
+                parts = [self._fragments[sid] for sid in sorted(self._members.get(lot, ()))]
+                if parts:
+                    self._lots[lot] = ",".join(parts)
+                else:
+                    self._lots.pop(lot, None)
+            self.lot_misses += len(dirty_lots)
+            self.lot_hits += len(self._lots) - len(dirty_lots & self._lots.keys())
+            self._dirty_lots = set()
+
+            self.spot_misses += rebuilt
+            self.spot_hits += len(self._fragments) - min(rebuilt, len(self._fragments))
+            if rebuilt or dirty_lots:
+                elapsed = time.perf_counter() - started
+                self.rebuilds += 1
+                self.rebuild_seconds += elapsed
+                self.last_rebuild_ms = round(elapsed * 1000, 3)
+
+            if overrides:
+                touched = {self._lot_of.get(sid) for sid in overrides}
+                parts = [
+                    ",".join(self._patched(sid, overrides) for sid in sorted(self._members[lot]))
+                    if lot in touched else self._lots[lot]
+                    for lot in sorted(self._lots)
+                ]
+            else:
+                parts = [self._lots[lot] for lot in sorted(self._lots)]
+            body = "[" + ",".join(parts) + "]"
+        return version, body
+
+    def _patched(self, spot_id: int, overrides: dict) -> str:
+        fields = overrides.get(spot_id)
+        if not fields:
+            return self._fragments[spot_id]
+        return json.dumps({**json.loads(self._fragments[spot_id]), **fields})
+
+    def _store(self, spot) -> None:
+        self._forget(spot.id)
+        self._fragments[spot.id] = json.dumps(spot.to_dict())
+        self._lot_of[spot.id] = spot.parking_lot
+        self._members.setdefault(spot.parking_lot, set()).add(spot.id)
+        self._dirty_lots.add(spot.parking_lot)
+
+    def _forget(self, spot_id: int) -> None:
+        self._fragments.pop(spot_id, None)
+        lot = self._lot_of.pop(spot_id, None)
+        if lot is not None:
+            self._members[lot].discard(spot_id)
+            self._dirty_lots.add(lot)
+
+    def _rebuild_all(self) -> int:
+        self._fragments = {}
+        self._lot_of = {}
+        self._members = {}
+        self._lots = {}
+        spots = ParkingSpot.query.all()
+        for spot in spots:
+            self._store(spot)
+        self._dirty_spots = set()
+        return len(spots)
+
+    def _rebuild_spots(self, spot_ids) -> int:
+        ids = list(spot_ids)
+        spots = ParkingSpot.query.filter(ParkingSpot.id.in_(ids)).all()
+        for spot in spots:
+            self._store(spot)
+        # locuri sterse
+        for sid in set(ids) - {s.id for s in spots}:
+            self._forget(sid)
+        self._dirty_spots = set()
+        return len(spots)
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.spot_hits + self.spot_misses
+            return {
+                "entries": len(self._fragments),
+                "lots": len(self._lots),
+                "version": self._version,
+                "spot_hits": self.spot_hits,
+                "spot_misses": self.spot_misses,
+                "hit_ratio": round(self.spot_hits / served, 4) if served else None,
+                "lot_hits": self.lot_hits,
+                "lot_misses": self.lot_misses,
+                "rebuilds": self.rebuilds,
+                "last_rebuild_ms": self.last_rebuild_ms,
+                "avg_rebuild_ms": round(self.rebuild_seconds * 1000 / self.rebuilds, 3) if self.rebuilds else None,
+            }
+
+spot_cache = SpotPayloadCache()
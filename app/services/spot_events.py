@@ -0,0 +1,127 @@
+# Flux Server-Sent Events pentru schimbarile de stare ale locurilor.
+#
+# Un singur thread "poller" per proces citeste jurnalul spot_changes si
+# publica evenimente intr-un buffer circular din memorie. Conexiunile SSE
+# doar asteapta pe un Condition si citesc din buffer: nu tin deschisa nicio
+# conexiune la baza de date, iar sub un worker gevent/eventlet (monkey-patched)
+# asteptarea costa un greenlet, nu un thread de sistem.
+
+import json
+import logging
+import threading
+from collections import deque
+
+from app.extensions import db
+from app.services.change_feed import current_version, get_spot_changes, on_spot_changes_committed
+from app.services.parking_service import get_parking_stats_by_lot
+
+logger = logging.getLogger(__name__)
+
+class SpotEventBroker:
+    def __init__(self, buffer_size: int = 256):
+        self.app = None
+        self.version = 0
+        self.poll_seconds = 1.0
+        self.heartbeat_seconds = 15
+        # (since, version, payload_json) in ordinea versiunilor
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_seconds = app.config.get("SSE_POLL_SECONDS", 1.0)
+        self.heartbeat_seconds = app.config.get("SSE_HEARTBEAT_SECONDS", 15)
+        # commit local -> trezeste poller-ul imediat, fara sa astepte urmatorul tick
+        on_spot_changes_committed(self.notify)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            with self.app.app_context():
+                self.version = current_version()
+                db.session.remove()
+            self._thread = threading.Thread(target=self._run, name="spot-events", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self._poll()
+                    db.session.remove()
+            except Exception:
+                logger.exception("spot-events: poll failed")
+
+    def _poll(self) -> None:
+        since = self.version
+        version, spots, deleted = get_spot_changes(since)
+        if version == since:
+            return
+
+        lots = {s.parking_lot for s in spots}
+        per_lot, global_stats = get_parking_stats_by_lot()
+        payload = {
+            "version": version,
+            "since": since,
+            "spots": [s.to_dict() for s in spots],
+            "deleted": deleted,
+            "lots": {lot: stats for lot, stats in per_lot.items() if lot in lots},
+            "global": global_stats,
+        }
+        with self._cond:
+            # versiunea a scazut (baza recreata) -> clientii trebuie sa reia de la zero
+            if version < since:
+                self._events.clear()
+            self._events.append((since, version, json.dumps(payload)))
+            self.version = version
+            self._cond.notify_all()
+
+    def _pending(self, last_id: int):
+        """Events after `last_id`, or None if the buffer no longer covers it."""
+        events = [e for e in self._events if e[1] > last_id]
+        if events and events[0][0] > last_id:
+            return None
+        if not events and last_id != self.version:
+            return None
+        return events
+
+    def stream(self, last_id=None):
+        """Generator of SSE frames; resumes after `last_id` when possible."""
+        self._ensure_started()
+
+        yield "retry: 3000\n\n"
+        if last_id is None:
+            last_id = self.version
+            yield f"id: {last_id}\nevent: hello\ndata: {json.dumps({'version': last_id})}\n\n"
+
+        while True:
+            with self._cond:
+                events = self._pending(last_id)
+                if events == []:
+                    self._cond.wait(self.heartbeat_seconds)
+                    events = self._pending(last_id)
+
+            if events is None:
+                last_id = self.version
+                yield f"id: {last_id}\nevent: reset\ndata: {json.dumps({'version': last_id})}\n\n"
+                continue
+
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+
+            for _, version, data in events:
+                yield f"id: {version}\nevent: spots\ndata: {data}\n\n"
+                last_id = version
+
+broker = SpotEventBroker()
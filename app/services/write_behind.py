@@ -0,0 +1,233 @@
+# Buffer "write-behind" pentru ocuparea / eliberarea locurilor (optional).
+#
+# Cu `write_behind_enabled`, citirile senzorilor (POST /sensors/readings) si
+# mark_spot_occupied / mark_spot_free nu mai fac commit: schimbarea intra
+# intr-un buffer din memorie (ultima stare / cea mai noua citire per loc
+# castiga) si e vizibila imediat in acest proces prin `overlay()`. Un thread
+# scrie buffer-ul in baza cu un singur commit la fiecare `write_behind_flush_ms`
+# sau cand se strang `write_behind_max_pending` locuri; la oprirea curata a
+# procesului (atexit) buffer-ul e golit. Citirile trec la flush prin acelasi
+# UPDATE conditionat ca ingestia directa (vezi sensor_ingest.apply_readings),
+# deci o citire mai veche decat ultima aplicata tot nu castiga.
+#
+# Fereastra de durabilitate: o schimbare poate fi pierduta doar daca procesul
+# moare brusc in cel mult `write_behind_flush_ms` de la ea. Celelalte procese
+# o vad dupa flush, prin jurnalul spot_changes.
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models import ParkingSpot
+from app.services.change_feed import record_spot_changes
+from app.services.occupancy_log import log_occupancy
+from app.services.reservation_service import recheck_no_shows
+from app.services.spot_cache import spot_cache
+
+logger = logging.getLogger(__name__)
+
+class OccupancyWriteBehind:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.flush_seconds = 0.25
+        self.max_pending = 1000
+        self._pending = {}      # spot_id -> campurile noi, ex: {"is_occupied": True, "occupied_by_email": ...}
+        self._flushing = {}     # scrise acum in baza; raman in overlay pana la commit
+        self._events = []       # randuri occupancy_events, toate (nu doar ultima stare)
+        self._readings = {}     # spot_id -> (occupied, reading_at), cea mai noua citire de senzor
+        self._flushing_readings = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.failed_flushes = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("WRITE_BEHIND_ENABLED", False)
+        self.flush_seconds = app.config.get("WRITE_BEHIND_FLUSH_MS", 250) / 1000
+        self.max_pending = app.config.get("WRITE_BEHIND_MAX_PENDING", 1000)
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def stage(self, spot_id: int, event=None, **fields) -> None:
+        """
+        Buffers new column values of a spot (is_occupied, occupied_by_email)
+        and its occupancy_events row, if any; the flusher thread writes them.
+        A later stage of the same spot wins; every event is kept.
+        """
+        self._ensure_started()
+        with self._lock:
+            self._pending[spot_id] = {**self._pending.get(spot_id, {}), **fields}
+            if event is not None:
+                self._events.append(event)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def stage_readings(self, rows) -> None:
+        """
+        Buffers sensor readings (spot_id, occupied, reading_at); for each spot
+        the newest reading is kept. They are applied after the staged columns.
+        """
+        if not rows:
+            return
+        self._ensure_started()
+        with self._lock:
+            _merge_readings(self._readings, {spot_id: (occupied, at) for spot_id, occupied, at in rows})
+            full = len(self._pending) + len(self._readings) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def sensor_state(self, spot_id: int, is_occupied: bool, reading_at):
+        """
+        (is_occupied, last reading time) of a spot as it will be after the
+        flush; the committed values are passed in and used when nothing is buffered.
+        """
+        with self._lock:
+            for source in (self._readings, self._flushing_readings):
+                if spot_id in source:
+                    return source[spot_id]
+            for source in (self._pending, self._flushing):
+                if "is_occupied" in source.get(spot_id, {}):
+                    return source[spot_id]["is_occupied"], reading_at
+        return is_occupied, reading_at
+
+    def overlay(self) -> dict:
+        """Buffered values not committed yet: {spot_id: {column: value}}."""
+        with self._lock:
+            if not (self._pending or self._flushing or self._readings or self._flushing_readings):
+                return {}
+            overlay = dict(self._flushing)
+            for spot_id, fields in self._pending.items():
+                overlay[spot_id] = {**overlay.get(spot_id, {}), **fields}
+            for readings in (self._flushing_readings, self._readings):
+                for spot_id, (occupied, _) in readings.items():
+                    # ca in UPDATE-ul senzorilor: un loc eliberat nu mai are ocupant
+                    fields = {"is_occupied": occupied} if occupied else {"is_occupied": False, "occupied_by_email": None}
+                    overlay[spot_id] = {**overlay.get(spot_id, {}), **fields}
+            return overlay
+
+    def pending_value(self, spot_id: int, field: str, default):
+        """Buffered value of a spot column, or `default` if none is buffered."""
+        with self._lock:
+            for source in (self._pending, self._flushing):
+                if field in source.get(spot_id, {}):
+                    return source[spot_id][field]
+            return default
+
+    def is_pending(self, spot_id: int) -> bool:
+        with self._lock:
+            return any(spot_id in source for source in (
+                self._pending, self._flushing, self._readings, self._flushing_readings,
+            ))
+
+    def flush(self) -> int:
+        """
+        Writes the buffer in one transaction (one bulk UPDATE for the staged
+        columns, then the sensor readings) and one commit, in its own app
+        context (and session). Returns the number of buffered changes written;
+        on failure they go back into the buffer (unless overwritten meanwhile).
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                events, self._events = self._events, []
+                readings, self._readings = self._readings, {}
+                self._flushing, self._flushing_readings = batch, readings
+            if not batch and not readings:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    self._write(batch, events, readings)
+                    db.session.remove()
+            except Exception:
+                logger.exception("write-behind: flush of %d changes failed", len(batch) + len(readings))
+                with self._lock:
+                    for spot_id, fields in batch.items():
+                        self._pending[spot_id] = {**fields, **self._pending.get(spot_id, {})}
+                    self._events = events + self._events
+                    _merge_readings(self._readings, readings)
+                    self._flushing, self._flushing_readings = {}, {}
+                self.failed_flushes += 1
+                return 0
+
+            with self._lock:
+                self._flushing, self._flushing_readings = {}, {}
+            self.flushes += 1
+            self.flushed_changes += len(batch) + len(readings)
+            return len(batch) + len(readings)
+
+    def _write(self, batch: dict, events: list, readings: dict) -> None:
+        # import circular: sensor_ingest pune citirile in acest buffer
+        from app.services.sensor_ingest import apply_readings
+
+        changed = set()
+        if batch:
+            # locurile sterse intre timp sunt sarite
+            changed = {
+                sid for (sid,) in
+                db.session.query(ParkingSpot.id).filter(ParkingSpot.id.in_(list(batch)))
+            }
+            rows = [{"id": spot_id, **fields} for spot_id, fields in batch.items() if spot_id in changed]
+            if rows:
+                # UPDATE ... WHERE id = ? executat o data pentru toate randurile (executemany)
+                db.session.execute(update(ParkingSpot), rows)
+                log_occupancy([event for event in events if event["spot_id"] in changed])
+                record_spot_changes(changed)
+                recheck_no_shows(changed)
+        if readings:
+            rows = [(spot_id, occupied, reading_at) for spot_id, (occupied, reading_at) in readings.items()]
+            _, flipped = apply_readings(rows, db.session, datetime.now())
+            changed.update(flipped)
+        db.session.commit()
+        spot_cache.invalidate(changed)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("write-behind: flush failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending.keys() | self._readings.keys())
+        return {
+            "enabled": self.enabled,
+            "flush_ms": round(self.flush_seconds * 1000),
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "flushes": self.flushes,
+            "flushed_changes": self.flushed_changes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+def _merge_readings(into: dict, readings: dict) -> None:
+    """Merges {spot_id: (occupied, reading_at)} into `into`, keeping the newest reading per spot."""
+    for spot_id, reading in readings.items():
+        current = into.get(spot_id)
+        if current is None or reading[1] >= current[1]:
+            into[spot_id] = reading
+
+write_behind = OccupancyWriteBehind()
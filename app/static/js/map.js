@@ -23,9 +23,12 @@ let routingCancelWrapper = null;
 
 let myReservations = [];     // încărcat din /reservation/my
 let myReservationsTotal = 0;        // total count from backend
+let myReservationsVersion = null;   // `version` din ultimul raspuns /reservations/my (pentru ?since=)
 let showFullReservationHistory = false;
 
 const RESERVATION_HISTORY_LIMIT = 5;
+const RESERVATION_PAGE_SIZE = 100;     // maximul acceptat de /reservations/my
+const RESERVATION_FULL_MAX = 1000;     // "enough" instead of infinity
 
 let selectedReserveSpotId = null;
 
@@ -65,22 +68,49 @@ function getActiveReservationForSpot(spotId) {
     return myReservations.find(r => r.spot_id === spotId && r.status === "active") || null;
 }
 
-function fetchMyReservations({ forceFull = false } = {}) {
+function fetchReservationsPage(query) {
+    return fetch(`/reservations/my?${query}`).then(res => {
+        if (res.status === 401) return { total: 0, version: null, next_cursor: null, items: [] };
+        if (!res.ok) throw new Error(`API error: ${res.status}`);
+        return res.json();
+    });
+}
+
+function compareReservations(a, b) {
+    // ca pe server: start_time descrescator, apoi id descrescator
+    return (new Date(b.start_time) - new Date(a.start_time)) || (b.id - a.id);
+}
+
+// Istoricul complet: pagini keyset de cate RESERVATION_PAGE_SIZE, pana la RESERVATION_FULL_MAX
+function fetchAllReservationPages(items = [], cursor = null) {
+    const query = `limit=${RESERVATION_PAGE_SIZE}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+    return fetchReservationsPage(query).then(data => {
+        const all = items.concat(Array.isArray(data?.items) ? data.items : []);
+        if (!data?.next_cursor || all.length >= RESERVATION_FULL_MAX) {
+            return { ...data, items: all };
+        }
+        // versiunea ramane cea a primei pagini: schimbarile dintre pagini vin la urmatorul `since`
+        return fetchAllReservationPages(all, data.next_cursor).then(rest => ({ ...rest, version: data.version }));
+    });
+}
+
+function fetchMyReservations({ forceFull = false, onlyIfChanged = false } = {}) {
     if (!isLoggedIn()) return Promise.resolve([]);
 
+    if (onlyIfChanged && myReservationsVersion !== null) {
+        return fetchReservationChanges();
+    }
+
      // Decide what to load
     const wantFull = forceFull || showFullReservationHistory;
-    const limit = wantFull ? 1000 : RESERVATION_HISTORY_LIMIT; // "enough" instead of infinity
-    const offset = 0;
+    const request = wantFull
+        ? fetchAllReservationPages()
+        : fetchReservationsPage(`limit=${RESERVATION_HISTORY_LIMIT}`);
 
-    return fetch(`/reservations/my?limit=${limit}&offset=${offset}`)
-        .then(res => {
-            if (res.status === 401) return { total: 0, items: [] };
-            if (!res.ok) throw new Error(`API error: ${res.status}`);
-            return res.json();
-        })
+    return request
         .then(data => {
             myReservationsTotal = Number(data?.total || 0);
+            myReservationsVersion = data?.version ?? null;
             myReservations = Array.isArray(data?.items) ? data.items : [];
 
             renderReservationSidebar();
@@ -89,12 +119,45 @@ function fetchMyReservations({ forceFull = false } = {}) {
         .catch(err => {
             console.warn('Eroare la incarcarea rezervarilor:', err);
             myReservationsTotal = 0;
+            myReservationsVersion = null;
             myReservations = [];
             renderReservationSidebar();
             return [];
         });
 }
 
+// Doar rezervarile create / schimbate dupa myReservationsVersion, combinate cu lista curenta
+function fetchReservationChanges() {
+    return fetchReservationsPage(`since=${myReservationsVersion}`)
+        .then(data => {
+            const total = Number(data?.total || 0);
+            const changed = Array.isArray(data?.items) ? data.items : [];
+
+            if (data?.reset || total < myReservationsTotal) {
+                // versiune necunoscuta serverului (baza recreata) sau rezervari
+                // sterse (nu apar in diferente) -> reincarcam lista
+                myReservationsVersion = null;
+                return fetchMyReservations();
+            }
+            myReservationsVersion = data?.version ?? myReservationsVersion;
+            if (!changed.length && total === myReservationsTotal) return myReservations;
+
+            const byId = new Map(myReservations.map(r => [r.id, r]));
+            changed.forEach(r => byId.set(r.id, r));
+            let merged = Array.from(byId.values()).sort(compareReservations);
+            if (!showFullReservationHistory) merged = merged.slice(0, RESERVATION_HISTORY_LIMIT);
+
+            myReservationsTotal = total;
+            myReservations = merged;
+            renderReservationSidebar();
+            return myReservations;
+        })
+        .catch(err => {
+            console.warn('Eroare la actualizarea rezervarilor:', err);
+            return myReservations;
+        });
+}
+
 function renderReservationSidebar() {
     const currentEl = document.getElementById('current-reservation-content');
     const historyEl = document.getElementById('reservation-history-content');
@@ -852,6 +915,7 @@ function loadParkingSpots() {
             if (!response.ok) {
                 throw new Error(`API error: ${response.status}`);
             }
+            spotsVersion = Number(response.headers.get('X-Spots-Version') || 0);
             return response.json();
         })
         .then(spots => {
@@ -1141,12 +1205,12 @@ function toggleParkingSpot(spotId, currentStatus) {
         const data = await response.json().catch(() => ({}));
         
         if (response.status === 409) {
-            showToast(data?.error || 'Loc indisponibil.', 'warning');
+            showToast(data?.message || data?.error || 'Loc indisponibil.', 'warning');
             return null;
             
         }
         if (response.status === 403) {
-            showToast('Acest loc e ocupat de o altă persoană!', 'error');
+            showToast(data?.message || 'Acest loc e ocupat de o altă persoană!', 'error');
             return null;
         }
         if (response.status === 401) {
@@ -1345,9 +1409,51 @@ function centerMap(lat, lng, zoom = DEFAULT_ZOOM) {
     map.setView([lat, lng], zoom);
 }
 
-function refreshParkingSpots() {
+function renderAllParkingSpots() {
     clearMarkers();
-    loadParkingSpots();
+    allParkingSpots.forEach(spot => addParkingMarker(spot));
+}
+
+// Aplica o lista de diferente ({ version, full, spots, deleted }) peste allParkingSpots
+function applySpotDelta(delta) {
+    const changed = delta.full || delta.spots.length > 0 || delta.deleted.length > 0;
+    spotsVersion = delta.version;
+
+    if (delta.full) {
+        allParkingSpots = delta.spots;
+    } else if (changed) {
+        const byId = new Map(allParkingSpots.map(s => [s.id, s]));
+        delta.deleted.forEach(id => byId.delete(id));
+        delta.spots.forEach(s => byId.set(s.id, s));
+        allParkingSpots = [...byId.values()];
+    }
+    return changed;
+}
+
+// Cere doar locurile modificate dupa ultima versiune primita (GET /parking/spots?since=...)
+function refreshParkingSpots({ onlyIfChanged = false } = {}) {
+    if (spotsVersion === null) {
+        clearMarkers();
+        loadParkingSpots();
+        return;
+    }
+
+    fetch(`/parking/spots?since=${spotsVersion}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`API error: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(delta => {
+            const changed = applySpotDelta(delta);
+            if (changed || !onlyIfChanged) {
+                renderAllParkingSpots();
+            }
+        })
+        .catch(error => {
+            console.error('Eroare la actualizarea locurilor de parcare:', error);
+        });
 }
 
 document.addEventListener('DOMContentLoaded', function() {
@@ -1367,6 +1473,7 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 let allParkingSpots = [];
+let spotsVersion = null;   // ultima versiune primita de la /parking/spots
 
 function initializeFilters() {
     fetch('/parking/spots')
@@ -1453,21 +1560,65 @@ function restoreFilters() {
 
 let AUTO_REFRESH_MS = 5000; // 5s (pick 5–15s)
 
-function startAutoRefresh() {
-  setInterval(() => {
-    // This will fetch latest spots; since backend finalizes expired ones here,
-    // the yellow -> green/red transitions happen automatically.
-    refreshParkingSpots();
-    fetchParkingStatsForSelection({ silent: true });
+let spotEventSource = null;
+let autoRefreshTimer = null;
 
-    // Optional: also refresh reservation panels if you show them
-    // if (window.CURRENT_USER?.isAuthenticated && typeof fetchMyReservations === "function") {
-    //   fetchMyReservations();
-    // }
+function pollAutoRefresh() {
+    // Only spots changed since the last version are fetched; expired reservations
+    // bump the version too, so yellow -> green/red transitions still show up.
+    refreshParkingSpots({ onlyIfChanged: true });
+    fetchParkingStatsForSelection({ silent: true });
 
     if (window.CURRENT_USER?.isAuthenticated && typeof fetchMyReservations === "function") {
-        // Keep sidebar updated, but avoid reloading full history too often
-        fetchMyReservations({ forceFull: false });
+        // Keep sidebar updated: only reservations changed since the last version
+        fetchMyReservations({ onlyIfChanged: true });
     }
-  }, AUTO_REFRESH_MS);
+}
+
+// Serverul trimite schimbarile prin SSE (/parking/spots/stream), deci nu mai facem polling.
+function startSpotStream() {
+    if (!window.EventSource) return false;
+
+    spotEventSource = new EventSource('/parking/spots/stream');
+
+    spotEventSource.addEventListener('spots', (event) => {
+        const delta = JSON.parse(event.data);
+        if (spotsVersion !== null && delta.version <= spotsVersion) return;
+
+        if (spotsVersion === null || delta.since > spotsVersion) {
+            // am pierdut modificari intre timp -> cerem diferenta prin HTTP
+            refreshParkingSpots({ onlyIfChanged: true });
+        } else if (applySpotDelta(delta)) {
+            renderAllParkingSpots();
+        }
+
+        const lotName = getSelectedParkingLotName();
+        const stats = lotName ? delta.lots[lotName] : delta.global;
+        if (stats && document.getElementById("stats-title")) {
+            renderStats(stats, lotName);
+        }
+
+        if (window.CURRENT_USER?.isAuthenticated && typeof fetchMyReservations === "function") {
+            fetchMyReservations({ onlyIfChanged: true });
+        }
+    });
+
+    spotEventSource.addEventListener('reset', () => {
+        spotsVersion = null;
+        refreshParkingSpots();
+        fetchParkingStatsForSelection({ silent: true });
+    });
+
+    spotEventSource.onerror = () => {
+        // EventSource se reconecteaza singur; daca a renuntat definitiv, revenim la polling
+        if (spotEventSource.readyState === EventSource.CLOSED && !autoRefreshTimer) {
+            autoRefreshTimer = setInterval(pollAutoRefresh, AUTO_REFRESH_MS);
+        }
+    };
+    return true;
+}
+
+function startAutoRefresh() {
+    if (startSpotStream()) return;
+    autoRefreshTimer = setInterval(pollAutoRefresh, AUTO_REFRESH_MS);
 }
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Cache in memorie, per proces, cu expirare (TTL).
+
+Folosit pentru raspunsuri agregate care sunt cerute des (dashboard-uri care
+fac polling) si se pot servi cateva secunde "vechi". Scrierile locale pot
+goli cache-ul explicit; TTL-ul limiteaza cat de vechi pot fi datele scrise de
+alte procese.
+
+- "single-flight": mai multe cereri concurente pentru aceeasi cheie lipsa
+  asteapta o singura incarcare, in loc sa loveasca fiecare baza de date;
+- LRU: cel mult `max_entries` intrari, cele mai vechi folosite sunt scoase.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class _Flight:
+    """O incarcare in curs; ceilalti apelanti asteapta pe `done`."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    def __init__(self, ttl: float = 5.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value), in ordinea LRU
+        self._inflight = {}             # key -> _Flight
+        self._generation = 0            # creste la fiecare invalidare
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key, loader, ttl: float | None = None):
+        """
+        Returns the cached value for `key`, calling `loader()` when missing or
+        expired. Concurrent misses on the same key share one `loader()` call;
+        if it raises, every waiter gets the same exception.
+        """
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # o invalidare in timpul incarcarii -> valoarea poate fi deja veche
+                if flight.error is None and generation == self._generation:
+                    expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+                    self._entries[key] = (expires_at, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def invalidate_where(self, predicate) -> None:
+        """Drops every entry whose key satisfies `predicate(key)`."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,55 @@
+"""
+Formatul canonic pentru geometria parcarilor si a locurilor.
+
+`polygon_geojson` se salveaza mereu ca text JSON (json.dumps), deci la citire
+un simplu json.loads este suficient. Randurile vechi au fost salvate cu
+str(dict) (repr Python, cu apostrofuri); acestea se convertesc o singura data
+cu `migrate_geometry()` si nu mai sunt evaluate pe drumul de citire.
+"""
+
+import ast
+import json
+
+def dump_geometry(geometry) -> str | None:
+    """Serializeaza o geometrie (dict sau text, inclusiv format vechi) in JSON canonic."""
+    if geometry is None or geometry == "":
+        return None
+    if isinstance(geometry, str):
+        geometry = parse_legacy_geometry(geometry)
+    return json.dumps(geometry)
+
+def load_geometry(text: str | None):
+    """Citeste geometria salvata in format canonic. Nu evalueaza niciodata literali Python."""
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def parse_legacy_geometry(text: str):
+    """Accepta atat JSON cat si repr-ul Python vechi. Folosit doar la scriere / migrare."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return ast.literal_eval(text)
+
+def migrate_geometry() -> int:
+    """
+    Converteste in JSON canonic toate randurile din parking_lots / parking_spots
+    salvate ca repr Python. Idempotent; intoarce numarul de randuri convertite.
+    """
+    from app.extensions import db
+    from app.models import ParkingLot, ParkingSpot
+
+    converted = 0
+    for model in (ParkingLot, ParkingSpot):
+        # repr-ul unui dict incepe cu "{'" ; JSON-ul canonic incepe cu '{"'
+        rows = model.query.filter(model.polygon_geojson.like("{'%")).all()
+        for row in rows:
+            row.polygon_geojson = dump_geometry(row.polygon_geojson)
+            converted += 1
+
+    if converted:
+        db.session.commit()
+    return converted
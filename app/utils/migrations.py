@@ -0,0 +1,82 @@
+"""
+Migrari minimale, idempotente, pentru baza de date SQLite existenta.
+
+Proiectul nu foloseste Alembic; `create_db.py` creeaza schema de la zero.
+Ca bazele existente (instance/parking.db) sa primeasca tabelele noi fara
+sa fie recreate, `run_migrations` este apelat la pornirea aplicatiei.
+"""
+
+from app.extensions import db
+
+def run_migrations():
+    """
+    Aduce schema la zi. Poate fi rulat de oricate ori.
+    - db.create_all() creeaza doar tabelele care lipsesc (ex: spot_changes).
+    - coloanele noi (nullable) sunt adaugate pe tabelele existente.
+    - indecsii declarati in modele sunt creati si pe tabelele existente.
+    - geometriile salvate ca repr Python sunt convertite in JSON canonic.
+    - rollup-ul orar de ocupare e construit din istoric daca e gol.
+    """
+    # importam modelele ca sa fie inregistrate in metadata
+    from app import models  # noqa: F401
+    from app.utils.geojson import migrate_geometry
+
+    db.create_all()
+    ensure_columns()
+    ensure_indexes()
+    migrate_geometry()
+    backfill_occupancy_rollup()
+
+def ensure_columns() -> list[str]:
+    """
+    db.create_all() nu modifica tabelele existente, asa ca adaugam aici
+    (ALTER TABLE ADD COLUMN) coloanele declarate in modele care lipsesc.
+    Doar coloane nullable, fara default pe server. Returneaza "tabela.coloana".
+    """
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable or column.server_default is not None:
+                    raise RuntimeError(f"Nu pot adauga automat coloana {table.name}.{column.name}")
+                col_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+def backfill_occupancy_rollup() -> int:
+    """
+    occupancy_hourly e actualizat doar incremental (la finalizare / anulare),
+    deci o baza care avea rezervari terminate inainte de tabela il reconstruieste
+    aici o data din istoric. Returneaza numarul de randuri (0 daca nu era nevoie).
+    """
+    from app.models import OccupancyHourly, Reservation
+    from app.services.occupancy_rollup import rebuild_occupancy_rollup
+
+    if db.session.query(OccupancyHourly.hour_start).first() is not None:
+        return 0
+    if db.session.query(Reservation.id).filter(Reservation.status == "finished").first() is None:
+        return 0
+    return rebuild_occupancy_rollup()
+
+def ensure_indexes() -> list[str]:
+    """
+    db.create_all() nu adauga indecsi pe tabelele care exista deja, asa ca
+    ii cream aici (CREATE INDEX IF NOT EXISTS). Returneaza indecsii creati.
+    """
+    created = []
+    with db.engine.begin() as conn:
+        existing = {
+            name for (name,) in conn.execute(
+                db.text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        }
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    created.append(index.name)
+    return created
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Verifica planurile de executie (EXPLAIN QUERY PLAN) pentru interogarile
+"fierbinti": suprapuneri de rezervari, fereastra de rezervare a locului,
+indexul de intervale, toggle, sweep-urile de expirare / no-show, filtrele pe locuri,
+istoricul paginat al user-ului si reluarea jurnalului de ocupare.
+
+Scriptul esueaza (exit code 1) daca vreuna face SCAN complet pe o tabela
+in loc sa foloseasca un index.
+
+Utilizare:
+    python check_query_plans.py
+"""
+
+import re
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, tuple_, update
+
+from app import create_app
+from app.extensions import db
+from app.models import OccupancyEvent, OccupancyHourly, ParkingSpot, Reservation, User
+from app.services.occupancy_log import MS_PER_DAY, to_epoch_ms
+from app.services.parking_service import _toggle_update
+from app.services.reservation_service import _window_subquery
+
+# SEARCH = cautare in index; SCAN = parcurge toate randurile tabelei
+# (si "SCAN x USING COVERING INDEX ..." citeste tot indexul, deci tot O(n))
+SCAN = re.compile(r"^SCAN (\w+)")
+
+def is_full_scan(line: str) -> bool:
+    match = SCAN.match(line)
+    return bool(match) and match.group(1) in db.metadata.tables
+
+def hot_queries():
+    now = datetime.now()
+    later = now + timedelta(hours=1)
+    now_ms = to_epoch_ms(now)
+    active = Reservation.status == "active"
+
+    return {
+        "spot_overlaps": select(Reservation.id).where(
+            Reservation.spot_id == 1, active,
+            Reservation.end_time > now, Reservation.start_time < later,
+        ).limit(1),
+        "user_old_reservation_overlaps": select(Reservation.id).where(
+            Reservation.user_id == 1, active,
+            Reservation.end_time >= now, Reservation.start_time < later,
+        ).limit(1),
+        "refresh_spot_reservation_windows": update(ParkingSpot).where(ParkingSpot.id.in_([1, 2])).values(
+            reservation_start_time=_window_subquery(Reservation.start_time, now),
+            reservation_end_time=_window_subquery(Reservation.end_time, now),
+        ),
+        "interval_index_reload": select(
+            Reservation.spot_id, Reservation.id, Reservation.user_id,
+            Reservation.start_time, Reservation.end_time,
+        ).where(active, Reservation.spot_id.in_([1, 2])).order_by(Reservation.spot_id, Reservation.start_time),
+        "toggle_spot": _toggle_update(
+            User(id=1, email="user@example.com"), 1, now, is_admin=False,
+        ),
+        "finalize_expired_reservations": select(Reservation.spot_id).where(
+            active, Reservation.end_time <= now,
+        ),
+        "cancel_no_show_reservations": select(Reservation.spot_id).where(
+            active,
+            Reservation.start_time <= now - timedelta(minutes=15),
+            ~select(ParkingSpot.id)
+            .join(User, User.email == ParkingSpot.occupied_by_email)
+            .where(
+                ParkingSpot.id == Reservation.spot_id,
+                ParkingSpot.is_occupied.is_(True),
+                User.id == Reservation.user_id,
+            )
+            .exists(),
+        ).distinct(),
+        "recheck_no_shows": select(Reservation.id).where(
+            Reservation.spot_id.in_([1, 2]),
+            select(ParkingSpot.id)
+            .where(ParkingSpot.id == Reservation.spot_id, ParkingSpot.is_occupied.is_(False))
+            .exists(),
+            active,
+            Reservation.start_time <= now - timedelta(minutes=15),
+            Reservation.end_time > now,
+        ),
+        "spots_by_lot": select(ParkingSpot.id).where(
+            ParkingSpot.parking_lot == "Parcare Precis", ParkingSpot.is_occupied.is_(True),
+        ),
+        "rollup_window": select(OccupancyHourly.hour, OccupancyHourly.minutes).where(
+            OccupancyHourly.hour_start >= now - timedelta(days=7), OccupancyHourly.hour_start < now,
+        ),
+        "deadline_changes": select(Reservation.id, Reservation.status).where(
+            Reservation.version > 100, Reservation.version <= 200,
+        ),
+        "my_reservations_page": select(Reservation.id).where(
+            Reservation.user_id == 1, tuple_(Reservation.start_time, Reservation.id) < (now, 1_000_000),
+        ).order_by(Reservation.start_time.desc(), Reservation.id.desc()).limit(6),
+        "my_reservations_since": select(Reservation.id).where(
+            Reservation.user_id == 1, Reservation.version > 100, Reservation.version <= 200,
+        ),
+        "occupancy_events_window": select(OccupancyEvent.spot_id, OccupancyEvent.at_ms).where(
+            OccupancyEvent.day >= (now_ms - 86_400_000) // MS_PER_DAY, OccupancyEvent.day <= now_ms // MS_PER_DAY,
+            OccupancyEvent.at_ms >= now_ms - 86_400_000, OccupancyEvent.at_ms < now_ms,
+        ),
+        "occupancy_state_at": select(OccupancyEvent.state).where(
+            OccupancyEvent.spot_id == 1, OccupancyEvent.at_ms <= now_ms,
+        ).order_by(OccupancyEvent.at_ms.desc()).limit(1),
+    }
+
+def explain(stmt) -> list[str]:
+    compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(
+        str(value) if isinstance(value, datetime) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+def main() -> int:
+    app = create_app()
+    failed = []
+    with app.app_context():
+        for name, stmt in hot_queries().items():
+            plan = explain(stmt)
+            scans = [line for line in plan if is_full_scan(line)]
+            print(f"[{'FAIL' if scans else 'OK'}] {name}")
+            for line in plan:
+                print(f"    {line}")
+            if scans:
+                failed.append(name)
+
+    if failed:
+        print(f"[ERR] Scan complet in: {', '.join(failed)}")
+        return 1
+    print("[OK] Toate interogarile folosesc indecsi.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from app import create_app
 from app.extensions import db
 from app.models import ParkingSpot, ParkingLot
+from app.utils.geojson import dump_geometry
 from datetime import datetime, timedelta
 import json
 import os
@@ -44,7 +45,7 @@ with app.app_context():
                     lng_center=lot_data.get('lng_center'),
                     total_spots=lot_data.get('total_spots'),
                     columns=lot_data.get('columns'),
-                    polygon_geojson=lot_data.get('polygon_geojson')
+                    polygon_geojson=dump_geometry(lot_data.get('polygon_geojson'))
                 )
                 db.session.add(lot)
             db.session.commit()
@@ -58,7 +59,7 @@ with app.app_context():
                         latitude=spot_data.get('latitude'),
                         longitude=spot_data.get('longitude'),
                         is_occupied=spot_data.get('is_occupied', False),
-                        polygon_geojson=spot_data.get('polygon_geojson')
+                        polygon_geojson=dump_geometry(spot_data.get('polygon_geojson'))
                     )
                     db.session.add(spot)
                 db.session.commit()
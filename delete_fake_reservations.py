@@ -1,6 +1,9 @@
 from app import create_app
 from app.extensions import db
 from app.models import Reservation, ParkingSpot
+from app.services.change_feed import record_spot_changes
+from app.services.occupancy_rollup import rebuild_occupancy_rollup
+from app.services.reservation_service import reset_reservation_counts
 
 # Dacă vrei să ștergi DOAR pentru anumite parcări, setează LOTS = [...]
 # Dacă vrei „orice ar fi” (global), lasă LOTS = None
@@ -32,6 +35,7 @@ with app.app_context():
     if LOTS is not None:
         spot_q = spot_q.filter(ParkingSpot.parking_lot.in_(LOTS))
 
+    touched_ids = [s.id for s in spot_q.all()]
     updated = spot_q.update(
         {
             ParkingSpot.reservation_start_time: None,
@@ -41,6 +45,11 @@ with app.app_context():
         },
         synchronize_session=False
     )
+    record_spot_changes(touched_ids)
+    reset_reservation_counts()
 
     db.session.commit()
     print(f"[OK] Cleared reservation_start/end + reset occupied for {updated} parking spots.")
+
+    rows = rebuild_occupancy_rollup()
+    print(f"[OK] Rebuilt occupancy_hourly ({rows} rows).")
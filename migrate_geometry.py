@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Migrare one-shot: converteste polygon_geojson din repr Python (str(dict))
+in JSON canonic pentru toate parcarile si locurile existente.
+
+Utilizare:
+    python migrate_geometry.py
+"""
+
+from app import create_app
+from app.utils.geojson import migrate_geometry
+
+app = create_app()
+
+with app.app_context():
+    converted = migrate_geometry()
+    print(f"[OK] Au fost convertite {converted} geometrii in JSON.")
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Reconstruieste de la zero tabela occupancy_hourly (rollup-ul orar folosit
+de /parking/stats) din rezervarile cu status 'finished'.
+
+In mod normal rollup-ul se actualizeaza incremental; scriptul e necesar doar
+dupa importuri directe in baza de date sau ca verificare.
+
+Utilizare:
+    python rebuild_occupancy_rollup.py
+"""
+
+from app import create_app
+from app.services.occupancy_rollup import rebuild_occupancy_rollup
+
+app = create_app()
+
+with app.app_context():
+    rows = rebuild_occupancy_rollup()
+    print(f"[OK] occupancy_hourly reconstruit: {rows} randuri.")
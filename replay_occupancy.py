@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Reia jurnalul occupancy_events (tranzitiile de ocupare, append-only).
+
+Comenzi:
+    python replay_occupancy.py state --at 2026-01-17T10:00:00 [--lot "Parcare Precis"]
+        starea fiecarui loc la momentul dat (si totalul per parcare)
+    python replay_occupancy.py curve --since 2026-01-17 --until 2026-01-18 [--bucket 15] [--lot ...]
+        ocuparea reala (0..1) per parcare, pe intervale de `bucket` minute
+    python replay_occupancy.py check
+        compara starea reluata "acum" cu parking_spots (exit code 1 la diferente)
+    python replay_occupancy.py restore --at 2026-01-17T10:00:00 --yes
+        rescrie is_occupied / occupied_by_email din starea reluata la momentul dat
+        (locurile fara evenimente raman cum sunt); schimbarile intra si in jurnal
+"""
+
+import argparse
+import sys
+from collections import Counter
+from datetime import datetime
+
+from app import create_app
+from app.extensions import db
+from app.models import ParkingSpot, User
+from app.services.change_feed import record_spot_changes
+from app.services.occupancy_log import SOURCE_RESTORE, event_row, log_occupancy, occupancy_curve, state_at
+from app.services.spot_cache import spot_cache
+
+def cmd_state(args) -> int:
+    rows = state_at(args.at, args.lot)
+    per_lot = Counter()
+    for spot_id, lot, state, actor_id in rows:
+        label = {1: "ocupat", 0: "liber", None: "necunoscut"}[state]
+        actor = f" (user {actor_id})" if actor_id else ""
+        print(f"{lot:<24} #{spot_id:<6} {label}{actor}")
+        per_lot[lot, state] += 1
+    print()
+    for lot in sorted({lot for lot, _ in per_lot}):
+        print(f"[INFO] {lot}: {per_lot[lot, 1]} ocupate, {per_lot[lot, 0]} libere, "
+              f"{per_lot[lot, None]} fara evenimente la {args.at.isoformat()}")
+    return 0
+
+def cmd_curve(args) -> int:
+    if args.since >= args.until or args.bucket <= 0:
+        print("[ERR] Interval sau bucket invalid.")
+        return 1
+    curve = occupancy_curve(args.since, args.until, args.bucket, args.lot)
+    lots = sorted(curve["lots"])
+    print("bucket_start        " + "  ".join(f"{lot[:16]:>16}" for lot in lots))
+    for i, start in enumerate(curve["bucket_starts"]):
+        ratios = "  ".join(f"{curve['lots'][lot]['occupied_ratio'][i] * 100:>15.1f}%" for lot in lots)
+        print(f"{start:%Y-%m-%d %H:%M}    {ratios}")
+    return 0
+
+def cmd_check(args) -> int:
+    current = {s.id: s.is_occupied for s in ParkingSpot.query}
+    drift = [
+        (spot_id, state, current[spot_id])
+        for spot_id, _, state, _ in state_at(datetime.now())
+        if state is not None and bool(state) != current[spot_id]
+    ]
+    for spot_id, state, actual in drift:
+        print(f"[ERR] spot {spot_id}: jurnal={'ocupat' if state else 'liber'}, "
+              f"parking_spots={'ocupat' if actual else 'liber'}")
+    if drift:
+        return 1
+    print("[OK] Starea reluata din jurnal coincide cu parking_spots.")
+    return 0
+
+def cmd_restore(args) -> int:
+    if not args.yes:
+        print("[ERR] restore rescrie starea locurilor; confirmati cu --yes.")
+        return 1
+    emails = dict(db.session.query(User.id, User.email))
+    spots = {s.id: s for s in ParkingSpot.query}
+    now = datetime.now()
+    changed, events = [], []
+    for spot_id, _, state, actor_id in state_at(args.at):
+        spot = spots[spot_id]
+        if state is None:
+            continue
+        occupied = bool(state)
+        email = emails.get(actor_id) if occupied else None
+        if spot.is_occupied == occupied and spot.occupied_by_email == email:
+            continue
+        if spot.is_occupied != occupied:
+            events.append(event_row(spot_id, occupied, now, actor_id, SOURCE_RESTORE))
+        spot.is_occupied = occupied
+        spot.occupied_by_email = email
+        changed.append(spot_id)
+
+    log_occupancy(events)
+    record_spot_changes(changed)
+    db.session.commit()
+    spot_cache.invalidate(changed)
+    print(f"[OK] {len(changed)} locuri readuse la starea de la {args.at.isoformat()}.")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    state = sub.add_parser("state")
+    state.add_argument("--at", type=datetime.fromisoformat, default=datetime.now())
+    state.add_argument("--lot")
+
+    curve = sub.add_parser("curve")
+    curve.add_argument("--since", type=datetime.fromisoformat, required=True)
+    curve.add_argument("--until", type=datetime.fromisoformat, required=True)
+    curve.add_argument("--bucket", type=int, default=60, help="minute")
+    curve.add_argument("--lot")
+
+    sub.add_parser("check")
+
+    restore = sub.add_parser("restore")
+    restore.add_argument("--at", type=datetime.fromisoformat, required=True)
+    restore.add_argument("--yes", action="store_true")
+
+    args = parser.parse_args()
+    commands = {"state": cmd_state, "curve": cmd_curve, "check": cmd_check, "restore": cmd_restore}
+
+    app = create_app()
+    with app.app_context():
+        return commands[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,15 +13,16 @@ import math
 import sys
 from app import create_app, db
 from app.models import ParkingLot, ParkingSpot
+from app.services.change_feed import record_spot_changes
+from app.utils.geojson import load_geometry
 
 def generate_spots_for_lot(lot):
     if not lot.total_spots:
         return []
     
     try:
-        import ast
         if isinstance(lot.polygon_geojson, str):
-            poly_dict = ast.literal_eval(lot.polygon_geojson)
+            poly_dict = load_geometry(lot.polygon_geojson)
         else:
             poly_dict = lot.polygon_geojson
         
@@ -107,9 +108,11 @@ def regenerate_all_spots():
             print(f"Sterg {len(existing)} spoturile vechi...")
             for spot in existing:
                 db.session.delete(spot)
+            record_spot_changes(spot.id for spot in existing)
             db.session.commit()
         
         total_created = 0
+        new_spots = []
         for lot in lots:
             spots_data = generate_spots_for_lot(lot)
             print(f"Lot '{lot.name}' ({lot.total_spots} spots)...")
@@ -124,8 +127,11 @@ def regenerate_all_spots():
                     polygon_geojson=spot_data['polygon_geojson']
                 )
                 db.session.add(spot)
+                new_spots.append(spot)
                 total_created += 1
         
+        db.session.flush()
+        record_spot_changes(spot.id for spot in new_spots)
         db.session.commit()
         print(f"\nAu fost generate {total_created} spoturi!")
         
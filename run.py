@@ -3,6 +3,9 @@ from app import create_app
 # Alege config_name corespunzator (ex: "development", "production")
 app = create_app(config_name="development")
 
+# Server de productie (stream-urile SSE pe greenlet-uri, nu pe thread-uri):
+#   gunicorn -k gevent --worker-connections 1000 -w 2 -b 0.0.0.0:5000 run:app
+
 if __name__ == "__main__":
     # Configureaza debug / host / port dupa nevoie
     app.run(debug=True, host='0.0.0.0', port=5000)
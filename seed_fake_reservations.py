@@ -2,9 +2,14 @@ import sys
 import random
 from datetime import datetime, timedelta, time
 
+from sqlalchemy import func, select, update
+
 from app import create_app
 from app.extensions import db
-from app.models import ParkingSpot, Reservation, User
+from app.models import ParkingSpot, Reservation, SpotChange, User
+from app.services.change_feed import record_spot_changes
+from app.services.occupancy_rollup import rebuild_occupancy_rollup
+from app.services.reservation_service import reset_reservation_counts
 
 DAYS = 7
 START_HOUR = 8
@@ -123,6 +128,16 @@ def main():
                     day_list.append((start_dt, end_dt))
                     created += 1
 
+        record_spot_changes(s.id for s in spots)
+        # versiunea schimbarii de mai sus, ca un server pornit (termenele de
+        # expirare, /reservations/my?since=) sa vada rezervarile noi
+        db.session.execute(
+            update(Reservation)
+            .where(Reservation.spot_id.in_([s.id for s in spots]), Reservation.version.is_(None))
+            .values(version=select(func.max(SpotChange.version)).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        reset_reservation_counts()
         db.session.commit()
         print(f"[OK] Created {created} fake reservations for '{lot_name}' over last {DAYS} days.")
 
@@ -153,6 +168,10 @@ def main():
         db.session.commit()
         print(f"[OK] Updated is_occupied for {updated_count} spots in '{lot_name}' (based on active reservations now).")
 
+        # rezervarile inserate direct ca 'finished' trebuie incluse in rollup
+        rows = rebuild_occupancy_rollup()
+        print(f"[OK] Rebuilt occupancy_hourly ({rows} rows).")
+
 if __name__ == "__main__":
     random.seed(42)
     main()
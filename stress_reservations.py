@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test de stres pentru crearea concurenta de rezervari.
+
+Pe o baza SQLite temporara, mai multe procese x mai multe thread-uri trimit
+simultan (prin Flask test client) cereri POST /reservations/ care se suprapun
+pe aceleasi "sloturi" (loc + interval). Fiecare cerere vine de la alt user.
+Verifica faptul ca pentru fiecare slot exact o cerere primeste 201, restul 409,
+si ca in baza nu exista doua rezervari active suprapuse pe acelasi loc.
+
+Utilizare:
+    python stress_reservations.py [--processes 4] [--threads 8] [--spots 4] [--slots 3] [--per-slot 25]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+def build_requests(spots: int, slots: int, per_slot: int) -> list[dict]:
+    """
+    Cererile pentru un slot incep la base + 0..29 min si dureaza 60 min, deci
+    se suprapun toate intre ele; sloturile aceluiasi loc sunt la 3 ore distanta.
+    """
+    base = (datetime.now() + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+    requests = []
+    user_id = 1
+    for spot_id in range(1, spots + 1):
+        for slot in range(slots):
+            slot_start = base + timedelta(hours=3 * slot)
+            for _ in range(per_slot):
+                start = slot_start + timedelta(minutes=random.randint(0, 29))
+                requests.append({
+                    "slot": (spot_id, slot),
+                    "user_id": user_id,
+                    "spot_id": spot_id,
+                    "start_time": start.isoformat(),
+                    "end_time": (start + timedelta(minutes=60)).isoformat(),
+                })
+                user_id += 1
+    return requests
+
+def setup_database(n_spots: int, n_users: int) -> None:
+    from app import create_app
+    from app.extensions import db
+    from app.models import ParkingSpot, User
+
+    app = create_app()
+    with app.app_context():
+        db.session.execute(db.insert(User), [
+            {"email": f"stress{i}@upb.ro", "password_hash": "-", "full_name": f"Stress {i}", "role": "student"}
+            for i in range(1, n_users + 1)
+        ])
+        db.session.execute(db.insert(ParkingSpot), [
+            {"parking_lot": "Stress", "spot_number": str(i), "latitude": 44.43, "longitude": 26.05, "is_occupied": False}
+            for i in range(1, n_spots + 1)
+        ])
+        db.session.commit()
+
+def run_worker(requests: list[dict], threads: int, start_barrier=None) -> list[tuple]:
+    """Runs `requests` in one process over `threads` threads; returns (slot, status) pairs."""
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    results = []
+    lock = threading.Lock()
+    ready = threading.Barrier(threads)
+
+    def work(batch):
+        client = app.test_client()
+        ready.wait()
+        for req in batch:
+            with client.session_transaction() as session:
+                session["_user_id"] = str(req["user_id"])
+                session["_fresh"] = True
+            response = client.post("/reservations/", json={
+                "spot_id": req["spot_id"],
+                "start_time": req["start_time"],
+                "end_time": req["end_time"],
+            })
+            with lock:
+                results.append((tuple(req["slot"]), response.status_code))
+
+    if start_barrier is not None:
+        start_barrier.wait()
+    workers = [threading.Thread(target=work, args=(requests[i::threads],)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return results
+
+def _process_main(args):
+    requests, threads, barrier = args
+    return run_worker(requests, threads, barrier)
+
+def check_database() -> list[str]:
+    """Active reservations of the same spot must not overlap."""
+    from app import create_app
+    from app.models import Reservation
+
+    app = create_app()
+    errors = []
+    with app.app_context():
+        by_spot = defaultdict(list)
+        for r in Reservation.query.filter_by(status="active").order_by(Reservation.start_time):
+            by_spot[r.spot_id].append(r)
+        for spot_id, reservations in by_spot.items():
+            for a, b in zip(reservations, reservations[1:]):
+                if b.start_time < a.end_time:
+                    errors.append(f"spot {spot_id}: rezervarile {a.id} si {b.id} se suprapun")
+    return errors
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--spots", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=3)
+    parser.add_argument("--per-slot", type=int, default=25)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="parkupb-stress-")
+    os.environ["PARKUPB_DATABASE_URL"] = f"sqlite:///{tmp_dir}/stress.db"
+
+    requests = build_requests(args.spots, args.slots, args.per_slot)
+    random.shuffle(requests)
+    setup_database(args.spots, len(requests))
+
+    # procese noi (spawn): fiecare cu engine-ul si conexiunile lui
+    ctx = multiprocessing.get_context("spawn")
+    manager = ctx.Manager()
+    barrier = manager.Barrier(args.processes)
+    chunks = [(requests[i::args.processes], args.threads, barrier) for i in range(args.processes)]
+    with ctx.Pool(args.processes) as pool:
+        results = [r for chunk in pool.map(_process_main, chunks) for r in chunk]
+
+    by_slot = defaultdict(list)
+    for slot, status in results:
+        by_slot[slot].append(status)
+
+    errors = []
+    for slot, statuses in sorted(by_slot.items()):
+        wins = statuses.count(201)
+        others = [s for s in statuses if s not in (201, 409)]
+        if wins != 1 or others:
+            errors.append(f"slot {slot}: {wins} rezervari reusite, alte statusuri: {others}")
+    errors += check_database()
+
+    print(f"[INFO] {len(results)} cereri, {len(by_slot)} sloturi, "
+          f"{args.processes} procese x {args.threads} thread-uri")
+    for error in errors:
+        print(f"[ERR] {error}")
+    if errors:
+        return 1
+    print("[OK] Exact o rezervare reusita pentru fiecare slot.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
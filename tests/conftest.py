@@ -0,0 +1,55 @@
+import os
+import tempfile
+from itertools import count
+
+import pytest
+
+# baza temporara, setata inainte de importul aplicatiei (vezi app/config.py);
+# testele nu ating instance/parking.db
+_DB_DIR = tempfile.mkdtemp(prefix="parkupb-tests-")
+os.environ["PARKUPB_DATABASE_URL"] = f"sqlite:///{_DB_DIR}/parking.db"
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import ParkingSpot, User  # noqa: E402
+from app.services.change_feed import record_spot_changes  # noqa: E402
+
+# baza e comuna tuturor testelor: fiecare isi face parcarea si userii ei
+_ids = count(1)
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app("testing")
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+@pytest.fixture
+def make_lot(ctx):
+    """make_lot(spots) -> (parking_lot, [spot ids])"""
+    def make(spots: int = 2):
+        name = f"Parcare Test {next(_ids)}"
+        rows = [
+            ParkingSpot(parking_lot=name, spot_number=str(i + 1), latitude=44.435, longitude=26.05)
+            for i in range(spots)
+        ]
+        db.session.add_all(rows)
+        db.session.flush()
+        record_spot_changes([s.id for s in rows])
+        db.session.commit()
+        return name, [s.id for s in rows]
+    return make
+
+@pytest.fixture
+def make_user(ctx):
+    def make(role: str = "student"):
+        n = next(_ids)
+        user = User(email=f"test{n}@upb.ro", full_name=f"Test {n}", role=role)
+        user.set_password("parola")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Reservation
+from app.services.expiry_deadlines import DeadlineQueue
+from app.services.parking_service import toggle_spot
+from app.services.scheduler import run_reservation_sweeps
+
+def test_reserver_leaving_after_grace_is_a_no_show(make_lot, make_user):
+    _, spots = make_lot(1)
+    user = make_user()
+    now = datetime.now()
+    reservation = Reservation(
+        user_id=user.id, spot_id=spots[0], status="active",
+        start_time=now - timedelta(minutes=30), end_time=now + timedelta(hours=1),
+    )
+    db.session.add(reservation)
+    db.session.commit()
+
+    assert toggle_spot(user, spots[0]) is True
+    # alt proces: termenul de no-show a trecut cat timp user-ul era parcat
+    other = DeadlineQueue()
+    other.seed()
+    other.pop_due(datetime.now())
+    run_reservation_sweeps()
+    assert db.session.get(Reservation, reservation.id).status == "active"
+
+    assert toggle_spot(user, spots[0]) is False
+    other.sync()
+    assert other.is_due(datetime.now())
+
+    run_reservation_sweeps()
+    db.session.expire_all()
+    assert db.session.get(Reservation, reservation.id).status == "cancelled"
+
+def test_dropped_ids_leave_with_their_last_heap_entry():
+    queue = DeadlineQueue()
+    now = datetime.now()
+    queue.push(1, now - timedelta(hours=1), now + timedelta(hours=1), wake=False)
+    queue.push(2, now - timedelta(minutes=5), now + timedelta(hours=2), wake=False)
+    # rezervari fara termene in heap (ex: anulate in alt proces) nu sunt retinute
+    for rid in range(100, 200):
+        queue.discard(rid)
+    assert queue._dropped == set()
+
+    queue.discard(1)
+    assert queue.next_deadline() == now + timedelta(minutes=10)
+    assert queue._dropped == {1}
+    # ultima intrare a lui 1 (end_time) iese din heap
+    assert queue.pop_due(now + timedelta(minutes=90)) == 2
+    assert queue._dropped == set() and 1 not in queue._entries
+
+    queue.discard(2)
+    assert queue.next_deadline() is None
+    assert queue._dropped == set() and not queue._entries
@@ -0,0 +1,53 @@
+from datetime import date, datetime, timedelta
+
+from app.extensions import db
+from app.models import Reservation
+from app.services import interval_index as interval_index_module
+from app.services.change_feed import current_version, record_spot_change
+from app.services.interval_index import interval_index
+
+def count_version_checks(monkeypatch) -> list:
+    calls = []
+
+    def counting(session=None):
+        calls.append(1)
+        return current_version(session)
+
+    monkeypatch.setattr(interval_index_module, "current_version", counting)
+    return calls
+
+def test_one_version_check_per_request(app, make_lot, make_user, monkeypatch):
+    lot, spots = make_lot(3)
+    user = make_user()
+    day = date.today() + timedelta(days=1)
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+    db.session.add(Reservation(
+        user_id=user.id, spot_id=spots[0], status="active", start_time=start, end_time=start + timedelta(hours=2),
+    ))
+    record_spot_change(spots[0])
+    db.session.commit()
+    interval_index.sync()
+    client = app.test_client()
+    calls = count_version_checks(monkeypatch)
+
+    resp = client.get(f"/parking/free-slots?lot={lot}&date={day}&days=3")
+    assert resp.status_code == 200
+    assert len(calls) == 1
+
+    resp = client.get(f"/parking/free-slots?spot_id={spots[0]}&date={day}&days=2")
+    assert resp.status_code == 200
+    assert resp.get_json()["days"][0]["free"][0]["end"] == start.isoformat()
+    assert len(calls) == 2
+
+def test_lookups_outside_a_request_see_new_reservations(make_lot, make_user):
+    _, spots = make_lot(1)
+    user = make_user()
+    start = datetime.now() + timedelta(days=2)
+    assert interval_index.current(spots[0], start) is None
+
+    db.session.add(Reservation(
+        user_id=user.id, spot_id=spots[0], status="active", start_time=start, end_time=start + timedelta(hours=1),
+    ))
+    record_spot_change(spots[0])
+    db.session.commit()
+    assert interval_index.current(spots[0], start + timedelta(minutes=5)).user_id == user.id
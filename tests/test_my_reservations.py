@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Reservation
+
+def login(app, user):
+    client = app.test_client()
+    resp = client.post("/login", json={"email": user.email, "password": "parola"})
+    assert resp.status_code == 200
+    return client
+
+def test_since_ahead_of_the_server_resets_to_the_first_page(app, make_lot, make_user):
+    _, spots = make_lot(1)
+    user = make_user()
+    start = datetime.now() + timedelta(days=1)
+    for i in range(3):
+        db.session.add(Reservation(
+            user_id=user.id, spot_id=spots[0], status="active",
+            start_time=start + timedelta(hours=2 * i), end_time=start + timedelta(hours=2 * i + 1),
+        ))
+    db.session.commit()
+    client = login(app, user)
+
+    first = client.get("/reservations/my?limit=2").get_json()
+    assert first["reset"] is False and len(first["items"]) == 2 and first["next_cursor"]
+
+    unchanged = client.get(f"/reservations/my?since={first['version']}").get_json()
+    assert unchanged["reset"] is False and unchanged["items"] == []
+
+    # ex: baza recreata, clientul are o versiune pe care serverul nu o cunoaste
+    ahead = client.get(f"/reservations/my?limit=2&since={first['version'] + 1000}").get_json()
+    assert ahead["reset"] is True
+    assert ahead["version"] == first["version"]
+    assert ahead["items"] == first["items"] and ahead["next_cursor"] == first["next_cursor"]
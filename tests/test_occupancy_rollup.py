@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import OccupancyHourly, Reservation
+from app.services.occupancy_rollup import rebuild_occupancy_rollup, split_by_hour
+from app.services.reservation_service import finalize_expired_reservations
+
+def rollup_rows(parking_lot):
+    return sorted(
+        db.session.query(OccupancyHourly.hour_start, OccupancyHourly.minutes)
+        .filter(OccupancyHourly.parking_lot == parking_lot)
+    )
+
+def test_split_by_hour_drops_fractions_of_a_second():
+    start = datetime(2026, 3, 2, 9, 59, 0, 400000)
+    end = datetime(2026, 3, 2, 10, 30, 59, 900000)
+    assert list(split_by_hour(start, end)) == [
+        (datetime(2026, 3, 2, 9), 1),
+        (datetime(2026, 3, 2, 10), 30),
+    ]
+
+def test_finalize_then_rebuild_gives_the_same_rollup(make_lot, make_user):
+    lot, spots = make_lot(2)
+    user = make_user()
+    day = (datetime.now() - timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    for spot_id, start, end in [
+        (spots[0], day + timedelta(hours=8, microseconds=500000), day + timedelta(hours=9, minutes=30)),
+        (spots[0], day + timedelta(hours=10, seconds=20), day + timedelta(hours=11, seconds=59, microseconds=1)),
+        (spots[1], day + timedelta(hours=9, minutes=15, microseconds=999999), day + timedelta(hours=12, minutes=5)),
+    ]:
+        db.session.add(Reservation(user_id=user.id, spot_id=spot_id, start_time=start, end_time=end, status="active"))
+    db.session.commit()
+
+    assert finalize_expired_reservations() >= 3
+    incremental = rollup_rows(lot)
+    assert incremental
+
+    rebuild_occupancy_rollup()
+    assert rollup_rows(lot) == incremental
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Reservation
+from app.services import parking_service
+from app.services.occupancy_rollup import add_to_rollup
+
+NOW = datetime(2026, 3, 10, 14, 25, 40)
+
+def baseline_hourly_probability(spot_ids, days):
+    """Calculul initial (fara rollup): fiecare rezervare taiata exact la [now - days, now)."""
+    start_window = NOW - timedelta(days=days)
+    minutes_per_hour = [0] * 24
+    reservations = Reservation.query.filter(
+        Reservation.spot_id.in_(spot_ids),
+        Reservation.end_time > start_window,
+        Reservation.start_time < NOW,
+        Reservation.status != "cancelled",
+    )
+    for r in reservations:
+        cur, b = max(r.start_time, start_window), min(r.end_time, NOW)
+        while cur < b:
+            hour_start = cur.replace(minute=0, second=0, microsecond=0)
+            seg_end = min(b, hour_start + timedelta(hours=1))
+            minutes_per_hour[hour_start.hour] += int((seg_end - cur).total_seconds() // 60)
+            cur = hour_start + timedelta(hours=1)
+    denom = len(spot_ids) * 60 * days
+    return [round(m / denom, 6) for m in minutes_per_hour]
+
+@pytest.fixture
+def lot_history(make_lot, make_user, monkeypatch):
+    monkeypatch.setattr(parking_service, "_now", lambda: NOW)
+    lot, spots = make_lot(2)
+    user = make_user()
+    day = NOW.replace(hour=0, minute=0, second=0)
+    rows = [
+        # peste inceputul ferestrei de 1 zi (ieri 14:25:40)
+        (spots[0], day - timedelta(hours=11), day - timedelta(hours=8), "finished"),
+        (spots[1], day - timedelta(hours=10, minutes=2), day - timedelta(hours=9, minutes=10), "finished"),
+        # peste inceputul ferestrei de 2 zile
+        (spots[1], day - timedelta(days=1, hours=10), day - timedelta(days=1, hours=7), "finished"),
+        (spots[0], day - timedelta(hours=3, minutes=50), day + timedelta(hours=1, minutes=5), "finished"),
+        (spots[1], day + timedelta(hours=8), day + timedelta(hours=9), "cancelled"),
+        # inca activa acum
+        (spots[0], day + timedelta(hours=13, minutes=40), day + timedelta(hours=15), "active"),
+    ]
+    for spot_id, start, end, status in rows:
+        db.session.add(Reservation(user_id=user.id, spot_id=spot_id, start_time=start, end_time=end, status=status))
+    add_to_rollup([(lot, start, end) for _, start, end, status in rows if status == "finished"])
+    db.session.commit()
+    return lot, spots
+
+@pytest.mark.parametrize("days", [1, 2, 3])
+def test_hourly_probability_matches_baseline(lot_history, days):
+    lot, spots = lot_history
+    got = [row["p"] for row in parking_service.get_hourly_occupancy_probability(lot, days)]
+    assert got == baseline_hourly_probability(spots, days)
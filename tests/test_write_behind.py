@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import OccupancyEvent, ParkingSpot, SpotChange
+from app.services.occupancy_log import SOURCE_SENSOR
+from app.services.sensor_ingest import ingest_readings
+from app.services.write_behind import write_behind
+
+@pytest.fixture
+def buffered(monkeypatch):
+    # flush doar explicit: thread-ul de fundal asteapta o ora
+    monkeypatch.setattr(write_behind, "enabled", True)
+    monkeypatch.setattr(write_behind, "flush_seconds", 3600)
+    yield write_behind
+    write_behind.flush()
+
+def committed_state(spot_ids):
+    return dict(db.session.execute(
+        select(ParkingSpot.id, ParkingSpot.is_occupied).where(ParkingSpot.id.in_(spot_ids))
+    ).all())
+
+def test_sensor_readings_go_through_the_buffer(app, make_lot, buffered):
+    lot, spots = make_lot(3)
+    now = datetime.now()
+    version = db.session.query(func.max(SpotChange.version)).scalar()
+
+    summary = ingest_readings([
+        {"spot_id": spots[0], "occupied": True, "timestamp": (now - timedelta(seconds=5)).isoformat()},
+        {"spot_id": spots[1], "occupied": True, "timestamp": now.isoformat()},
+        {"spot_id": spots[2], "occupied": False, "timestamp": now.isoformat()},
+    ], now=now)
+    assert summary["buffered"] is True
+    assert (summary["applied"], summary["changed"]) == (3, 2)
+
+    # vizibil imediat prin overlay, nimic scris inca
+    overlay = buffered.overlay()
+    assert overlay[spots[0]]["is_occupied"] and overlay[spots[1]]["is_occupied"]
+    assert overlay[spots[2]] == {"is_occupied": False, "occupied_by_email": None}
+    db.session.rollback()
+    assert committed_state(spots) == {spots[0]: False, spots[1]: False, spots[2]: False}
+    assert db.session.query(func.max(SpotChange.version)).scalar() == version
+
+    payload = app.test_client().get("/parking/spots").get_json()
+    assert {s["id"]: s["is_occupied"] for s in payload if s["parking_lot"] == lot} == {
+        spots[0]: True, spots[1]: True, spots[2]: False,
+    }
+
+    # o citire mai veche decat cea din buffer e ignorata
+    stale = ingest_readings(
+        [{"spot_id": spots[0], "occupied": False, "timestamp": (now - timedelta(seconds=30)).isoformat()}], now=now
+    )
+    assert (stale["applied"], stale["ignored"]) == (0, 1)
+
+    assert buffered.flush() == 3
+    assert buffered.overlay() == {}
+    db.session.rollback()
+    assert committed_state(spots) == {spots[0]: True, spots[1]: True, spots[2]: False}
+
+    changed = db.session.scalars(select(SpotChange.spot_id).where(SpotChange.version > version)).all()
+    assert sorted(changed) == sorted(spots[:2])
+    events = db.session.execute(
+        select(OccupancyEvent.spot_id, OccupancyEvent.state, OccupancyEvent.source)
+        .where(OccupancyEvent.spot_id.in_(spots))
+    ).all()
+    assert sorted(events) == sorted([(spots[0], 1, SOURCE_SENSOR), (spots[1], 1, SOURCE_SENSOR)])